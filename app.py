@@ -1,117 +1,74 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import plotly.graph_objects as go
-import requests
-import json
 from datetime import datetime, timedelta
-import pytz
+
+from weather import db, forecast, dashboard_data, logs, station_registry
 
 # --- CONFIGURATION ---
-DB_FILE = "data/observations.db"
-CONFIG_FILE = "config/stations.json"
+DB_FILE = db.OBS_DB_PATH
 USER_AGENT = "(weather-engine-v5, contact@github.com)"
 
-# --- TIMEZONE MAP ---
-STATION_TIMEZONES = {
-    'KNYC': 'America/New_York',
-    'KLAX': 'America/Los_Angeles',
-    'KORD': 'America/Chicago',
-    'KSOW': 'America/Phoenix',
-    'KPHX': 'America/Phoenix',
-    'KMIA': 'America/New_York',
-    'KSFO': 'America/Los_Angeles',
-    'KLAS': 'America/Los_Angeles',
-    'KDEN': 'America/Denver',
-    'KSEA': 'America/Los_Angeles'
-}
+DEFAULT_TZ = 'America/New_York'  # For stations in the DB but not in stations.json
+LIVE_SECONDS = 5  # How often the live panel redraws; cheap once the live feed is pushing
+
+logs.setup()  # Safe on every rerun; the forecast service and data layer log through it too
+log = logs.get_logger("dashboard")
 
 st.set_page_config(page_title="Weather Engine AI", page_icon="🌤️", layout="wide")
 
 # --- 1. LOAD CONFIGURATION ---
 def get_station_mapping():
-    """Reads the JSON config to create a dictionary of friendly names."""
+    """Friendly names from the station registry (re-read only when stations.json changes)."""
     try:
-        with open(CONFIG_FILE, "r") as f:
-            config = json.load(f)
-        
-        mapping = {}
-        for key, info in config.get("stations", {}).items():
-            sid = info.get("station_id")
-            if sid:
-                mapping[sid] = f"{sid} ({key})"
-        return mapping
+        return station_registry.load().labels()
     except Exception as e:
-        # Fallback if file missing
+        # Fallback if the config is broken
         return {}
 
 # --- 2. GET STATIONS ---
+@st.cache_resource
+def get_store():
+    """
+    Shared across reruns and sessions: one connection, cached per-station frames.
+    The live feed pushes new readings into it (needs weather/read_api.py running).
+    """
+    store = dashboard_data.ObservationStore(DB_FILE)
+    dashboard_data.LiveFeed(store).start()
+    return store
+
 def get_stations():
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        query = "SELECT DISTINCT station_id FROM observations"
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df['station_id'].tolist()
-    except:
-        return []
+    return get_store().get_stations()
 
 # --- 3. GET DATA (FIXED TIMEZONES) ---
 def get_data(station_code):
-    conn = sqlite3.connect(DB_FILE)
-    query = """
-        SELECT timestamp, temp_f as temperature 
-        FROM observations 
-        WHERE station_id = ? 
-        AND timestamp >= datetime('now', '-3 days')
-        ORDER BY timestamp ASC
-    """
-    df = pd.read_sql(query, conn, params=(station_code,))
-    conn.close()
+    # Look up the CORRECT timezone for this specific station
+    target_tz = station_registry.load().timezone(station_code, DEFAULT_TZ)
     
-    if not df.empty:
-        # 1. Convert string to datetime objects
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # 2. Look up the CORRECT timezone for this specific station
-        target_tz = STATION_TIMEZONES.get(station_code, 'America/New_York')
-        
-        # 3. Ensure we start from UTC, then convert to Target
-        if df['timestamp'].dt.tz is None:
-            df['timestamp'] = df['timestamp'].dt.tz_localize('UTC')
-        
-        df['timestamp'] = df['timestamp'].dt.tz_convert(target_tz)
-    
-    return df
+    # Only rows newer than the last rerun are read and converted
+    return get_store().get_frame(station_code, target_tz)
 
 # --- 4. GET FORECAST ---
+@st.cache_resource
+def get_forecast_service():
+    """
+    One forecast service for the whole Streamlit server. Gridpoints are resolved
+    once per station and every configured station's forecast is prefetched in
+    the background, so reruns render from local data.
+    """
+    service = forecast.ForecastService(USER_AGENT)
+    service.start_prefetch(list(get_station_mapping().keys()))
+    return service
+
 def get_forecast(station_id):
-    headers = {"User-Agent": USER_AGENT}
     try:
-        # Step 1: Get Lat/Lon
-        url1 = f"https://api.weather.gov/stations/{station_id}"
-        r1 = requests.get(url1, headers=headers)
-        if r1.status_code != 200: return pd.DataFrame()
-        
-        coords = r1.json()['geometry']['coordinates']
-        lon, lat = coords[0], coords[1]
-        
-        # Step 2: Get Gridpoint
-        url2 = f"https://api.weather.gov/points/{lat},{lon}"
-        r2 = requests.get(url2, headers=headers)
-        if r2.status_code != 200: return pd.DataFrame()
-        
-        forecast_url = r2.json()['properties']['forecastHourly']
+        periods = get_forecast_service().get_periods(station_id)
+        if not periods: return pd.DataFrame()
         
-        # Step 3: Get Data
-        r3 = requests.get(forecast_url, headers=headers)
-        if r3.status_code != 200: return pd.DataFrame()
-            
-        periods = r3.json()['properties']['periods']
         future_data = []
         
         # Get the station's timezone to match the chart
-        target_tz = STATION_TIMEZONES.get(station_id, 'America/New_York')
+        target_tz = station_registry.load().timezone(station_id, DEFAULT_TZ)
 
         for p in periods[:24]:
             # Forecast comes with timezone info, we just align it
@@ -125,7 +82,7 @@ def get_forecast(station_id):
         return pd.DataFrame(future_data)
         
     except Exception as e:
-        print(f"Forecast Error: {e}")
+        log.error("❌ Forecast Error for %s: %s", station_id, e, extra={"station": station_id})
         return pd.DataFrame()
 
 # --- MAIN APP LAYOUT ---
@@ -153,8 +110,8 @@ if df.empty:
     st.stop()
 
 # Get Current Time in Station's Zone
-station_tz = STATION_TIMEZONES.get(selected_station, 'America/New_York')
-tz_obj = pytz.timezone(station_tz)
+station_tz = station_registry.load().timezone(selected_station, DEFAULT_TZ)
+tz_obj = station_registry.load().zone(selected_station, DEFAULT_TZ)
 current_time = datetime.now(tz_obj).strftime("%A, %B %d, %I:%M %p")
 
 friendly_title = station_map.get(selected_station, selected_station)
@@ -162,61 +119,122 @@ friendly_title = station_map.get(selected_station, selected_station)
 st.title(f"🌤️ {friendly_title} (v2.0)")
 st.markdown(f"### 🕒 Local Time: {current_time} ({station_tz})")
 
-# Split Data (Today vs Yesterday)
-# We use the station's local midnight to split
+# The collector marks a station stale when its fetches fail or time out
+health = get_store().get_health(selected_station)
+if health and health[1]:
+    stale_for = (datetime.now().timestamp() - health[1]) / 60
+    st.warning(f"⚠️ Data may be stale: fetches have been failing for {stale_for:.0f} min ({health[2]}).")
+
+# Daily high/low come straight from the obs_daily rollup (station-local days)
 now_local = datetime.now(tz_obj)
-start_of_today = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
-
-df_yesterday = df[df['timestamp'] < start_of_today]
-df_today = df[df['timestamp'] >= start_of_today]
-
-# Metrics
-curr_temp = df_today.iloc[-1]['temperature'] if not df_today.empty else 0
-high_today = df_today['temperature'].max() if not df_today.empty else 0
-low_today = df_today['temperature'].min() if not df_today.empty else 0
-high_tmrw = df_forecast['temperature'].max() if not df_forecast.empty else "N/A"
-
-c1, c2, c3, c4 = st.columns(4)
-c1.metric("Current Temp", f"{curr_temp}°F")
-c2.metric("Today's High", f"{high_today}°F")
-c3.metric("Today's Low", f"{low_today}°F")
-c4.metric("Tomorrow High", f"{high_tmrw}°F")
-
-# Chart
-fig = go.Figure()
-
-if not df_yesterday.empty:
-    fig.add_trace(go.Scatter(
-        x=df_yesterday['timestamp'], 
-        y=df_yesterday['temperature'],
-        mode='lines', 
-        name='Yesterday', 
-        line=dict(color='grey', width=2)
-    ))
+today_str = now_local.date().isoformat()
+df_daily = get_store().get_daily(selected_station, (now_local - timedelta(days=30)).date().isoformat(), today_str)
+today_row = df_daily[df_daily['local_date'] == today_str] if not df_daily.empty else df_daily
 
-if not df_today.empty:
-    fig.add_trace(go.Scatter(
-        x=df_today['timestamp'], 
-        y=df_today['temperature'],
-        mode='lines', 
-        name='Today', 
-        line=dict(color='blue', width=4)
+# --- 5. LIVE PANEL ---
+@st.fragment(run_every=LIVE_SECONDS)
+def live_panel(station, tz_obj, station_tz, df_forecast, today_row):
+    """
+    Reruns on its own every LIVE_SECONDS, without the rest of the page. With
+    the live feed up, get_data is served from memory and already holds the
+    readings pushed since the last run.
+    """
+    df = get_data(station)
+
+    # Split Data (Today vs Yesterday)
+    # We use the station's local midnight to split
+    now_local = datetime.now(tz_obj)
+    start_of_today = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    df_yesterday = df[df['timestamp'] < start_of_today]
+    df_today = df[df['timestamp'] >= start_of_today]
+
+    # Metrics
+    curr_temp = df_today.iloc[-1]['temperature'] if not df_today.empty else 0
+    if not today_row.empty:
+        # The rollup as of the page load, widened by any readings pushed since
+        high_today = pd.concat([today_row['max_f'].tail(1), df_today['temperature']]).max()
+        low_today = pd.concat([today_row['min_f'].tail(1), df_today['temperature']]).min()
+    else:
+        high_today = df_today['temperature'].max() if not df_today.empty else 0
+        low_today = df_today['temperature'].min() if not df_today.empty else 0
+    high_tmrw = df_forecast['temperature'].max() if not df_forecast.empty else "N/A"
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Current Temp", f"{curr_temp}°F")
+    c2.metric("Today's High", f"{high_today}°F")
+    c3.metric("Today's Low", f"{low_today}°F")
+    c4.metric("Tomorrow High", f"{high_tmrw}°F")
+
+    # Pushed by the read API with every new reading (see weather/read_api.py)
+    pace = get_store().get_pace(station)
+    if pace:
+        st.caption(f"🚀 Pace: {pace['velocity']:+.1f}°F/hr ({pace['signal']}), "
+                   f"projected {pace['projected_3hr']:.0f}°F in 3 hours")
+
+    # Chart
+    fig = go.Figure()
+
+    if not df_yesterday.empty:
+        fig.add_trace(go.Scatter(
+            x=df_yesterday['timestamp'], 
+            y=df_yesterday['temperature'],
+            mode='lines', 
+            name='Yesterday', 
+            line=dict(color='grey', width=2)
+        ))
+
+    if not df_today.empty:
+        fig.add_trace(go.Scatter(
+            x=df_today['timestamp'], 
+            y=df_today['temperature'],
+            mode='lines', 
+            name='Today', 
+            line=dict(color='blue', width=4)
+        ))
+
+    if not df_forecast.empty:
+        fig.add_trace(go.Scatter(
+            x=df_forecast['timestamp'], 
+            y=df_forecast['temperature'],
+            mode='lines', 
+            name='Forecast', 
+            line=dict(color='orange', width=3, dash='dash')
+        ))
+
+    fig.update_layout(
+        title=f"72-Hour Timeline ({station_tz})",
+        xaxis=dict(title="Local Time", tickformat="%I:%M %p"),
+        yaxis=dict(title="Temp (°F)"),
+        hovermode="x unified"
+    )
+
+    st.plotly_chart(fig, width="stretch") # Using the safe modern fix!
+
+live_panel(selected_station, tz_obj, station_tz, df_forecast, today_row)
+
+# 30-day highs and lows, from the daily rollup
+if not df_daily.empty:
+    fig_daily = go.Figure()
+    fig_daily.add_trace(go.Bar(
+        x=df_daily['local_date'],
+        y=df_daily['max_f'] - df_daily['min_f'],
+        base=df_daily['min_f'],
+        name='Daily Range',
+        marker_color='lightsteelblue',
+        hovertemplate="Low %{base}°F<extra></extra>"
     ))
-
-if not df_forecast.empty:
-    fig.add_trace(go.Scatter(
-        x=df_forecast['timestamp'], 
-        y=df_forecast['temperature'],
-        mode='lines', 
-        name='Forecast', 
-        line=dict(color='orange', width=3, dash='dash')
+    fig_daily.add_trace(go.Scatter(
+        x=df_daily['local_date'],
+        y=df_daily['max_f'],
+        mode='markers',
+        name='High',
+        marker=dict(color='red')
     ))
-
-fig.update_layout(
-    title=f"72-Hour Timeline ({station_tz})",
-    xaxis=dict(title="Local Time", tickformat="%I:%M %p"),
-    yaxis=dict(title="Temp (°F)"),
-    hovermode="x unified"
-)
-
-st.plotly_chart(fig, width="stretch") # Using the safe modern fix!
\ No newline at end of file
+    fig_daily.update_layout(
+        title="Last 30 Days (High / Low)",
+        xaxis=dict(title="Local Date"),
+        yaxis=dict(title="Temp (°F)"),
+        hovermode="x unified"
+    )
+    st.plotly_chart(fig_daily, width="stretch")
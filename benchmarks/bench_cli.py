@@ -0,0 +1,57 @@
+"""
+CLI report parser: regression check against the fixture corpus, then timing.
+
+    python -m benchmarks.bench_cli [iterations]
+
+Every report in benchmarks/fixtures/cli/ must parse to exactly what
+expected.json says before anything is timed.
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+from weather import cli_parser
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'cli')
+
+def load_corpus():
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.txt'))):
+        with open(path, 'r') as f:
+            corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+def check_corpus(corpus):
+    with open(os.path.join(FIXTURE_DIR, 'expected.json'), 'r') as f:
+        expected = json.load(f)
+
+    failures = 0
+    for name, text in corpus.items():
+        got = cli_parser.parse_cli_report(text)
+        if got != expected.get(name):
+            failures += 1
+            print(f"❌ {name}\n   expected: {expected.get(name)}\n   got:      {got}")
+    return failures
+
+def main(iterations=2000):
+    corpus = load_corpus()
+    failures = check_corpus(corpus)
+    if failures:
+        sys.exit(1)
+    print(f"✅ {len(corpus)} fixture reports parse as expected")
+
+    texts = list(corpus.values())
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            cli_parser.parse_cli_report(text)
+    elapsed = time.perf_counter() - started
+
+    per_report = elapsed / (iterations * len(texts))
+    print(f"--- CLI PARSER: {iterations * len(texts)} reports in {elapsed * 1000:.1f} ms "
+          f"({per_report * 1e6:.1f} µs per report) ---")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,59 @@
+"""
+Pace model benchmark: the original per-row loop vs the NumPy engine.
+
+    python -m benchmarks.bench_pace [stations] [readings_per_station]
+
+Checks that both give the same velocity for every station before timing them.
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from weather import pace_engine
+from weather.pace_model import calculate_velocity
+
+def make_history(readings, seed):
+    """Irregular 1-10 minute spacing, a few duplicate timestamps, a daily-ish curve."""
+    rng = random.Random(seed)
+    t = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    rows = []
+    temp = 60.0
+    for _ in range(readings):
+        if rng.random() > 0.02:
+            t += timedelta(minutes=rng.randint(1, 10))
+        temp += rng.uniform(-1.5, 1.5)
+        stamp = t.isoformat()
+        rows.append((stamp.replace('+00:00', 'Z') if rng.random() < 0.5 else stamp, round(temp, 1)))
+    return rows
+
+def main(stations=50, readings=2000):
+    histories = {f"K{i:03d}": make_history(readings, i) for i in range(stations)}
+
+    started = time.perf_counter()
+    expected = {sid: calculate_velocity(rows) for sid, rows in histories.items()}
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    arrays = {sid: pace_engine.to_arrays(rows) for sid, rows in histories.items()}
+    load_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = pace_engine.analyze_batch(arrays, lookbacks=(3600, 1800, 10800))
+    engine_time = time.perf_counter() - started
+
+    mismatches = [sid for sid in histories
+                  if abs(results[sid]['velocity'][3600] - expected[sid]) > 1e-9]
+    if mismatches:
+        print(f"❌ Velocity mismatch for {len(mismatches)} stations, e.g. {mismatches[:5]}")
+        sys.exit(1)
+
+    print(f"--- PACE BENCHMARK: {stations} stations x {readings} readings ---")
+    print(f"   calculate_velocity loop:   {loop_time * 1000:9.1f} ms")
+    print(f"   to_arrays (parse once):    {load_time * 1000:9.1f} ms")
+    print(f"   analyze_batch (3 windows): {engine_time * 1000:9.1f} ms")
+    print(f"   speedup on analysis:       {loop_time / engine_time:9.0f}x")
+    print(f"✅ Results match for all {stations} stations")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
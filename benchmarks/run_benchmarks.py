@@ -0,0 +1,454 @@
+"""
+The whole benchmark suite against synthetic data and a local stub NWS server.
+
+    python -m benchmarks.run_benchmarks                      # 20 stations x 30 days
+    python -m benchmarks.run_benchmarks --full               # 100 stations x 1 year of 5-minute data
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/before.json
+
+Nothing touches data/ or the network: the observation DB, the Parquet
+archive, the HTTP cache and the pace checkpoint all live in --workdir (a
+temp dir by default; pass one to reuse the synthetic DB between runs).
+Results are written as JSON. Every timing key ends in _ms, and --compare
+flags any that got more than --threshold slower than the baseline file.
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import bench_cli, synthetic
+from benchmarks.stub_nws import StubServer
+from weather import (archive, cli_final, cli_parser, dashboard_data, db, http_client,
+                     live_observations, logs, pace_engine, pace_model, read_api, timekeys)
+
+# --- CONFIGURATION ---
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+DEFAULT_STATIONS = 20
+DEFAULT_DAYS = 30
+FULL_STATIONS = 100
+FULL_DAYS = 365
+REPEAT = 5              # Runs per timing; the median is reported
+THRESHOLD = 0.20        # --compare: >20% slower is a regression
+USER_AGENT = "(weather-benchmarks, localhost)"
+
+def timed(func, repeat=REPEAT):
+    """Median wall time of `repeat` calls in ms, plus the last return value."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+@contextlib.contextmanager
+def quiet():
+    """The code under test prints a line per station; keep that out of the timings and the report."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+# --- SETUP ---
+def prepare_db(workdir, stations, days, archive_days):
+    """Builds (or reuses) the synthetic DB, with everything older than archive_days in Parquet."""
+    db_path = os.path.join(workdir, f"synthetic-{stations}x{days}.db")
+    archive_dir = os.path.join(workdir, f"archive-{stations}x{days}")
+    if os.path.exists(db_path):
+        print(f"   ♻️  Reusing {db_path}")
+        return db_path, archive_dir, None
+
+    started = time.perf_counter()
+    rows = synthetic.build_observation_db(db_path, stations, days)
+    with quiet():
+        moved = archive.run_archive(archive_days, db_path=db_path, archive_dir=archive_dir)
+    build = {'rows': rows, 'archived_rows': moved, 'build_ms': (time.perf_counter() - started) * 1000}
+    print(f"   🏗️  Built {rows} rows ({moved} archived) in {build['build_ms'] / 1000:.1f}s")
+    return db_path, archive_dir, build
+
+# --- SUITES ---
+def suite_insert(workdir, rows=2000, stations=20):
+    """save_observation one row per transaction vs the writer's batched flush."""
+    zones = synthetic.station_timezones(stations)
+    end = datetime.now(timezone.utc) - timedelta(days=2)
+    sample = list(synthetic.observation_rows(stations, days=rows * 5 / stations / 1440, end=end))[:rows]
+
+    single = db.ObservationWriter(os.path.join(workdir, "insert-single.db"), timezones=zones)
+    payloads = [(row[0], json.loads(row[6])) for row in sample]
+    live_observations._writer = single
+    started = time.perf_counter()
+    with quiet():
+        for station_id, data in payloads:
+            live_observations.save_observation(station_id, data)
+    single_ms = (time.perf_counter() - started) * 1000
+    live_observations._writer = None
+    single.conn.close()
+
+    batched = db.ObservationWriter(os.path.join(workdir, "insert-batched.db"), timezones=zones)
+    started = time.perf_counter()
+    for start in range(0, len(sample), live_observations.WRITE_BATCH):
+        for row in sample[start:start + live_observations.WRITE_BATCH]:
+            batched.add(row)
+        batched.flush()
+    batched_ms = (time.perf_counter() - started) * 1000
+    batched.conn.close()
+
+    return {
+        'rows': len(sample),
+        'save_observation_total_ms': single_ms,
+        'save_observation_per_row_ms': single_ms / len(sample),
+        'batched_total_ms': batched_ms,
+        'batched_per_row_ms': batched_ms / len(sample),
+        'speedup': single_ms / batched_ms if batched_ms else None,
+    }
+
+def suite_pace(db_path, stations):
+    """Today's readings for every station: the per-row loop, the engine, and analyze_station end to end."""
+    pace_model.DB_PATH = db_path
+    zones = synthetic.station_timezones(stations)
+
+    def loop():
+        return {sid: pace_model.calculate_velocity(pace_model.get_todays_observations(sid, tz))
+                for sid, tz in zones.items()}
+
+    def engine():
+        arrays = {sid: pace_model.get_todays_arrays(sid, tz) for sid, tz in zones.items()}
+        return pace_engine.analyze_batch(arrays)
+
+    def analyze_all():
+        with quiet():
+            for sid in zones:
+                pace_model.analyze_station(sid, sid)
+
+    loop_ms, velocities = timed(loop)
+    engine_ms, results = timed(engine)
+    analyze_ms, _ = timed(analyze_all)
+
+    mismatches = sum(1 for sid, v in velocities.items()
+                     if abs(results[sid]['velocity'][pace_engine.HOUR] - v) > 1e-9)
+    readings = sum(len(pace_model.get_todays_arrays(sid, tz)[0]) for sid, tz in zones.items())
+    return {
+        'stations': len(zones),
+        'readings_today': readings,
+        'calculate_velocity_ms': loop_ms,
+        'engine_batch_ms': engine_ms,
+        'analyze_station_all_ms': analyze_ms,
+        'velocity_mismatches': mismatches,
+    }
+
+def suite_cli(workdir, server, reports=2000, fetches=50):
+    """Fixture check, parse throughput on a synthetic corpus, and fetch_cli_text against the stub."""
+    with quiet():
+        fixture_failures = bench_cli.check_corpus(bench_cli.load_corpus())
+
+    corpus = synthetic.cli_corpus(reports)
+    texts = [text for text, _ in corpus]
+    parse_ms, parsed = timed(lambda: [cli_parser.parse_cli_report(text) for text in texts])
+    wrong = sum(1 for report, (_, (date, high, low)) in zip(parsed, corpus)
+                if (report['date'], *cli_parser.high_low(report)) != (date, high, low))
+    high_low_ms, _ = timed(lambda: [cli_final.parse_cli_text(text) for text in texts])
+
+    cli_final.CLI_BASE = server.base_url
+    cli_final._clients[USER_AGENT] = http_client.HttpClient(
+        USER_AGENT, rate=1000, burst=100, cache_path=os.path.join(workdir, "http_cache.db"))
+    codes = [f"B{i:02d}" for i in range(fetches)]
+    with quiet():
+        fetch_ms, fetched = timed(lambda: [cli_final.fetch_cli_text("BEN", code, USER_AGENT) for code in codes], repeat=1)
+    cli_final._clients.pop(USER_AGENT).close()
+
+    return {
+        'fixture_failures': fixture_failures,
+        'reports': reports,
+        'parse_cli_report_ms': parse_ms,
+        'parse_cli_report_per_report_ms': parse_ms / reports,
+        'parse_cli_text_ms': high_low_ms,
+        'parse_mismatches': wrong,
+        'fetches': fetches,
+        'fetch_cli_text_ms': fetch_ms,
+        'fetch_failures': sum(1 for text in fetched if not text),
+    }
+
+def suite_dashboard(workdir, db_path, archive_dir, stations):
+    """The app.get_data path (ObservationStore.get_frame): cold, warm rerun, and after new rows arrive."""
+    zones = synthetic.station_timezones(stations)
+    store = dashboard_data.ObservationStore(db_path, archive_dir=archive_dir)
+
+    def frames():
+        return [store.get_frame(sid, tz) for sid, tz in zones.items()]
+
+    started = time.perf_counter()
+    cold = frames()
+    cold_ms = (time.perf_counter() - started) * 1000
+    warm_ms, _ = timed(frames)
+
+    # One fresh reading per station, as after a collector cycle
+    writer = db.ObservationWriter(db_path, timezones=zones)
+    stamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+    for sid in zones:
+        writer.add((sid, stamp, 50.0, 55.0, 12.0, 'Clear', None))
+    writer.flush()
+    writer.conn.close()
+    started = time.perf_counter()
+    frames()
+    incremental_ms = (time.perf_counter() - started) * 1000
+
+    start_date = timekeys.today('UTC', datetime.now(timezone.utc) - timedelta(days=30))
+    daily_ms, _ = timed(lambda: [store.get_daily(sid, start_date) for sid in zones])
+
+    month_ago = int(time.time()) - 30 * 86400
+    history_ms, history = timed(lambda: [archive.query(sid, month_ago, db_path=db_path, archive_dir=archive_dir)
+                                         for sid in zones])
+    return {
+        'stations': len(zones),
+        'rows_per_frame': sum(len(frame) for frame in cold) / len(cold),
+        'get_frame_cold_ms': cold_ms,
+        'get_frame_warm_ms': warm_ms,
+        'get_frame_incremental_ms': incremental_ms,
+        'get_daily_30d_ms': daily_ms,
+        'archive_query_30d_ms': history_ms,
+        'archive_query_rows': sum(len(frame) for frame in history),
+    }
+
+def suite_collector(workdir, server, stations):
+    """Two collect_all sweeps against the stub: fresh readings (200s), then unchanged ones (304s)."""
+    zones = synthetic.station_timezones(stations)
+    live_observations.API_BASE = server.base_url
+    live_observations.PACE_CHECKPOINT = os.path.join(workdir, "pace_checkpoint.json")
+    live_observations._writer = db.ObservationWriter(os.path.join(workdir, "collector.db"), timezones=zones)
+    live_observations._client = http_client.HttpClient(
+        USER_AGENT, rate=1000, burst=live_observations.FETCH_WORKERS,
+        pool_size=live_observations.FETCH_WORKERS, cache_path=os.path.join(workdir, "http_cache.db"))
+    live_observations._pace = None
+    live_observations._seeded = set()
+    pace_model.DB_PATH = os.path.join(workdir, "collector.db")
+    config = synthetic.station_config(stations)
+
+    result = {'stations': stations}
+    try:
+        for sweep in ('fresh', 'unchanged'):
+            before = server.requests
+            started = time.perf_counter()
+            with quiet():
+                live_observations.collect_all(config)
+            result[f'{sweep}_sweep_ms'] = (time.perf_counter() - started) * 1000
+            result[f'{sweep}_requests'] = server.requests - before
+            result[f'{sweep}_stages'] = live_observations.get_pipeline_metrics()
+    finally:
+        live_observations._client.close()
+        live_observations._writer.conn.close()
+        live_observations._client = None
+        live_observations._writer = None
+        live_observations._pace = None
+    return result
+
+def suite_faults(workdir, server, stations, deadline=3.0, timeout=1.0):
+    """
+    A sweep with a fifth of the stations misbehaving (hung, slow, 503, throttled):
+    the sweep must end near the deadline, and the healthy stations must still land.
+    """
+    ids = synthetic.station_ids(stations)
+    kinds = ["hang", "slow:5", "status:503", "throttle:429:1"]
+    server.faults = {sid: kinds[i % len(kinds)] for i, sid in enumerate(ids[::5])}
+    live_observations.API_BASE = server.base_url
+    fetch_timeout, live_observations.FETCH_TIMEOUT = live_observations.FETCH_TIMEOUT, timeout
+    live_observations.PACE_CHECKPOINT = os.path.join(workdir, "pace_faults.json")
+    live_observations._writer = db.ObservationWriter(os.path.join(workdir, "faults.db"),
+                                                     timezones=synthetic.station_timezones(stations))
+    live_observations._client = http_client.HttpClient(
+        USER_AGENT, rate=1000, burst=live_observations.FETCH_WORKERS,
+        pool_size=live_observations.FETCH_WORKERS, cache_path=os.path.join(workdir, "http_cache_faults.db"))
+    live_observations._pace = None
+    live_observations._seeded = set()
+    pace_model.DB_PATH = os.path.join(workdir, "faults.db")
+
+    result = {'stations': stations, 'faulty': len(server.faults), 'deadline_s': deadline}
+    try:
+        for sweep in ('first', 'second'):  # The second one runs with the circuits the first one opened
+            started = time.perf_counter()
+            with quiet():
+                live_observations.collect_all(synthetic.station_config(stations), deadline=deadline)
+            result[f'{sweep}_sweep_ms'] = (time.perf_counter() - started) * 1000
+            result[f'{sweep}_fetched'] = live_observations.get_pipeline_metrics()['parse']['items']
+        stale = live_observations._writer.conn.execute(
+            "SELECT COUNT(*) FROM stations WHERE stale_since IS NOT NULL").fetchone()[0]
+        result['stale_stations'] = stale
+        result['open_circuits'] = len(live_observations._client.open_circuits())
+        # Stations that should have failed but didn't, or healthy ones marked stale
+        result['stale_mismatches'] = abs(stale - len(server.faults))
+    finally:
+        server.faults = {}
+        live_observations.FETCH_TIMEOUT = fetch_timeout
+        live_observations._client.close()
+        live_observations._writer.conn.close()
+        live_observations._client = None
+        live_observations._writer = None
+        live_observations._pace = None
+    return result
+
+def suite_api(workdir, db_path, archive_dir, stations, requests=200):
+    """The read API over HTTP on one keep-alive connection: cached latest, 304s, range, daily and pace."""
+    station_id = synthetic.station_ids(stations)[0]
+    api = read_api.ReadApi(db_path, os.path.join(workdir, "api-results.db"), archive_dir).start_in_thread()
+    conn = http.client.HTTPConnection("127.0.0.1", api.port)
+
+    def get(path, **headers):
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        if response.status not in (200, 304):
+            raise RuntimeError(f"{path} -> {response.status} {body[:200]}")
+        return response, body
+
+    def per_request(path, **headers):
+        started = time.perf_counter()
+        for _ in range(requests):
+            get(path, **headers)
+        return (time.perf_counter() - started) * 1000 / requests
+
+    try:
+        etag = get("/latest")[0].getheader("ETag")
+        pace_cold_ms, _ = timed(lambda: get("/pace"), repeat=1)
+        day_ms, (_, body) = timed(lambda: get(f"/range/{station_id}"))
+        return {
+            'stations': stations,
+            'latest_ms': per_request("/latest"),
+            'latest_not_modified_ms': per_request("/latest", **{"If-None-Match": etag}),
+            'latest_station_ms': per_request(f"/latest/{station_id}"),
+            'range_1d_ms': day_ms,
+            'range_1d_rows': len(json.loads(body)['epoch']),
+            'range_30d_arrow_ms': timed(lambda: get(f"/range/{station_id}?start={int(time.time()) - 30 * 86400}"
+                                                    "&format=arrow"))[0],
+            'daily_30d_ms': timed(lambda: get(f"/daily/{station_id}?start="
+                                              f"{timekeys.today('UTC', datetime.now(timezone.utc) - timedelta(days=30))}"))[0],
+            'pace_cold_ms': pace_cold_ms,
+            'pace_warm_ms': per_request("/pace"),
+        }
+    finally:
+        conn.close()
+        api.close()
+
+# --- REPORT ---
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+def compare(results, baseline_path, threshold=THRESHOLD):
+    """Prints every _ms metric next to the baseline. Returns the keys that regressed."""
+    with open(baseline_path, 'r') as f:
+        baseline = flatten(json.load(f)['results'])
+    current = flatten(results)
+
+    regressions = []
+    print(f"\n--- COMPARED WITH {baseline_path} ---")
+    for key, value in sorted(current.items()):
+        old = baseline.get(key)
+        if not key.endswith('_ms') or not isinstance(old, (int, float)) or not old:
+            continue
+        change = (value - old) / old
+        flag = "🔴" if change > threshold else ("🟢" if change < -threshold else "  ")
+        print(f"{flag} {key:<50} {old:10.2f} -> {value:10.2f} ms ({change:+.0%})")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite against synthetic data and a stub NWS server")
+    parser.add_argument("--stations", type=int, default=DEFAULT_STATIONS)
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    parser.add_argument("--full", action="store_true", help=f"{FULL_STATIONS} stations x {FULL_DAYS} days")
+    parser.add_argument("--suites", default="insert,pace,cli,dashboard,collector,api",
+                        help="Comma-separated subset (faults is extra: a sweep against misbehaving stations)")
+    parser.add_argument("--workdir", help="Keep (and reuse) the synthetic data here instead of a temp dir")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Slowdown that counts as a regression")
+    parser.add_argument("--log-level", default="CRITICAL", help="Collector logging while timing (default: off)")
+    args = parser.parse_args(argv)
+    logs.setup(args.log_level)
+
+    stations, days = (FULL_STATIONS, FULL_DAYS) if args.full else (args.stations, args.days)
+    suites = [name.strip() for name in args.suites.split(",") if name.strip()]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="weather-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    print(f"--- 🏁 BENCHMARKS: {stations} stations x {days} days, suites {', '.join(suites)} ---")
+    server = StubServer().start()
+    results = {}
+    try:
+        needs_db = {'pace', 'dashboard', 'api'} & set(suites)
+        if needs_db:
+            db_path, archive_dir, build = prepare_db(workdir, stations, days, archive.ARCHIVE_AFTER_DAYS)
+            if build:
+                results['build'] = build
+        runners = {
+            'insert': lambda: suite_insert(workdir),
+            'pace': lambda: suite_pace(db_path, stations),
+            'cli': lambda: suite_cli(workdir, server),
+            'dashboard': lambda: suite_dashboard(workdir, db_path, archive_dir, stations),
+            'collector': lambda: suite_collector(workdir, server, stations),
+            'faults': lambda: suite_faults(workdir, server, stations),
+            'api': lambda: suite_api(workdir, db_path, archive_dir, stations),
+        }
+        for name in suites:
+            print(f"   ⏱️  {name}...")
+            results[name] = runners[name]()
+    finally:
+        server.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'stations': stations,
+            'days': days,
+            'repeat': REPEAT,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    for key, value in flatten(results).items():
+        if key.endswith('_ms'):
+            print(f"   {key:<50} {value:10.2f} ms")
+    print(f"✅ Results written to {output}")
+
+    problems = [key for key, value in flatten(results).items()
+                if key.endswith(('failures', 'mismatches')) and value]
+    if problems:
+        print(f"❌ Correctness checks failed: {', '.join(problems)}")
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+    if regressions:
+        print(f"❌ {len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+    if problems or regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+A local stand-in for api.weather.gov and forecast.weather.gov.
+
+    python -m benchmarks.stub_nws [port] [--fault KB001=slow:15 --fault KB002=status:503 ...]
+
+Serves /stations/{id}/observations/latest (with an ETag, so conditional
+requests get a 304 until the next reading), the paginated
+/stations/{id}/observations?start=&end= history the backfill reads, and
+/product.php CLI text, all from benchmarks.synthetic. Point the collector at it with
+NWS_API_BASE=http://127.0.0.1:<port> and NWS_CLI_BASE=http://127.0.0.1:<port>.
+
+Faults are keyed by station id (or CLI issuedby code):
+    slow:<seconds>            sleep before answering
+    status:<code>             answer with that status every time
+    throttle:<code>:<secs>    429/503 with Retry-After: <secs>
+    flaky:<probability>       a 503 that often, a normal answer otherwise
+    hang                      never answer (until the client gives up)
+server.faults can be changed while it runs; server.paths lists every path requested.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import synthetic
+
+# --- CONFIGURATION ---
+READING_SECONDS = 300  # A new /latest reading every 5 minutes, like a real ASOS station
+HISTORY_SECONDS = 3600  # One reading an hour in the /observations history
+LATEST_PATH = re.compile(r'^/stations/(?P<station_id>[A-Z0-9]+)/observations/latest$')
+HISTORY_PATH = re.compile(r'^/stations/(?P<station_id>[A-Z0-9]+)/observations$')
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/geo+json", etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _inject(self, key):
+        """Applies the fault configured for `key`. True if it already sent the response."""
+        fault = self.server.faults.get(key)
+        if not fault:
+            return False
+        kind, _, arg = fault.partition(":")
+        if kind == "slow":
+            time.sleep(float(arg))
+        elif kind == "hang":
+            time.sleep(3600)
+            return True
+        elif kind == "status":
+            self._send(int(arg), b'{"title": "Injected fault"}')
+            return True
+        elif kind == "throttle":
+            code, _, seconds = arg.partition(":")
+            self.send_response(int(code))
+            self.send_header("Retry-After", seconds)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+        elif kind == "flaky" and random.random() < float(arg):
+            self._send(503, b'{"title": "Injected fault"}')
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.count(self.path)
+        match = LATEST_PATH.match(url.path)
+        history = HISTORY_PATH.match(url.path)
+        station = match or history
+        key = station['station_id'] if station else parse_qs(url.query).get("issuedby", [None])[0]
+        if self._inject(key):
+            return
+        if history:
+            query = {name: values[0] for name, values in parse_qs(url.query).items()}
+            return self._send(200, self.server.history(history['station_id'], query))
+        if match:
+            body = self.server.latest(match['station_id'])
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, etag=etag)
+            return self._send(200, body, etag=etag)
+        if url.path == "/product.php":
+            code = parse_qs(url.query).get("issuedby", ["XXX"])[0]
+            return self._send(200, self.server.cli_text(code).encode("utf-8"), content_type="text/plain")
+        self._send(404, b'{"title": "Not Found"}')
+
+def _epoch(stamp):
+    return int(datetime.fromisoformat(stamp.replace('Z', '+00:00')).timestamp())
+
+class StubServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with the synthetic data behind it. Port 0 picks a free one."""
+    daemon_threads = True
+
+    def __init__(self, port=0, reading_seconds=READING_SECONDS, faults=None):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.reading_seconds = reading_seconds
+        self.faults = dict(faults or {})  # station id / CLI code -> fault spec, see module docstring
+        self.requests = 0
+        self.paths = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def handle_error(self, request, client_address):
+        pass  # Clients hanging up on a slow/hung fault is the point, not an error
+
+    def count(self, path):
+        with self.lock:
+            self.requests += 1
+            self.paths.append(path)
+
+    def latest(self, station_id):
+        """Same body for everyone until the next reading is due."""
+        slot = int(time.time() // self.reading_seconds) * self.reading_seconds if self.reading_seconds else time.time()
+        rng = random.Random(f"{station_id}:{slot}")
+        stamp = datetime.fromtimestamp(slot, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+        index = sum(map(ord, station_id))
+        return json.dumps(synthetic.api_payload(stamp, synthetic.temperature_c(index, slot, rng))).encode("utf-8")
+
+    def history(self, station_id, query):
+        """One page of hourly readings in [start, end), oldest first, with pagination.next until the end."""
+        start = _epoch(query['start'])
+        end = _epoch(query['end'])
+        limit = int(query.get('limit', 500))
+        cursor = int(query.get('cursor', start + (-start) % HISTORY_SECONDS))
+        index = sum(map(ord, station_id))
+        features = []
+        slot = cursor
+        while slot < end and len(features) < limit:
+            stamp = datetime.fromtimestamp(slot, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+            rng = random.Random(f"{station_id}:{slot}")
+            features.append(synthetic.api_payload(stamp, synthetic.temperature_c(index, slot, rng)))
+            slot += HISTORY_SECONDS
+        page = {'features': features}
+        if slot < end:
+            page['pagination'] = {'next': f"{self.base_url}/stations/{station_id}/observations"
+                                          f"?start={query['start']}&end={query['end']}&limit={limit}&cursor={slot}"}
+        return json.dumps(page).encode("utf-8")
+
+    def cli_text(self, cli_code):
+        rng = random.Random(cli_code)
+        low = rng.randint(10, 70)
+        return synthetic.cli_report(f"STATION {cli_code}", datetime.now(), low + rng.randint(5, 25), low, rng)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="stub-nws", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the NWS endpoints the collector uses")
+    parser.add_argument("port", type=int, nargs="?", default=8765)
+    parser.add_argument("--fault", action="append", default=[], metavar="ID=SPEC", help="e.g. KB001=slow:15")
+    args = parser.parse_args()
+    server = StubServer(args.port, faults=dict(fault.split("=", 1) for fault in args.fault))
+    print(f"🧪 Stub NWS server on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,143 @@
+"""
+Reproducible synthetic data for the benchmarks.
+
+Everything is driven by a seed, so two runs with the same arguments build
+byte-for-byte the same observations and CLI reports.
+"""
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+from weather import db
+
+TIMEZONES = ['America/New_York', 'America/Chicago', 'America/Denver', 'America/Phoenix', 'America/Los_Angeles']
+MONTHS = ['JANUARY', 'FEBRUARY', 'MARCH', 'APRIL', 'MAY', 'JUNE', 'JULY',
+          'AUGUST', 'SEPTEMBER', 'OCTOBER', 'NOVEMBER', 'DECEMBER']
+
+def station_ids(count):
+    return [f"KB{i:03d}" for i in range(count)]
+
+def station_timezones(count):
+    return {sid: TIMEZONES[i % len(TIMEZONES)] for i, sid in enumerate(station_ids(count))}
+
+def station_config(count):
+    """Same shape as station_registry.load().by_key, for collect_all()."""
+    zones = station_timezones(count)
+    return {sid: {'station_id': sid, 'name': f"Bench {sid}", 'timezone': zones[sid],
+                  'wfo': 'BEN', 'cli_code': sid[1:]}
+            for sid in zones}
+
+def api_payload(timestamp, temp_c, humidity=55.0, wind=12.0):
+    """A trimmed /observations/latest body with the fields parse_observation reads."""
+    return {
+        'properties': {
+            'timestamp': timestamp,
+            'temperature': {'value': temp_c, 'unitCode': 'wmoUnit:degC'},
+            'relativeHumidity': {'value': humidity},
+            'windSpeed': {'value': wind},
+            'textDescription': 'Clear',
+        }
+    }
+
+def temperature_c(station_index, epoch, rng):
+    """A seasonal + diurnal curve with a little noise."""
+    day = epoch / 86400.0
+    seasonal = 12 * math.sin(2 * math.pi * (day - 110) / 365.0)
+    diurnal = 6 * math.sin(2 * math.pi * (day % 1.0 - 0.375))
+    return round(10 + station_index % 7 + seasonal + diurnal + rng.uniform(-0.5, 0.5), 1)
+
+def observation_rows(stations, days, step_minutes=5, end=None, seed=0):
+    """
+    Yields writer rows (station_id, timestamp, temp_f, humidity, wind, desc, raw_json)
+    for `stations` stations, every `step_minutes`, over the `days` days up to `end`.
+    Rows come out time-major, the order a live collector would write them.
+    """
+    rng = random.Random(seed)
+    end = (end or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+    end -= timedelta(minutes=end.minute % step_minutes)
+    start = end - timedelta(days=days)
+    ids = station_ids(stations)
+
+    t = start
+    step = timedelta(minutes=step_minutes)
+    while t <= end:
+        stamp = t.strftime('%Y-%m-%dT%H:%M:%S+00:00')
+        epoch = t.timestamp()
+        for i, sid in enumerate(ids):
+            temp_c = temperature_c(i, epoch, rng)
+            raw = json.dumps(api_payload(stamp, temp_c))
+            yield (sid, stamp, temp_c * 9 / 5 + 32, 55.0, 12.0, 'Clear', raw)
+        t += step
+
+def build_observation_db(path, stations, days, step_minutes=5, seed=0, batch=20000, end=None):
+    """Fills a fresh observations DB through the real writer. Returns the row count."""
+    writer = db.ObservationWriter(path, timezones=station_timezones(stations))
+    total = 0
+    for row in observation_rows(stations, days, step_minutes, end=end, seed=seed):
+        writer.add(row)
+        if len(writer.pending) >= batch:
+            total += writer.flush()
+    total += writer.flush()
+    writer.conn.close()
+    return total
+
+# --- CLI REPORTS ---
+def _temp_row(kind, value, rng):
+    hour = rng.randint(1, 12)
+    minute = rng.randint(0, 59)
+    ampm = rng.choice(['AM', 'PM'])
+    record = value + rng.randint(5, 30) * (1 if kind == 'MAXIMUM' else -1)
+    normal = value + rng.randint(-8, 8)
+    return (f"  {kind:<14}{value:>4}   {hour:>2}{minute:02d} {ampm}  {record:>3}    "
+            f"{rng.randint(1880, 2020)}  {normal:>3}    {value - normal:>3}       {value + rng.randint(-10, 10):>3}")
+
+def cli_report(name, date, high, low, rng, preliminary=False):
+    """A CLI product in the layout the NWS uses, with the given high/low."""
+    month = MONTHS[date.month - 1]
+    lines = [
+        "000", "CDUS41 KBEN 150617", "CLIBEN", "",
+        "CLIMATE REPORT", "NATIONAL WEATHER SERVICE BENCHMARK", "117 AM EST MON JAN 15 2024", "",
+        "...................................", "",
+        f"...THE {name} CLIMATE SUMMARY FOR {month} {date.day} {date.year}...",
+    ]
+    if preliminary:
+        lines.append("VALID TODAY AS OF 0300 PM LOCAL TIME.")
+    lines += [
+        "", "CLIMATE NORMAL PERIOD 1991 TO 2020", "",
+        "WEATHER ITEM   OBSERVED TIME   RECORD YEAR NORMAL DEPARTURE LAST",
+        "                VALUE   (LST)  VALUE       VALUE  FROM      YEAR",
+        "...................................................................",
+        "TEMPERATURE (F)",
+        " TODAY" if preliminary else " YESTERDAY",
+        _temp_row('MAXIMUM', high, rng),
+        _temp_row('MINIMUM', low, rng),
+        f"  AVERAGE       {(high + low) // 2:>4}",
+        "",
+        "PRECIPITATION (IN)",
+        f"  {'TODAY' if preliminary else 'YESTERDAY':<15}{rng.choice(['0.00', 'T', '0.12', '1.05']):>5}"
+        f"          1.62 1978   0.11  -0.11     0.00",
+        "",
+        "SNOWFALL (IN)",
+        f"  {'TODAY' if preliminary else 'YESTERDAY':<15}  0.0           8.2  1964   0.3   -0.3      0.0",
+        "",
+        "THE BENCHMARK CLIMATE NORMALS FOR TODAY",
+        "                         NORMAL    RECORD    YEAR",
+        " MAXIMUM TEMPERATURE (F)   39        68      1932",
+        " MINIMUM TEMPERATURE (F)   28        -1      1914",
+        "", "$$",
+    ]
+    return "\n".join(lines) + "\n"
+
+def cli_corpus(count, seed=0):
+    """[(text, (date, high, low))] with a mix of final and preliminary reports."""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    corpus = []
+    for i in range(count):
+        date = start + timedelta(days=rng.randint(0, 700))
+        low = rng.randint(-20, 80)
+        high = low + rng.randint(0, 35)
+        text = cli_report(f"BENCH STATION {i % 50}", date, high, low, rng, preliminary=rng.random() < 0.2)
+        corpus.append((text, (date.strftime('%Y-%m-%d'), float(high), float(low))))
+    return corpus
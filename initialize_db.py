@@ -1,62 +1,34 @@
-import sqlite3
 import os
 
+from weather import db, schema
+
 # Define paths to our two databases
 # We use os.path.join so it works on Windows, Mac, and Linux
 base_dir = os.path.dirname(os.path.abspath(__file__))
 data_dir = os.path.join(base_dir, "data")
 
-obs_db_path = os.path.join(data_dir, "observations.db")
-results_db_path = os.path.join(data_dir, "daily_results.db")
+obs_db_path = db.OBS_DB_PATH
+results_db_path = db.RESULTS_DB_PATH
 
 def create_observations_db():
     """Creates the table for live temperature readings."""
-    conn = sqlite3.connect(obs_db_path)
-    cursor = conn.cursor()
-    
-    # Create table if it doesn't exist
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS observations (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        station_id TEXT NOT NULL,
-        timestamp TEXT NOT NULL,
-        temp_f REAL NOT NULL,
-        raw_json TEXT,
-        UNIQUE(station_id, timestamp)
-    )
-    ''')
+    conn = db.connect(obs_db_path)
     
-    # Create an index so searching is fast
-    cursor.execute('''
-    CREATE INDEX IF NOT EXISTS idx_station_time 
-    ON observations (station_id, timestamp)
-    ''')
+    # Same versioned schema the collector uses (table, unique index, dedupe)
+    version = schema.migrate_observations(conn)
     
-    conn.commit()
+    # Give back the space freed by moving raw_json out of the table
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
     conn.close()
-    print(f"✅ Created/Verified: {obs_db_path}")
+    print(f"✅ Created/Verified: {obs_db_path} (schema v{version})")
 
 def create_results_db():
     """Creates the table for final official daily results."""
-    conn = sqlite3.connect(results_db_path)
-    cursor = conn.cursor()
-    
-    # Create table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS daily_results (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        station_id TEXT NOT NULL,
-        date TEXT NOT NULL,
-        high_f REAL,
-        low_f REAL,
-        is_final INTEGER DEFAULT 0,
-        UNIQUE(station_id, date)
-    )
-    ''')
-    
-    conn.commit()
+    conn = db.connect(results_db_path)
+    version = schema.migrate_results(conn)
     conn.close()
-    print(f"✅ Created/Verified: {results_db_path}")
+    print(f"✅ Created/Verified: {results_db_path} (schema v{version})")
 
 if __name__ == "__main__":
     print("--- INITIALIZING DATABASES ---")
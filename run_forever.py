@@ -1,62 +1,157 @@
-import time
+import argparse
+import os
+import signal
 import subprocess
 import sys
-import sqlite3
-import os
-from datetime import datetime
+
+# Imported once: every cycle reuses the same interpreter, modules and config
+from weather import live_observations, cli_final, archive, forecast, logs, metrics, pace_state, sharding, station_registry
+from weather.scheduler import Job, Scheduler
 
 # --- CONFIGURATION ---
-DB_FILE = "data/observations.db"
-COLLECTOR_SCRIPT = "weather/live_observations.py"
-INTERVAL_SECONDS = 900  # 15 minutes
+INTERVAL_SECONDS = 900  # 15 minutes, with --fixed-interval
+POLL_TICK_SECONDS = 30  # Adaptive mode: how often we look for stations whose next report is due
+CLI_CHECK_SECONDS = 600  # Cheap when every station is locked; see cli_final.due_stations
+ARCHIVE_AT = "03:30"     # Daily move of old rows to the Parquet archive
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))  # /metrics and /metrics.json; 0 turns it off
+
+log = logs.get_logger("collector")
+SHARD_SIZE = metrics.gauge("shard_stations", "Stations this worker holds leases on")
 
 # --- 1. SELF-HEALING DATABASE FUNCTION ---
 def init_db():
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🛠️ Checking database health...")
-    
-    os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-    
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # This creates the table with the CORRECT column name (raw_json)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS observations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            station_id TEXT,
-            timestamp TEXT,
-            temp_f REAL,
-            humidity REAL,
-            wind_speed REAL,
-            description TEXT,
-            raw_json TEXT
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-    print("✅ Database table is ready.")
-
-# --- 2. MAIN LOOP ---
-print("--- 🔄 STARTING 24/7 WEATHER COLLECTOR ---")
-
-# Run the setup ONCE before the loop starts
-init_db()
-
-try:
-    while True:
-        now = datetime.now().strftime("%I:%M %p")
-        print(f"\n[{now}] Waking up to collect data...")
-        
-        result = subprocess.run([sys.executable, COLLECTOR_SCRIPT])
-        
-        if result.returncode == 0:
-            print("✅ Collection successful.")
-        else:
-            print("❌ Collection script crashed!")
-            
-        print(f"💤 Sleeping for {INTERVAL_SECONDS/60} minutes...")
-        time.sleep(INTERVAL_SECONDS)
-
-except KeyboardInterrupt:
-    print("\n🛑 Stopping collector. Goodbye!")
\ No newline at end of file
+    log.info("🛠️ Checking database health...")
+
+    # The collector's writer owns the connection and runs the shared schema setup
+    live_observations.init_db()
+    log.info("✅ Database table is ready.")
+
+# --- 2. JOBS ---
+def observation_job(collect_fixed, collect_due, adaptive):
+    """
+    Adaptive (default): a short tick that polls only the stations that are due,
+    see weather/polling.py. Fixed: every station every INTERVAL_SECONDS.
+    """
+    if adaptive:
+        return Job("observations", collect_due, interval=POLL_TICK_SECONDS, quiet=True)
+    return Job("observations", collect_fixed, interval=INTERVAL_SECONDS)
+
+def single_process_jobs(adaptive=True):
+    """Classic mode: this process polls every station and runs every job."""
+    return [
+        observation_job(live_observations.run_collection, live_observations.run_due, adaptive),
+        Job("cli_check", cli_final.run_cli_check, interval=CLI_CHECK_SECONDS),
+        Job("archive", archive.run_archive, daily_at=ARCHIVE_AT),
+        Job("station_metadata", forecast.refresh_metadata, interval=forecast.METADATA_REFRESH_SECONDS),
+    ]
+
+def sharded_jobs(worker, adaptive=True):
+    """
+    Sharded mode: observations only for the stations this worker holds leases
+    on; the singleton jobs only on whichever worker holds that job's lease.
+    """
+    shard_size = [None]
+
+    def claim():
+        claimed = worker.claim(station_registry.load().station_ids())
+        SHARD_SIZE.set(len(claimed))
+        if len(claimed) != shard_size[0]:
+            shard_size[0] = len(claimed)
+            log.info("🧩 %s: %d stations in this shard", worker.worker_id, len(claimed), extra={"worker": worker.worker_id})
+        return claimed
+
+    def collect_shard():
+        live_observations.run_collection(claim())
+
+    def collect_shard_due():
+        live_observations.run_due(claim())
+
+    def singleton(name, func):
+        def run():
+            if worker.claim_job(name):
+                func()
+        return run
+
+    return [
+        observation_job(collect_shard, collect_shard_due, adaptive),
+        Job("cli_check", singleton("cli_check", cli_final.run_cli_check), interval=CLI_CHECK_SECONDS),
+        Job("archive", singleton("archive", archive.run_archive), daily_at=ARCHIVE_AT),
+        Job("station_metadata", singleton("station_metadata", forecast.refresh_metadata),
+            interval=forecast.METADATA_REFRESH_SECONDS),
+    ]
+
+def spawn(count, metrics_port=METRICS_PORT, extra_args=()):
+    """
+    Local testing: run `count` sharded workers as child processes until Ctrl+C.
+    Each child serves its metrics on its own port, metrics_port + 1 + i.
+    """
+    children = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--shard", "--worker-id", f"worker-{i}",
+                          "--metrics-port", str(metrics_port + 1 + i if metrics_port else 0), *extra_args])
+        for i in range(count)
+    ]
+    try:
+        for child in children:
+            child.wait()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.wait()
+
+def _terminate(signum, frame):
+    # docker stop / spawn() send SIGTERM; shut down like Ctrl+C so leases are released
+    raise KeyboardInterrupt
+
+# --- 3. MAIN LOOP ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="24/7 weather collector")
+    parser.add_argument("--shard", action="store_true", help="Poll only this worker's share of the stations")
+    parser.add_argument("--worker-id", help="Stable id for this worker (default: host-pid)")
+    parser.add_argument("--spawn", type=int, metavar="N", help="Start N sharded workers locally")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="Metrics endpoint port (0 = off)")
+    parser.add_argument("--log-level", help="DEBUG for a line per station (default: WEATHER_LOG_LEVEL or INFO)")
+    parser.add_argument("--fixed-interval", action="store_true",
+                        help=f"Poll every station every {INTERVAL_SECONDS}s instead of adaptively")
+    args = parser.parse_args(argv)
+
+    logs.setup(args.log_level)
+    if args.spawn:
+        spawn(args.spawn, args.metrics_port, ["--fixed-interval"] if args.fixed_interval else [])
+        return
+
+    log.info("--- 🔄 STARTING 24/7 WEATHER COLLECTOR ---")
+    signal.signal(signal.SIGTERM, _terminate)
+
+    if args.metrics_port:
+        server = metrics.serve(args.metrics_port)
+        log.info("📈 Metrics on http://localhost:%d/metrics (and /metrics.json)", server.server_address[1])
+
+    # Run the setup ONCE before the loop starts
+    init_db()
+
+    worker = None
+    if args.shard:
+        worker = sharding.ShardWorker(args.worker_id)
+        worker.start()
+        # Each worker keeps its own pace checkpoint
+        live_observations.PACE_CHECKPOINT = pace_state.CHECKPOINT_PATH.replace(".json", f".{worker.worker_id}.json")
+        log.info("🧩 Running as shard worker %s", worker.worker_id, extra={"worker": worker.worker_id})
+
+    scheduler = Scheduler()
+    adaptive = not args.fixed_interval
+    for job in (sharded_jobs(worker, adaptive) if worker else single_process_jobs(adaptive)):
+        scheduler.add(job)
+
+    try:
+        scheduler.run_forever()
+
+    except KeyboardInterrupt:
+        scheduler.stop()
+        log.info("🛑 Stopping collector. Goodbye!")
+    finally:
+        if worker:
+            worker.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
-import json
 import os
+import sqlite3
+import sys
+
+from weather import schema, station_registry
 
 # Define the path to the config file
-config_path = os.path.join("config", "stations.json")
+config_path = station_registry.CONFIG_PATH
 
 print("--- TESTING SETUP ---")
 
@@ -11,21 +14,34 @@ if os.path.exists(config_path):
     print("✅ stations.json found!")
 else:
     print("❌ stations.json NOT found. Check your folder names.")
-    exit()
+    sys.exit(1)
+
+failed = False
 
-# 2. Try to read the file
+# 2. Try to read (and validate) the file
 try:
-    with open(config_path, "r") as f:
-        data = json.load(f)
+    registry = station_registry.load(config_path)
     
     # 3. Print what we found
     print(f"✅ Successfully loaded configuration.")
-    print(f"Found {len(data['stations'])} stations:")
+    print(f"Found {len(registry)} stations:")
     
-    for key, info in data['stations'].items():
-        print(f"   -> {info['name']}")
+    for info in registry.stations():
+        print(f"   -> {info['name']} ({registry.timezone(info['station_id'])})")
 
 except Exception as e:
     print(f"❌ Error reading file: {e}")
+    failed = True
+
+# 4. Make sure the hot queries hit the index (empty in-memory DB, same schema)
+conn = sqlite3.connect(":memory:")
+schema.migrate_observations(conn)
+
+for name, plan, ok in schema.check_query_plans(conn):
+    status = "✅" if ok else "❌ FULL SCAN:"
+    print(f"{status} {name} -> {plan}")
+    failed = failed or not ok
+conn.close()
 
-print("---------------------")
\ No newline at end of file
+print("---------------------")
+sys.exit(1 if failed else 0)
\ No newline at end of file
@@ -0,0 +1,19 @@
+import pytest
+
+from benchmarks.stub_nws import StubServer
+from weather import http_client
+
+@pytest.fixture
+def stub():
+    """A fresh stub NWS server per test, so faults and request logs don't leak between tests."""
+    server = StubServer().start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def client(tmp_path):
+    """An HttpClient with its response cache in the test's temp dir and no rate limit to speak of."""
+    client = http_client.HttpClient("(weather-tests, localhost)", rate=1000, burst=1000,
+                                    cache_path=str(tmp_path / "http_cache.db"))
+    yield client
+    client.close()
@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from weather import backfill, http_client, live_observations
+
+START = datetime(2024, 3, 1, tzinfo=timezone.utc)
+END = datetime(2024, 3, 15, tzinfo=timezone.utc)  # Two weekly chunks per station
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "obs.db"), str(tmp_path / "checkpoint.json")
+
+def history_requests(stub, station_id):
+    return [path for path in stub.paths if path.startswith(f"/stations/{station_id}/observations?")]
+
+def test_interrupted_backfill_resumes_from_checkpoint(stub, client, paths, monkeypatch):
+    db_path, checkpoint = paths
+    monkeypatch.setattr(live_observations, "API_BASE", stub.base_url)
+    stub.faults["KLAX"] = "status:404"
+
+    written = backfill.run_backfill(["KNYC", "KLAX"], START, END, workers=2,
+                                    checkpoint_path=checkpoint, db_path=db_path, client=client)
+    assert written == 14 * 24  # KNYC only, hourly
+    assert backfill.load_checkpoint(checkpoint) == {backfill.chunk_key(c) for c in backfill.make_chunks(["KNYC"], START, END)}
+
+    stub.faults.clear()
+    stub.paths.clear()
+    written = backfill.run_backfill(["KNYC", "KLAX"], START, END, workers=2,
+                                    checkpoint_path=checkpoint, db_path=db_path, client=client)
+    assert written == 14 * 24
+    assert not history_requests(stub, "KNYC")  # Finished chunks aren't fetched again
+    assert len(history_requests(stub, "KLAX")) == 2
+
+    conn = sqlite3.connect(db_path)
+    counts = dict(conn.execute("SELECT station_id, COUNT(*) FROM observations GROUP BY station_id"))
+    conn.close()
+    assert counts == {"KNYC": 14 * 24, "KLAX": 14 * 24}
+
+def test_backfill_follows_pagination(stub, client, monkeypatch):
+    monkeypatch.setattr(live_observations, "API_BASE", stub.base_url)
+    monkeypatch.setattr(backfill, "PAGE_LIMIT", 50)
+    rows = backfill.fetch_chunk(client, ("KNYC", START, END))
+    assert len(rows) == 14 * 24
+    assert len(history_requests(stub, "KNYC")) == -(-14 * 24 // 50)
+
+def test_transient_errors_are_retried(stub, client, monkeypatch):
+    monkeypatch.setattr(live_observations, "API_BASE", stub.base_url)
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    stub.faults["KNYC"] = "status:503"
+    original = client.session.get
+
+    def get(*args, **kwargs):
+        response = original(*args, **kwargs)
+        stub.faults.clear()  # Only the first attempt fails
+        return response
+
+    monkeypatch.setattr(client.session, "get", get)
+    rows = backfill.fetch_chunk(client, ("KNYC", START, END))
+    assert len(rows) == 14 * 24
+
+def test_default_end_is_a_day_boundary(monkeypatch):
+    calls = []
+    monkeypatch.setattr(backfill, "run_backfill", lambda station_ids, start, end, **kwargs: calls.append(end))
+    backfill.main(["--stations", "KNYC", "--start", "2024-03-01"])
+    assert calls[0].tzinfo is not None
+    assert (calls[0].hour, calls[0].minute, calls[0].second, calls[0].microsecond) == (0, 0, 0, 0)
+
+def test_only_a_few_chunks_are_in_flight(paths, monkeypatch):
+    db_path, checkpoint = paths
+    outstanding, peak = [0], [0]
+    lock = threading.Lock()
+
+    class CountingPool(backfill.ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            with lock:
+                outstanding[0] += 1
+                peak[0] = max(peak[0], outstanding[0])
+            future = super().submit(*args, **kwargs)
+            future.add_done_callback(lambda f: release())
+            return future
+
+    def release():
+        with lock:
+            outstanding[0] -= 1
+
+    def fetch_chunk(client, chunk, api_base=None):
+        time.sleep(0.005)
+        return []
+
+    monkeypatch.setattr(backfill, "ThreadPoolExecutor", CountingPool)
+    monkeypatch.setattr(backfill, "fetch_chunk", fetch_chunk)
+    stations = [f"KB{i:03d}" for i in range(20)]
+    backfill.run_backfill(stations, START, END, workers=2, checkpoint_path=checkpoint, db_path=db_path, client=object())
+    assert len(backfill.load_checkpoint(checkpoint)) == 40
+    assert peak[0] <= 2 * backfill.IN_FLIGHT_PER_WORKER
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from weather import http_client
+
+# --- CIRCUIT BREAKER ---
+def test_breaker_opens_half_opens_and_closes():
+    breaker = http_client.CircuitBreaker(failures=2, cooldown=0.1)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # Only one probe at a time
+
+    breaker.record_failure()  # Failed probe: reopen with a doubled cooldown
+    assert breaker.state == "open" and breaker.cooldown == pytest.approx(0.2)
+
+    time.sleep(0.25)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.cooldown == pytest.approx(0.1)
+
+def test_breaker_against_failing_station(stub, client):
+    url = f"{stub.base_url}/stations/KB002/observations/latest"
+    client.breakers[url] = http_client.CircuitBreaker(cooldown=0.2)
+    stub.faults["KB002"] = "status:503"
+    for _ in range(http_client.BREAKER_FAILURES):
+        assert client.get(url).status_code == 503
+
+    before = stub.requests
+    with pytest.raises(http_client.CircuitOpenError):
+        client.get(url)
+    assert stub.requests == before  # Refused without touching the server
+
+    stub.faults.clear()
+    time.sleep(0.25)
+    assert client.get(url).status_code == 200
+    assert client.breaker(url).state == "closed"
+
+def test_retries_ride_out_a_transient_error(stub, client, monkeypatch):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    url = f"{stub.base_url}/stations/KB003/observations/latest"
+    stub.faults["KB003"] = "throttle:429:0"
+    calls = []
+    original = client.session.get
+
+    def get(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            stub.faults.clear()  # Healthy again by the second attempt
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(client.session, "get", get)
+    assert client.get(url, retries=2).status_code == 200
+    assert len(calls) == 2
+
+def test_rate_wait_excludes_retries_and_time_on_the_wire(stub, client, monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0.2)
+    host = stub.base_url.split("//", 1)[1]
+    stub.faults["KB004"] = "status:503"
+    before = http_client.RATE_WAIT_SECONDS.as_dict().get(f'{{host="{host}"}}', {'sum': 0.0})['sum']
+    client.get(f"{stub.base_url}/stations/KB004/observations/latest", retries=2)
+    waited = http_client.RATE_WAIT_SECONDS.as_dict()[f'{{host="{host}"}}']['sum'] - before
+    assert waited < 0.1  # Two 0.2s backoffs happened, but the bucket never made us wait
@@ -0,0 +1,42 @@
+import random
+from datetime import datetime
+
+from benchmarks import synthetic
+from weather import cli_final, cli_parser
+
+def report(day=datetime(2024, 3, 5), high=61, low=40):
+    return synthetic.cli_report("CENTRAL PARK NY", day, high, low, random.Random(1))
+
+def test_parses_date_and_temps():
+    parsed = cli_parser.parse_cli_report(report())
+    assert parsed['date'] == "2024-03-05"
+    assert cli_parser.high_low(parsed) == (61, 40)
+
+def test_unknown_month_leaves_date_unset_instead_of_raising():
+    text = report().replace("CLIMATE SUMMARY FOR MARCH", "CLIMATE SUMMARY FOR MARZO")
+    parsed = cli_parser.parse_cli_report(text)
+    assert parsed['date'] is None
+    assert cli_parser.high_low(parsed) == (61, 40)
+
+def test_abbreviated_month():
+    text = report().replace("CLIMATE SUMMARY FOR MARCH", "CLIMATE SUMMARY FOR MAR")
+    assert cli_parser.parse_cli_report(text)['date'] == "2024-03-05"
+
+def test_one_failing_station_does_not_abort_the_batch(monkeypatch):
+    stations = [{'station_id': sid, 'cli_code': sid[1:], 'wfo': 'OKX'} for sid in ("KNYC", "KLGA")]
+    saved, retried = [], []
+
+    def check_station(station, date, user_agent, deadline=None):
+        if station['station_id'] == "KLGA":
+            raise RuntimeError("boom")
+        return (station['station_id'], date, 61, 40, 1)
+
+    monkeypatch.setattr(cli_final, "due_stations", lambda stations_: [(s, "2024-03-05") for s in stations])
+    monkeypatch.setattr(cli_final, "get_client", lambda user_agent: None)
+    monkeypatch.setattr(cli_final, "check_station", check_station)
+    monkeypatch.setattr(cli_final, "save_results", saved.extend)
+    monkeypatch.setattr(cli_final, "schedule_retry", retried.append)
+    cli_final.run_cli_check()
+
+    assert saved == [("KNYC", "2024-03-05", 61, 40, 1)]
+    assert retried == [("KLGA", "2024-03-05")]
@@ -0,0 +1,72 @@
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks import synthetic
+from weather import cli_final, http_client, station_registry
+
+NOW = datetime(2024, 3, 6, 7, 0, tzinfo=timezone.utc)  # 2 AM in New York, 11 PM the day before in Los Angeles
+
+@pytest.fixture
+def results_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli_final, "DB_PATH", str(tmp_path / "results.db"))
+    monkeypatch.setattr(cli_final, "_conn", None)
+    monkeypatch.setattr(cli_final, "_retries", {})
+    yield
+    if cli_final._conn is not None:
+        cli_final._conn.close()
+
+def station(station_id):
+    return station_registry.load().get(station_id)
+
+# --- DUE LOGIC ---
+def test_target_date_follows_each_stations_timezone():
+    assert cli_final.target_date(station("KNYC"), NOW) == "2024-03-05"  # Past 1:30 AM local: yesterday's final is due
+    assert cli_final.target_date(station("KLAX"), NOW) == "2024-03-04"  # Still the 5th locally
+
+def test_due_skips_locked_and_backing_off(results_db):
+    nyc, chicago, lax = station("KNYC"), station("KORD"), station("KLAX")
+    cli_final.save_result("KNYC", "2024-03-05", 61, 40, is_final=1)
+    cli_final._retries[("KNYC", "2024-03-05")] = (2, 0)
+    cli_final._retries[("KORD", cli_final.target_date(chicago, NOW))] = (1, NOW.timestamp() + 60)
+
+    due = cli_final.due_stations([nyc, chicago, lax], NOW)
+    assert [s["station_id"] for s, _ in due] == ["KLAX"]
+    assert ("KNYC", "2024-03-05") not in cli_final._retries  # Locked: forgotten for good
+
+    later = datetime.fromtimestamp(NOW.timestamp() + 61, timezone.utc)
+    assert {s["station_id"] for s, _ in cli_final.due_stations([nyc, chicago, lax], later)} == {"KORD", "KLAX"}
+
+def test_retry_backoff_doubles_up_to_an_hour(results_db, monkeypatch):
+    monkeypatch.setattr(cli_final.time, "time", lambda: 1_000_000.0)
+    key = ("KNYC", "2024-03-05")
+    delays = []
+    for _ in range(6):
+        cli_final.schedule_retry(key)
+        delays.append(cli_final._retries[key][1] - 1_000_000.0)
+    assert delays == [300, 600, 1200, 2400, 3600, 3600]
+    assert cli_final._retries[key][0] == 6
+
+# --- 304 HANDLING ---
+def test_unchanged_report_is_read_from_the_cache(monkeypatch):
+    text = synthetic.cli_report("CENTRAL PARK NY", datetime(2024, 3, 5), 61, 40, random.Random(1))
+
+    class Client:
+        def get(self, url, **kwargs):
+            return http_client.CachedResponse(304, text.encode("utf-8"), not_modified=True, from_cache=True)
+
+    monkeypatch.setattr(cli_final, "get_client", lambda user_agent: Client())
+    row = cli_final.check_station(station("KNYC"), "2024-03-05", "test-agent")
+    assert row == ("KNYC", "2024-03-05", 61, 40, 1)
+
+def test_unchanged_rows_are_not_saved_again(results_db, monkeypatch):
+    logged = []
+    monkeypatch.setattr(cli_final.RESULTS, "inc", lambda **labels: logged.append(labels))
+    cli_final.save_results([("KNYC", "2024-03-05", 61, 40, 0)])
+    cli_final.save_results([("KNYC", "2024-03-05", 61, 40, 0)])
+    assert len(logged) == 1
+    cli_final.save_results([("KNYC", "2024-03-05", 62, 40, 1)])
+    assert len(logged) == 2
+    rows = cli_final.get_connection().execute("SELECT high_f, is_final FROM daily_results").fetchall()
+    assert rows == [(62.0, 1)]
@@ -0,0 +1,83 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from weather import db, dashboard_data
+
+def write(path, station_id, epoch, temp_f):
+    writer = db.ObservationWriter(path)
+    stamp = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(epoch))
+    writer.add((station_id, stamp, temp_f, None, None, None, None))
+    writer.flush()
+    writer.conn.close()
+
+def test_frame_sees_rows_after_station_list_consumed_the_change(tmp_path):
+    path = str(tmp_path / "obs.db")
+    now = int(time.time())
+    write(path, "KNYC", now - 600, 50.0)
+    write(path, "KLAX", now - 600, 70.0)
+
+    store = dashboard_data.ObservationStore(path, archive_dir=str(tmp_path / "archive"))
+    assert len(store.get_frame("KNYC", "UTC")) == 1
+    assert len(store.get_frame("KLAX", "UTC")) == 1
+
+    write(path, "KNYC", now - 300, 51.0)
+    write(path, "KLAX", now - 300, 71.0)
+    store.get_stations()  # A rerun reads the sidebar first, which sees the change
+    assert list(store.get_frame("KNYC", "UTC")['temperature']) == [50.0, 51.0]
+    assert list(store.get_frame("KLAX", "UTC")['temperature']) == [70.0, 71.0]  # Not hidden by KNYC's reload
+
+def test_unchanged_database_serves_cached_frame(tmp_path):
+    path = str(tmp_path / "obs.db")
+    write(path, "KNYC", int(time.time()) - 600, 50.0)
+    store = dashboard_data.ObservationStore(path, archive_dir=str(tmp_path / "archive"))
+    first = store.get_frame("KNYC", "UTC")
+    assert store.get_frame("KNYC", "UTC") is first
+
+def test_cached_and_live_frames_are_trimmed_to_the_window(tmp_path):
+    path = str(tmp_path / "obs.db")
+    now = int(time.time())
+    write(path, "KNYC", now - 600, 50.0)
+    write(path, "KNYC", now - 60, 51.0)
+    store = dashboard_data.ObservationStore(path, archive_dir=str(tmp_path / "archive"))
+    assert len(store.get_frame("KNYC", "UTC")) == 2
+
+    store.window = timedelta(seconds=300)  # The 600 s old reading has now aged out
+    assert list(store.get_frame("KNYC", "UTC")['temperature']) == [51.0]  # Cached-marker path
+    store.window = timedelta(seconds=30)
+    store.live = True
+    assert store.get_frame("KNYC", "UTC").empty  # Served from memory, still trimmed
+
+def test_correction_in_place_reaches_a_polled_frame(tmp_path):
+    path = str(tmp_path / "obs.db")
+    now = int(time.time())
+    write(path, "KNYC", now - 600, 50.0)
+    store = dashboard_data.ObservationStore(path, archive_dir=str(tmp_path / "archive"))
+    first = store.get_frame("KNYC", "UTC")
+
+    write(path, "KNYC", now - 600, 48.0)  # Same station and timestamp: updated in place, same id
+    frame = store.get_frame("KNYC", "UTC")
+    assert list(frame['temperature']) == [48.0]
+    assert list(first['temperature']) == [50.0]  # Frames already handed out aren't mutated
+
+def test_pushed_correction_reaches_a_live_frame(tmp_path):
+    read_api = pytest.importorskip("weather.read_api")
+    path = str(tmp_path / "obs.db")
+    now = int(time.time())
+    write(path, "KNYC", now - 600, 50.0)
+    store = dashboard_data.ObservationStore(path, archive_dir=str(tmp_path / "archive"))
+    store.get_frame("KNYC", "UTC")
+    store.live = True
+    latest = read_api.LatestCache(path)
+    latest.refresh()
+
+    write(path, "KNYC", now - 600, 48.0)
+    assert latest.refresh()
+    assert latest.delta == [] and len(latest.corrections) == 1
+    assert latest.get("KNYC").column('temp_f').to_pylist() == [48.0]
+    pushed = dict(zip(read_api.DELTA_SCHEMA.names, map(list, zip(*latest.corrections))))
+    assert store.apply_corrections(pushed) == 1
+    assert list(store.get_frame("KNYC", "UTC")['temperature']) == [48.0]
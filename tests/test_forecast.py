@@ -0,0 +1,54 @@
+import sqlite3
+
+from weather import db, forecast, schema
+
+class FakeClient:
+    """Answers the two metadata lookups like api.weather.gov, counting requests."""
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if "/points/" in url:
+            body = {'properties': {'forecastHourly': f"{url}/forecast/hourly"}}
+        else:
+            body = {'geometry': {'coordinates': [-73.97, 40.78]}}
+        return type("Response", (), {'status_code': 200, 'json': lambda self: body})()
+
+def make_db(path):
+    conn = db.connect(path)
+    schema.migrate_observations(conn)
+    conn.close()
+
+def test_collector_job_fills_station_metadata(tmp_path):
+    path = str(tmp_path / "obs.db")
+    make_db(path)
+    client = FakeClient()
+    assert forecast.refresh_metadata(["KNYC", "KLAX"], db_path=path, client=client) == 2
+    assert forecast.refresh_metadata(["KNYC", "KLAX"], db_path=path, client=client) == 0  # Still fresh
+    assert len(client.urls) == 4
+
+def test_service_only_reads_the_database(tmp_path):
+    path = str(tmp_path / "obs.db")
+    make_db(path)
+    forecast.refresh_metadata(["KNYC"], db_path=path, client=FakeClient())
+    version = sqlite3.connect(path).execute("PRAGMA user_version").fetchone()[0]
+
+    service = forecast.ForecastService("(weather-tests, localhost)", db_path=path)
+    service.client = FakeClient()
+    assert service.resolve_station("KNYC")[:2] == (40.78, -73.97)
+    assert service.client.urls == []  # Served from station_metadata
+
+    assert service.resolve_station("KLAX") is not None  # Resolved over the API, kept in memory
+    assert service.resolve_station("KLAX") is not None
+    assert len(service.client.urls) == 2
+    rows = sqlite3.connect(path).execute("SELECT station_id FROM station_metadata").fetchall()
+    assert rows == [("KNYC",)]
+    assert sqlite3.connect(path).execute("PRAGMA user_version").fetchone()[0] == version
+
+def test_service_works_before_the_database_exists(tmp_path):
+    service = forecast.ForecastService("(weather-tests, localhost)", db_path=str(tmp_path / "missing.db"))
+    service.client = FakeClient()
+    assert service.resolve_station("KNYC") is not None
+    assert not (tmp_path / "missing.db").exists()
@@ -0,0 +1,48 @@
+from weather import db, live_observations
+
+def test_etag_gives_304_until_next_reading(stub, client):
+    url = f"{stub.base_url}/stations/KB001/observations/latest"
+    first = client.get(url, conditional=True)
+    assert first.status_code == 200 and not first.not_modified
+
+    second = client.get(url, conditional=True)
+    assert second.status_code == 304 and second.not_modified
+    assert second.content == first.content  # Served from the cache
+
+    stub.reading_seconds = 0  # Every request is a new reading from now on
+    third = client.get(url, conditional=True)
+    assert third.status_code == 200 and not third.not_modified
+
+def test_ttl_hit_sends_no_request(stub, client):
+    url = f"{stub.base_url}/stations/KB001/observations/latest"
+    client.get(url, ttl=60)
+    before = stub.requests
+    response = client.get(url, ttl=60)
+    assert response.from_cache and stub.requests == before
+
+def test_deferred_validators_wait_for_commit(stub, client):
+    url = f"{stub.base_url}/stations/KB001/observations/latest"
+    client.get(url, conditional=True, defer_validators=True)
+    assert client.get(url, conditional=True, defer_validators=True).status_code == 200  # Not saved yet: no 304
+
+    client.commit_validators(url)
+    assert client.get(url, conditional=True).not_modified
+
+# --- COLLECTOR ---
+def test_failed_write_is_fetched_again(stub, client, monkeypatch):
+    monkeypatch.setattr(live_observations, "API_BASE", stub.base_url)
+    monkeypatch.setattr(live_observations, "_client", client)
+    assert live_observations.fetch_latest("KB001", client)[0] == "new"
+    # The write stage failed, so commit_fetched() never ran: the reading must come back
+    assert live_observations.fetch_latest("KB001", client)[0] == "new"
+
+    live_observations.commit_fetched(["KB001"])
+    assert live_observations.fetch_latest("KB001", client)[0] == "unchanged"
+
+def test_write_batch_commits_validators(stub, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(live_observations, "API_BASE", stub.base_url)
+    monkeypatch.setattr(live_observations, "_client", client)
+    monkeypatch.setattr(live_observations, "_writer", db.ObservationWriter(str(tmp_path / "obs.db")))
+    result, body = live_observations.fetch_latest("KB001", client)
+    live_observations.write_batch([live_observations.normalize(("KB001", body))])
+    assert live_observations.fetch_latest("KB001", client)[0] == "unchanged"
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("pandas")
+
+from weather import dashboard_data, db, read_api
+
+STATION = "KTST"  # Not in stations.json: UTC, the same local day the writer stamps
+
+def write(path, station_id, epoch, temp_f):
+    writer = db.ObservationWriter(path)
+    stamp = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(epoch))
+    writer.add((station_id, stamp, temp_f, None, None, None, None))
+    writer.flush()
+    writer.conn.close()
+
+def drain(subscriber):
+    """(event id, event name) for everything queued."""
+    events = []
+    while not subscriber.empty():
+        lines = subscriber.get_nowait().decode().split("\n")
+        events.append((int(lines[0][4:]), lines[1][7:]))
+    return events
+
+def wait_until(condition, what):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, f"timed out waiting for {what}"
+        time.sleep(0.02)
+
+@pytest.fixture
+def hub():
+    hub = read_api.EventHub(backlog=3)
+    for n in range(5):
+        hub.publish("observation", b'{"n":%d}' % n)
+    return hub  # Events 1..5 published, 3..5 still in the backlog
+
+def test_reconnect_replays_what_was_missed(hub):
+    assert drain(hub.subscribe(3)) == [(4, "observation"), (5, "observation"), (5, "hello")]
+    assert drain(hub.subscribe(2)) == [(3, "observation"), (4, "observation"), (5, "observation"), (5, "hello")]
+    assert drain(hub.subscribe(5)) == [(5, "hello")]
+    assert drain(hub.subscribe()) == [(5, "hello")]  # First connection: the database has the rest
+
+@pytest.mark.parametrize("last_event_id", [1, 9])  # Fell out of the backlog / from before a restart
+def test_reconnect_outside_the_backlog_is_reset(hub, last_event_id):
+    assert [name for _, name in drain(hub.subscribe(last_event_id))] == ["reset", "hello"]
+
+def test_slow_subscriber_is_dropped(monkeypatch):
+    monkeypatch.setattr(read_api, "SUBSCRIBER_QUEUE", 2)
+    hub = read_api.EventHub()
+    subscriber = hub.subscribe()  # "hello" takes one slot
+    hub.publish("observation", b"{}")
+    hub.publish("observation", b"{}")
+    assert subscriber not in hub.subscribers
+    assert subscriber.get_nowait() is None  # Wakes the writer up to close the stream
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "obs.db")
+    write(path, STATION, int(time.time()) - 600, 50.0)
+    store = dashboard_data.ObservationStore(path, archive_dir=str(tmp_path / "archive"))
+    store.get_frame(STATION, "UTC")
+    return store
+
+def test_hello_catches_up_from_the_database_then_goes_live(store):
+    write(store.db_path, STATION, int(time.time()) - 300, 51.0)  # Written while the feed was down
+    feed = dashboard_data.LiveFeed(store, "http://127.0.0.1:1")
+    feed.dispatch("hello", "{}")
+    assert store.live and feed.connected_once
+    assert list(store.get_frame(STATION, "UTC")['temperature']) == [50.0, 51.0]
+
+def test_pushed_rows_already_loaded_are_skipped_by_id(store):
+    store.live = True
+    loaded = int(store.get_frame(STATION, "UTC")['id'].iloc[-1])
+    now = int(time.time())
+    pushed = {'id': [loaded, loaded + 1], 'station_id': [STATION, STATION], 'epoch': [now - 600, now - 60],
+              'temp_f': [50.0, 52.0]}
+    version = store.version
+    assert store.apply_observations(pushed) == 1
+    assert store.apply_observations(pushed) == 0  # Replayed after a reconnect: nothing new
+    assert list(store.get_frame(STATION, "UTC")['temperature']) == [50.0, 52.0]
+    assert store.version == version + 1
+
+def test_feed_follows_the_api_and_resumes_from_last_event_id(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(read_api, "REFRESH_SECONDS", 0.05)
+    api = read_api.ReadApi(store.db_path, str(tmp_path / "results.db"), store.archive_dir, pool_size=1)
+    api.start_in_thread()
+    try:
+        feed = dashboard_data.LiveFeed(store, f"http://127.0.0.1:{api.port}")
+        threading.Thread(target=feed.follow, daemon=True).start()
+        wait_until(lambda: store.live, "hello")
+
+        write(store.db_path, STATION, int(time.time()) - 60, 52.0)
+        wait_until(lambda: len(store.get_frame(STATION, "UTC")) == 2, "the pushed row")
+        wait_until(lambda: feed.last_event_id == api.events.last_id, "the pace event")
+        assert store.get_pace(STATION)['current'] == 52.0
+
+        async def resume(last_event_id):  # The hub belongs to the API's event loop
+            subscriber = api.events.subscribe(last_event_id)
+            events = drain(subscriber)
+            api.events.unsubscribe(subscriber)
+            return events
+
+        # Reconnecting from one event back replays just the pace event, then says hello
+        replayed = asyncio.run_coroutine_threadsafe(resume(feed.last_event_id - 1), api.loop).result()
+        assert [name for _, name in replayed] == ["pace", "hello"]
+    finally:
+        api.loop.call_soon_threadsafe(api.watcher.cancel)
+        api.close()
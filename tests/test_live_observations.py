@@ -0,0 +1,18 @@
+import json
+
+from weather import live_observations
+
+def payload(celsius):
+    return {'properties': {'timestamp': "2024-03-05T12:00:00+00:00", 'temperature': {'value': celsius},
+                           'relativeHumidity': {'value': 80}, 'windSpeed': {'value': 5}, 'textDescription': "Fog"}}
+
+def test_freezing_point_is_converted():
+    row = live_observations.normalize(("KNYC", json.dumps(payload(0)).encode("utf-8")))
+    assert row[2] == 32.0
+
+def test_missing_temperature_is_dropped(client, monkeypatch):
+    monkeypatch.setattr(live_observations, "_client", client)
+    assert live_observations.normalize(("KNYC", json.dumps(payload(None)).encode("utf-8"))) is None
+
+def test_celsius_to_fahrenheit():
+    assert live_observations.parse_observation("KNYC", payload(-40))[2] == -40.0
@@ -0,0 +1,83 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from weather import metrics
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = metrics.serve(0, host="127.0.0.1")
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def scrape(url):
+    with urllib.request.urlopen(url) as response:
+        return response.headers.get("Content-Type"), response.read().decode("utf-8")
+
+def test_exposition_format(endpoint):
+    requests = metrics.counter("test_requests_total", "Requests by outcome")
+    depth = metrics.gauge("test_queue_depth", "Items waiting")
+    latency = metrics.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(status="200")
+    requests.inc(2, status="200")
+    requests.inc(status='we"ird')
+    depth.set(7)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, host="a")
+
+    content_type, body = scrape(f"{endpoint}/metrics")
+    assert content_type.startswith("text/plain")
+    lines = body.splitlines()
+    assert "# HELP test_requests_total Requests by outcome" in lines
+    assert "# TYPE test_requests_total counter" in lines
+    assert 'test_requests_total{status="200"} 3' in lines
+    assert 'test_requests_total{status="we\\"ird"} 1' in lines
+    assert "# TYPE test_queue_depth gauge" in lines
+    assert "test_queue_depth 7" in lines
+    assert "# TYPE test_latency_seconds histogram" in lines
+    # Buckets are cumulative and end in +Inf == count
+    assert 'test_latency_seconds_bucket{host="a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{host="a",le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{host="a",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{host="a"} 3' in lines
+    assert 'test_latency_seconds_sum{host="a"} 5.55' in lines
+
+def test_json_snapshot(endpoint):
+    latency = metrics.histogram("test_json_seconds", buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5):
+        latency.observe(value)
+    content_type, body = scrape(f"{endpoint}/metrics.json")
+    assert content_type == "application/json"
+    entry = json.loads(body)["test_json_seconds"]
+    assert entry["type"] == "histogram"
+    assert entry["values"][""]["count"] == 3
+    assert entry["values"][""]["p50"] == 0.1
+    assert entry["values"][""]["p99"] == 1.0
+
+def test_unknown_path_is_404(endpoint):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(f"{endpoint}/nope")
+    assert e.value.code == 404
+
+def test_timed_records_every_call_including_failures():
+    seconds = metrics.histogram("test_timed_seconds")
+
+    @metrics.timed(seconds, job="x")
+    def work(fail=False):
+        if fail:
+            raise RuntimeError("boom")
+        return 42
+
+    assert work() == 42
+    with pytest.raises(RuntimeError):
+        work(fail=True)
+    assert seconds.as_dict()['{job="x"}']["count"] == 2
+    assert work.__name__ == "work"
+
+def test_same_name_different_kind_is_refused():
+    metrics.counter("test_kind_clash")
+    with pytest.raises(ValueError):
+        metrics.gauge("test_kind_clash")
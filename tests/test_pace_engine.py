@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from weather import pace_engine
+from weather.pace_model import calculate_velocity
+
+START = datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+def history(seed, readings=400):
+    """Irregular spacing, ~2% duplicate timestamps, mixed 'Z' / '+00:00' / non-UTC offsets."""
+    rng = random.Random(seed)
+    t, temp, rows = START, 60.0, []
+    for _ in range(readings):
+        if rng.random() > 0.02:
+            t += timedelta(minutes=rng.choice((1, 5, 5, 10, 20, 44, 45, 46, 90)))
+        temp += rng.uniform(-1.5, 1.5)
+        style = rng.random()
+        if style < 0.4:
+            stamp = t.isoformat().replace('+00:00', 'Z')
+        elif style < 0.8:
+            stamp = t.isoformat()
+        else:
+            stamp = t.astimezone(timezone(timedelta(hours=-5))).isoformat()
+        rows.append((stamp, round(temp, 1)))
+    return rows
+
+def rows(*pairs):
+    """(minutes after START, temp) -> API-style rows."""
+    return [((START + timedelta(minutes=m)).isoformat(), temp) for m, temp in pairs]
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_the_loop_on_every_prefix(seed):
+    observations = history(seed)
+    for end in range(1, len(observations) + 1, 7):
+        prefix = observations[:end]
+        assert pace_engine.velocity(prefix) == pytest.approx(calculate_velocity(prefix), abs=1e-9)
+
+def test_batch_matches_station_by_station():
+    histories = {f"K{i:03d}": history(100 + i, 200) for i in range(25)}
+    histories["EMPTY"] = []
+    results = pace_engine.analyze_batch({sid: pace_engine.to_arrays(r) if r else (np.array([], dtype=np.int64), np.array([]))
+                                         for sid, r in histories.items()})
+    assert "EMPTY" not in results
+    for sid, observations in histories.items():
+        if observations:
+            assert results[sid]['velocity'][3600] == pytest.approx(calculate_velocity(observations), abs=1e-9)
+            assert results[sid]['high'] == max(t for _, t in observations)
+            assert results[sid]['low'] == min(t for _, t in observations)
+
+@pytest.mark.parametrize("observations", [
+    rows((0, 50.0)),                                     # One reading
+    rows((0, 50.0), (10, 52.0), (65, 55.0)),             # Tie: 5 min either side of an hour ago
+    rows((0, 50.0), (0, 51.0), (60, 55.0)),              # Duplicate timestamp: the first copy counts
+    rows((0, 50.0), (60, 51.0), (60, 55.0)),             # Duplicate last reading
+    rows((0, 50.0), (104, 55.0)),                        # 44 min off: inside the 0.75 tolerance
+    rows((0, 50.0), (105, 55.0)),                        # Exactly 45 min off: outside
+    rows((0, 50.0), (15, 50.0)),                         # Nothing near an hour ago
+    rows(*[(m, 50.0 + m / 10) for m in range(0, 300, 5)]),
+])
+def test_edge_cases(observations):
+    assert pace_engine.velocity(observations) == pytest.approx(calculate_velocity(observations), abs=1e-9)
+
+def test_other_lookbacks_scale_to_degrees_per_hour():
+    observations = rows(*[(m, 50.0 + m / 30) for m in range(0, 300, 5)])  # 2 °F per hour, steady
+    arrays = pace_engine.to_arrays(observations)
+    result = pace_engine.analyze_batch({"K": arrays}, lookbacks=(3600, 1800, 10800))["K"]
+    assert result['velocity'] == pytest.approx({3600: 2.0, 1800: 2.0, 10800: 2.0})
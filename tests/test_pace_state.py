@@ -0,0 +1,59 @@
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from weather import pace_state
+from weather.pace_model import calculate_velocity
+
+START = int(datetime(2024, 7, 1, 4, tzinfo=timezone.utc).timestamp())
+
+def stamp(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+def series(seed, readings=300):
+    """Irregular 1-25 minute spacing with the odd long gap, so the tolerance edge is hit too."""
+    rng = random.Random(seed)
+    epoch, temp, rows = START, 60.0, []
+    for _ in range(readings):
+        epoch += rng.choice((60, 300, 300, 600, 1200, 1500, 2700, 5400)) + rng.choice((0, 0, 1, -1)) * 30
+        temp += rng.uniform(-1.5, 1.5)
+        rows.append((epoch, round(temp, 1)))
+    return rows
+
+@pytest.mark.parametrize("seed", range(10))
+def test_streaming_velocity_matches_the_loop(seed):
+    state = pace_state.StationPace()
+    seen = []
+    for epoch, temp in series(seed):
+        assert state.update(epoch, temp)
+        seen.append((stamp(epoch), temp))
+        assert state.velocity() == pytest.approx(calculate_velocity(seen)), len(seen)
+
+def test_equidistant_readings_prefer_the_earlier_one():
+    state = pace_state.StationPace()
+    # 1h before the last reading falls exactly between 50.0 and 52.0
+    for epoch, temp in ((START, 50.0), (START + 600, 52.0), (START + 300 + 3600, 55.0)):
+        state.update(epoch, temp)
+    assert state.velocity() == 5.0
+
+def test_no_reading_near_an_hour_ago_gives_zero():
+    state = pace_state.StationPace()
+    state.update(START, 50.0)
+    state.update(START + 3 * 3600, 60.0)
+    assert state.velocity() == 0.0
+
+def test_duplicates_and_out_of_order_readings_are_ignored():
+    state = pace_state.StationPace()
+    assert state.update(START, 50.0)
+    assert not state.update(START, 51.0)
+    assert not state.update(START - 60, 49.0)
+    assert not state.update(START + 60, None)
+    assert len(state.samples) == 1
+
+def test_checkpoint_round_trip():
+    state = pace_state.StationPace("America/New_York")
+    for epoch, temp in series(3, 40):
+        state.update(epoch, temp)
+    restored = pace_state.StationPace.from_dict(state.to_dict())
+    assert restored.result() == state.result()
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from weather.pipeline import BatchStage, Pipeline, Stage
+
+def test_slow_downstream_stage_holds_the_upstream_back():
+    lock = threading.Lock()
+    state = {'waiting': 0, 'most': 0}
+
+    def produce(item):
+        with lock:
+            state['waiting'] += 1
+            state['most'] = max(state['most'], state['waiting'])
+        return item
+
+    def slow(item):
+        time.sleep(0.005)
+        with lock:
+            state['waiting'] -= 1
+        return item
+
+    pipeline = Pipeline([Stage("fast", produce), Stage("slow", slow, queue_size=2)])
+    assert sorted(pipeline.run(range(40))) == list(range(40))
+
+    # Queued (2) + the one being slept on + the one the fast worker is blocked handing over
+    assert state['most'] <= 4
+    assert pipeline.metrics()['slow']['max_queue_depth'] <= 2
+
+def test_errors_and_drops_are_counted_and_the_stream_keeps_going():
+    def parse(item):
+        if item % 3 == 0:
+            raise ValueError(f"bad item {item}")
+        return None if item % 3 == 1 else item
+
+    pipeline = Pipeline([Stage("parse", parse, workers=3)])
+    assert sorted(pipeline.run(range(30))) == list(range(2, 30, 3))
+
+    stats = pipeline.metrics()['parse']
+    assert (stats['items'], stats['errors'], stats['dropped']) == (30, 10, 10)
+
+def test_batch_stage_flushes_full_batches_and_the_tail():
+    sizes = []
+
+    def write(batch):
+        sizes.append(len(batch))
+        return batch
+
+    pipeline = Pipeline([BatchStage("write", write, batch_size=4, batch_wait=5)])
+    assert pipeline.run(range(10)) == list(range(10))
+    assert sizes == [4, 4, 2]  # The partial batch goes out at end of stream, not after batch_wait
+    assert pipeline.metrics()['write']['items'] == 3
+
+def test_batch_stage_flushes_a_partial_batch_after_batch_wait():
+    sizes = []
+
+    def write(batch):
+        sizes.append(len(batch))
+        return batch
+
+    def trickle():
+        yield from (1, 2)
+        time.sleep(0.3)  # Upstream stalls: what's waiting should be written meanwhile
+        yield 3
+
+    pipeline = Pipeline([BatchStage("write", write, batch_size=100, batch_wait=0.05)])
+    assert pipeline.run(trickle()) == [1, 2, 3]
+    assert sizes == [2, 1]
+
+def test_failed_batch_counts_one_error():
+    def write(batch):
+        raise OSError("disk full")
+
+    pipeline = Pipeline([Stage("parse", lambda item: item), BatchStage("write", write, batch_size=5)])
+    assert pipeline.run(range(10)) == []
+    write_stats = pipeline.metrics()['write']
+    assert write_stats['errors'] == write_stats['items'] >= 2  # One per batch, not per row
+    assert pipeline.metrics()['parse']['items'] == 10
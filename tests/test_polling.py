@@ -0,0 +1,91 @@
+import pytest
+
+from weather import polling
+from weather.polling import AdaptivePoller, StationSchedule, estimate_cadence
+
+HOUR = 3600
+START = 1_700_000_000 - 1_700_000_000 % HOUR  # On the hour
+
+def hourly(count, minute=51, start=START):
+    """Routine reports at :minute past every hour."""
+    return [start + h * HOUR + minute * 60 for h in range(count)]
+
+def test_hourly_station_cadence_and_phase():
+    assert estimate_cadence(hourly(24)) == (HOUR, 51 * 60)
+
+def test_specials_do_not_move_the_routine_phase():
+    epochs = sorted(hourly(24) + [START + 5 * HOUR + 20 * 60, START + 9 * HOUR + 7 * 60])
+    assert estimate_cadence(epochs) == (HOUR, 51 * 60)
+
+def test_five_minute_station():
+    epochs = [START + 60 + 300 * k for k in range(30)]
+    assert estimate_cadence(epochs) == (300, 60)
+
+def test_not_enough_history_keeps_the_default():
+    assert estimate_cadence(hourly(3)) == (polling.DEFAULT_CADENCE, None)
+    # Corrections a few seconds apart aren't gaps
+    assert estimate_cadence([START, START + 10, START + 20, START + 30], default=1200) == (1200, None)
+
+def test_gaps_are_clamped():
+    assert estimate_cadence([START + 120 * k for k in range(10)])[0] == polling.MIN_CADENCE
+    assert estimate_cadence([START + 3 * HOUR * k for k in range(10)])[0] == polling.MAX_INTERVAL
+
+def test_next_poll_is_publish_lag_after_the_expected_report():
+    schedule = StationSchedule(hourly(24))
+    last = schedule.last_epoch
+    assert schedule.expected_report() == last + HOUR
+    now = last + polling.PUBLISH_LAG + 30
+    assert schedule.schedule(now, found_new=True) == last + HOUR + polling.PUBLISH_LAG
+
+def test_overdue_report_backs_off_up_to_the_cadence():
+    schedule = StationSchedule(hourly(24))
+    now = schedule.expected_report() + polling.PUBLISH_LAG
+    waits = []
+    for _ in range(7):
+        due = schedule.schedule(now, found_new=False)
+        waits.append(due - now)
+        now = due
+    assert waits == [polling.RECHECK, 2 * polling.RECHECK, 4 * polling.RECHECK, 8 * polling.RECHECK,
+                     16 * polling.RECHECK, HOUR, HOUR]
+
+def test_probe_goes_out_every_sixth_poll_at_half_cadence():
+    poller = AdaptivePoller()
+    poller.learn("KNYC", hourly(24))
+    epoch = poller.stations["KNYC"].last_epoch
+    probes = []
+    for poll in range(1, 2 * polling.PROBE_EVERY + 1):
+        epoch += HOUR
+        due = poller.record("KNYC", True, epoch=epoch, now=epoch + polling.PUBLISH_LAG)
+        if poller.stations["KNYC"].probing:
+            probes.append(poll)
+            assert due == epoch + HOUR // 2 + polling.PUBLISH_LAG
+        else:
+            assert due == epoch + HOUR + polling.PUBLISH_LAG
+    assert probes == [polling.PROBE_EVERY, 2 * polling.PROBE_EVERY]
+
+def test_probe_that_finds_a_reading_switches_to_the_faster_cadence():
+    schedule = StationSchedule(hourly(24))
+    schedule.polls = polling.PROBE_EVERY - 1
+    last = schedule.last_epoch
+    schedule.schedule(last + polling.PUBLISH_LAG, found_new=True)
+    assert schedule.probing
+
+    assert schedule.add_reading(last + HOUR // 2)
+    assert schedule.cadence == HOUR // 2 and list(schedule.epochs) == [last, last + HOUR // 2]
+
+@pytest.mark.parametrize("velocity, fast", [(3.0, True), (-3.0, True), (1.5, False)])
+def test_fast_interval_while_the_signal_fires(velocity, fast):
+    poller = AdaptivePoller()
+    poller.learn("KNYC", hourly(24))
+    epoch = poller.stations["KNYC"].last_epoch + HOUR
+    now = epoch + polling.PUBLISH_LAG
+    due = poller.record("KNYC", True, epoch=epoch, velocity=velocity, now=now)
+    assert due == (now + polling.FAST_INTERVAL if fast else epoch + HOUR + polling.PUBLISH_LAG)
+
+def test_due_uses_the_given_clock():
+    poller = AdaptivePoller()
+    poller.learn("KNYC", hourly(24))
+    due = poller.record("KNYC", True, epoch=hourly(25)[-1], now=hourly(25)[-1] + polling.PUBLISH_LAG)
+    assert poller.due(["KNYC", "KLAX"], now=due - 1) == ["KLAX"]  # Never seen: due at once
+    assert poller.due(["KNYC", "KLAX"], now=due) == ["KNYC", "KLAX"]
+    assert poller.next_due() == due
@@ -0,0 +1,22 @@
+import time
+
+from weather import http_client
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = http_client.TokenBucket(rate=20, burst=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.05  # The burst goes straight through
+
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - started >= 4 / 20 * 0.9  # Then one token every 1/rate seconds
+
+def test_rate_limiter_keeps_hosts_apart():
+    limiter = http_client.HostRateLimiter(rate=1, burst=1)
+    started = time.monotonic()
+    limiter.acquire("http://a.example/x")
+    limiter.acquire("http://b.example/x")
+    assert time.monotonic() - started < 0.05
@@ -0,0 +1,153 @@
+import asyncio
+import http.client
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from weather import db, read_api, schema, timekeys
+
+STATION = "KTST"  # Not in stations.json: the registry falls back to UTC
+
+def write(path, readings):
+    """readings: [(epoch, temp_f)] for STATION."""
+    writer = db.ObservationWriter(path)
+    for epoch, temp_f in readings:
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(epoch))
+        writer.add((STATION, stamp, temp_f, 60.0, 5.0, "Clear", None))
+    writer.flush()
+    writer.conn.close()
+
+def today_epochs(count):
+    """count distinct epochs from the last few minutes, never before today's UTC midnight."""
+    now = int(time.time())
+    midnight = int(datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+    return sorted({max(midnight + k, now - 60 * k) for k in range(count)})
+
+def get(api, path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", api.port, timeout=5)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "obs.db"), str(tmp_path / "results.db"), str(tmp_path / "archive")
+
+@pytest.fixture
+def api(paths, monkeypatch):
+    monkeypatch.setattr(read_api, "REFRESH_SECONDS", 0.05)
+    obs_path, results_path, archive_dir = paths
+    write(obs_path, [(epoch, 50.0 + i) for i, epoch in enumerate(today_epochs(3))])
+    api = read_api.ReadApi(obs_path, results_path, archive_dir, pool_size=2).start_in_thread()
+    yield api
+    api.loop.call_soon_threadsafe(api.watcher.cancel)
+    api.close()
+
+def wait_for_version(api, version):
+    deadline = time.monotonic() + 5
+    while api.latest.version <= version:
+        assert time.monotonic() < deadline, "the refresh task never saw the write"
+        time.sleep(0.02)
+
+def test_latest_is_columnar_and_revalidates_with_its_etag(api, paths):
+    status, headers, body = get(api, "/latest")
+    assert status == 200 and headers['Content-Type'] == "application/json"
+    latest = json.loads(body)
+    assert list(latest) == read_api.LATEST_SCHEMA.names
+    assert latest['station_id'] == [STATION] and latest['temp_f'] == [52.0]
+
+    etag = headers['ETag']
+    status, _, body = get(api, "/latest", {'If-None-Match': etag})
+    assert (status, body) == (304, b"")
+
+    version = api.latest.version
+    write(paths[0], [(int(time.time()) + 1, 60.0)])
+    wait_for_version(api, version)
+    status, headers, body = get(api, "/latest", {'If-None-Match': etag})
+    assert status == 200 and headers['ETag'] != etag
+    assert json.loads(body)['temp_f'] == [60.0]
+
+def test_arrow_output_matches_the_schema(api):
+    status, headers, body = get(api, f"/latest/{STATION}", {'Accept': read_api.ARROW_TYPE})
+    assert status == 200 and headers['Content-Type'] == read_api.ARROW_TYPE
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.schema == read_api.LATEST_SCHEMA
+    assert table.column('temp_f').to_pylist() == [52.0]
+
+    # ?format= wins over Accept, and each format has its own ETag
+    status, json_headers, _ = get(api, f"/latest/{STATION}?format=json", {'Accept': read_api.ARROW_TYPE})
+    assert status == 200 and json_headers['ETag'] != headers['ETag']
+
+def test_range_returns_requested_columns_oldest_first(api):
+    start = today_epochs(3)[0]
+    status, _, body = get(api, f"/range/{STATION}?start={start}&columns=temp_f,humidity")
+    assert status == 200
+    rows = json.loads(body)
+    assert list(rows) == ['epoch', 'temp_f', 'humidity']
+    assert rows['epoch'] == today_epochs(3) and rows['temp_f'] == [50.0, 51.0, 52.0]
+
+    table = pa.ipc.open_stream(get(api, f"/range/{STATION}?start={start}&format=arrow")[2]).read_all()
+    assert table.column_names == ['epoch', 'temp_f']
+
+    assert get(api, f"/range/{STATION}?columns=raw_json")[0] == 400
+    assert get(api, f"/range/{STATION}?start=2024-01-01&end=2024-03-01")[0] == 400  # Over MAX_RANGE_DAYS
+    assert get(api, "/range/KXXX")[0] == 404
+
+def test_daily_merges_official_results_with_the_rollup(api, paths):
+    today = timekeys.today("UTC")
+    conn = db.connect(paths[1])
+    schema.migrate_results(conn)
+    with conn:
+        conn.execute("INSERT INTO daily_results (station_id, date, high_f, low_f, is_final) VALUES (?, ?, ?, ?, 1)",
+                     (STATION, today, 53.0, 49.0))
+    conn.close()
+
+    status, _, body = get(api, f"/daily/{STATION}?start={today}&end={today}")
+    assert status == 200
+    assert json.loads(body) == {'date': [today], 'high_f': [53.0], 'low_f': [49.0], 'is_final': [True],
+                                'observed_high_f': [52.0], 'observed_low_f': [50.0], 'readings': [3]}
+    assert get(api, f"/daily/{STATION}?start=yesterday")[0] == 400
+
+def test_pace_is_cached_per_write_and_revalidates(api):
+    status, headers, body = get(api, "/pace")
+    assert status == 200
+    pace = json.loads(body)
+    assert list(pace) == read_api.PACE_SCHEMA.names
+    assert pace['station_id'] == [STATION] and pace['current'] == [52.0] and pace['high'] == [52.0]
+    assert pace['signal'][0] in ("SURGE", "PLUNGE", "NORMAL")
+
+    assert get(api, "/pace", {'If-None-Match': headers['ETag']})[0] == 304
+    status, _, body = get(api, f"/pace/{STATION}")
+    assert status == 200 and json.loads(body)['station_id'] == [STATION]
+
+def test_large_delta_becomes_a_reset(paths, monkeypatch):
+    monkeypatch.setattr(read_api, "MAX_DELTA", 2)
+    obs_path, results_path, archive_dir = paths
+    write(obs_path, [(1_700_000_000, 50.0)])
+    api = read_api.ReadApi(obs_path, results_path, archive_dir, pool_size=1)
+    try:
+        api.latest.refresh()
+        subscriber = api.events.subscribe()
+
+        write(obs_path, [(1_700_000_060, 51.0), (1_700_000_120, 52.0)])  # At the limit: pushed as rows
+        assert api.latest.refresh() and len(api.latest.delta) == 2
+        asyncio.run(api.publish_changes())
+
+        write(obs_path, [(1_700_000_000 + 60 * k, 60.0) for k in range(3, 6)])  # Over it: a backfill
+        assert api.latest.refresh() and api.latest.delta is None
+        asyncio.run(api.publish_changes())
+
+        events = []
+        while not subscriber.empty():
+            events.append(subscriber.get_nowait().split(b"\n")[1])
+        assert events[1:] == [b"event: observation", b"event: pace", b"event: reset"]  # After "hello"
+        assert api.latest.get(STATION).column('temp_f').to_pylist() == [60.0]  # Reloaded all the same
+    finally:
+        api.close()
@@ -0,0 +1,124 @@
+import random
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from weather import archive, db, rollups
+
+DAY_START = int(datetime(2024, 3, 5, tzinfo=timezone.utc).timestamp())
+
+def rows(station_id, hours, temp=50.0):
+    return [(station_id, time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(DAY_START + h * 3600)),
+             temp + h, None, None, None, None) for h in hours]
+
+def write(path, archive_dir, batch):
+    writer = db.ObservationWriter(path, archive_dir=archive_dir)
+    for row in batch:
+        writer.add(row)
+    written = writer.flush()
+    writer.conn.close()
+    return written
+
+def daily(path):
+    conn = sqlite3.connect(path)
+    result = conn.execute("SELECT local_date, count, sum_f FROM obs_daily WHERE station_id = 'KNYC'").fetchall()
+    conn.close()
+    return result
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "obs.db"), str(tmp_path / "archive")
+
+def test_backfilling_archived_rows_does_not_double_count(store):
+    path, archive_dir = store
+    write(path, archive_dir, rows("KNYC", range(24)))
+    before = daily(path)
+    assert before[0][1] == 24
+    archive.run_archive(days=14, db_path=path, archive_dir=archive_dir)
+
+    # The backfill runs over the same day again, plus an hour of the next one it missed
+    assert write(path, archive_dir, rows("KNYC", range(25))) == 1
+    assert daily(path)[0] == before[0]
+
+    conn = db.connect(path)
+    rollups.rebuild(conn, archive_dir=archive_dir)
+    conn.close()
+    assert daily(path)[0] == before[0]
+
+def test_rebuild_counts_a_half_archived_row_once(store):
+    path, archive_dir = store
+    write(path, archive_dir, rows("KNYC", range(24)))
+    before = daily(path)
+    conn = db.connect(path)
+    # Archive run that died after writing Parquet but before deleting from SQLite
+    archive.archive_station(conn, "KNYC", DAY_START + 12 * 3600, archive_dir)
+    cold = archive.read_archive("KNYC", archive_dir=archive_dir)
+    assert cold.num_rows == 12
+    write(path, archive_dir + "-elsewhere", rows("KNYC", range(12)))  # Put the deleted rows back in SQLite
+
+    rollups.rebuild(conn, archive_dir=archive_dir)
+    conn.close()
+    assert daily(path) == before
+
+# --- INCREMENTAL == REBUILD ---
+def snapshot(conn):
+    """Both rollup tables, sums rounded so float addition order doesn't matter."""
+    tables = {}
+    for table, bucket in (("obs_hourly", "hour_start"), ("obs_daily", "local_date")):
+        tables[table] = [(*row[:4], round(row[4], 6), *row[5:]) for row in conn.execute(
+            f"SELECT station_id, {bucket}, min_f, max_f, sum_f, count, first_epoch, first_f, last_epoch, last_f "
+            f"FROM {table} ORDER BY station_id, {bucket}")]
+    return tables
+
+def test_incremental_rollups_equal_a_full_rebuild(store):
+    path, archive_dir = store
+    rng = random.Random(7)
+    timezones = {"KNYC": "America/New_York", "KLAX": "America/Los_Angeles"}
+    writer = db.ObservationWriter(path, timezones=timezones, archive_dir=archive_dir)
+    written = {}  # (station_id, timestamp) -> temp, everything sent so far
+    for _ in range(40):
+        batch = []
+        for _ in range(rng.randint(1, 30)):
+            station_id = rng.choice(("KNYC", "KLAX"))
+            minute = rng.randrange(0, 4 * 24 * 60, 5)  # Four days, across local midnights
+            stamp = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(DAY_START + minute * 60))
+            key = (station_id, stamp)
+            if key in written and rng.random() < 0.5:
+                temp = written[key]  # A re-fetch of the same reading
+            else:
+                temp = round(rng.uniform(20, 80), 1)  # New, or a correction of an old one
+            written[key] = temp
+            batch.append((station_id, stamp, temp, None, None, None, None))
+        for row in batch:
+            writer.add(row)
+        writer.flush()
+
+    incremental = snapshot(writer.conn)
+    assert sum(row[5] for row in incremental["obs_daily"]) == len(written)
+    rollups.rebuild(writer.conn, archive_dir=archive_dir)
+    assert snapshot(writer.conn) == incremental
+    writer.conn.close()
+
+def test_correction_moves_min_max_and_last(store):
+    path, archive_dir = store
+    write(path, archive_dir, rows("KNYC", range(3)))  # 50, 51, 52
+    write(path, archive_dir, [("KNYC", rows("KNYC", [2])[0][1], 10.0, None, None, None, None)])
+    conn = sqlite3.connect(path)
+    day = conn.execute("SELECT min_f, max_f, sum_f, count, last_f FROM obs_daily WHERE station_id = 'KNYC'").fetchone()
+    conn.close()
+    assert day == (10.0, 51.0, 111.0, 3, 10.0)
+
+def test_archiving_drops_only_orphaned_payloads(store):
+    path, archive_dir = store
+    bodies = ['{"hour": 0}', '{"shared": 1}', '{"hour": 2}', '{"shared": 1}']
+    write(path, archive_dir, [row[:6] + (body,) for row, body in zip(rows("KNYC", range(4)), bodies)])
+
+    conn = sqlite3.connect(path)
+    archive.archive_station(conn, "KNYC", DAY_START + 2 * 3600, archive_dir)  # Hours 0 and 1 go cold
+    left = {digest for (digest,) in conn.execute("SELECT hash FROM raw_payloads")}
+    # Hour 0's payload is orphaned; hour 1's is still linked from hour 3
+    assert left == {db.pack_payload(body)[0] for body in bodies[1:]}
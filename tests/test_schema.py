@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from weather import db, schema
+
+def test_hot_queries_use_an_index():
+    conn = sqlite3.connect(":memory:")
+    schema.migrate_observations(conn)
+    bad = [(name, plan) for name, plan, ok in schema.check_query_plans(conn) if not ok]
+    conn.close()
+    assert not bad, f"Full scan or temp sort in: {bad}"
+
+def test_legacy_duplicates_are_compacted_and_made_impossible():
+    conn = sqlite3.connect(":memory:")
+    # The table as the old collector created it, with the same /latest reading saved every cycle
+    conn.execute('''
+        CREATE TABLE observations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, station_id TEXT NOT NULL, timestamp TEXT NOT NULL, temp_f REAL
+        )
+    ''')
+    conn.executemany("INSERT INTO observations (station_id, timestamp, temp_f) VALUES (?, ?, ?)",
+                     [("KNYC", "2024-03-05T12:00:00+00:00", 50.0)] * 3 + [("KNYC", "2024-03-05T13:00:00+00:00", 51.0)])
+    conn.commit()
+
+    schema.migrate_observations(conn)
+    assert conn.execute("SELECT id, temp_f FROM observations ORDER BY id").fetchall() == [(1, 50.0), (4, 51.0)]
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO observations (station_id, timestamp) VALUES ('KNYC', '2024-03-05T12:00:00+00:00')")
+
+def test_migrations_are_idempotent():
+    conn = sqlite3.connect(":memory:")
+    schema.migrate_observations(conn)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    assert version == len(schema.OBSERVATIONS_MIGRATIONS)
+    schema.migrate_observations(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == version
+
+def test_refetched_reading_is_stored_once(tmp_path):
+    path = str(tmp_path / "obs.db")
+    writer = db.ObservationWriter(path)
+    row = ("KNYC", "2024-03-05T12:00:00+00:00", 50.0, 80.0, 5.0, "Fog", None)
+    for _ in range(3):
+        writer.add(row)
+        writer.flush()
+    assert writer.conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0] == 1
+    writer.conn.close()
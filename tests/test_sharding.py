@@ -0,0 +1,65 @@
+from weather import sharding
+
+STATIONS = [f"KB{i:03d}" for i in range(40)]
+
+# --- HASH RING ---
+def test_ring_spreads_stations_over_workers():
+    ring = sharding.HashRing(["a", "b", "c"])
+    many = [f"K{i:04d}" for i in range(3000)]
+    counts = {node: sum(ring.owner(sid) == node for sid in many) for node in "abc"}
+    assert all(600 < count < 1400 for count in counts.values()), counts
+
+def test_adding_a_worker_only_moves_its_share():
+    many = [f"K{i:04d}" for i in range(3000)]
+    before = sharding.HashRing(["a", "b", "c"])
+    after = sharding.HashRing(["a", "b", "c", "d"])
+    moved = [sid for sid in many if before.owner(sid) != after.owner(sid)]
+    assert all(after.owner(sid) == "d" for sid in moved)  # Nothing shuffles between a, b and c
+    assert len(moved) < len(many) / 2
+
+def test_empty_ring_owns_nothing():
+    assert sharding.HashRing([]).owner("KNYC") is None
+
+# --- LEASES ---
+
+def test_two_live_workers_split_the_stations(tmp_path):
+    path = str(tmp_path / "obs.db")
+    a, b = sharding.ShardWorker("a", path), sharding.ShardWorker("b", path)
+    now = 1_000_000.0
+    a.heartbeat(now)
+    b.heartbeat(now)
+
+    held_a, held_b = a.claim(STATIONS, now), b.claim(STATIONS, now)
+    assert held_a and held_b
+    assert not set(held_a) & set(held_b)
+    assert set(held_a) | set(held_b) == set(STATIONS)
+
+def test_dead_workers_stations_are_taken_over_once_leases_expire(tmp_path):
+    path = str(tmp_path / "obs.db")
+    a, b = sharding.ShardWorker("a", path), sharding.ShardWorker("b", path)
+    now = 1_000_000.0
+    a.heartbeat(now)
+    assert sorted(a.claim(STATIONS, now)) == STATIONS  # Alone on the ring: everything
+
+    # b joins while a is still alive: the ring gives b a share, but a's leases still stand
+    b.heartbeat(now + 1)
+    assert b.claim(STATIONS, now + 1) == []
+
+    # a stops heartbeating. Once it's off the ring and its leases ran out, b takes everything.
+    later = now + max(sharding.WORKER_TTL, sharding.LEASE_SECONDS) + 1
+    b.heartbeat(later)
+    assert sorted(b.claim(STATIONS, later)) == STATIONS
+    assert a.claim(STATIONS, later) == []  # A late a finds its stations leased to b
+
+def test_clean_stop_hands_leases_back_immediately(tmp_path):
+    path = str(tmp_path / "obs.db")
+    a, b = sharding.ShardWorker("a", path), sharding.ShardWorker("b", path)
+    now = 1_000_000.0
+    a.heartbeat(now)
+    a.claim(STATIONS, now)
+    assert a.claim_job("cli_check", now)
+    a.release_all()
+
+    b.heartbeat(now + 1)
+    assert sorted(b.claim(STATIONS, now + 1)) == STATIONS
+    assert b.claim_job("cli_check", now + 1)
@@ -0,0 +1,48 @@
+import json
+import logging
+import os
+
+import pytest
+
+from weather import station_registry
+
+CONFIG = {"stations": {"CENTRAL_PARK_NY": {"station_id": "KNYC", "name": "Central Park", "timezone": "America/New_York",
+                                          "cli_code": "NYC", "wfo": "OKX"}}}
+
+def write(path, content, mtime_ns):
+    path.write_text(content if isinstance(content, str) else json.dumps(content))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_lookups(tmp_path):
+    path = tmp_path / "stations.json"
+    write(path, CONFIG, 1_000_000_000)
+    registry = station_registry.load(str(path))
+    assert registry.get("KNYC")["name"] == "Central Park"
+    assert registry.timezone("KNYC") == "America/New_York"
+    assert station_registry.load(str(path)) is registry  # Cached by mtime
+
+def test_bad_edit_is_reported_once_and_the_last_good_config_kept(tmp_path, monkeypatch, caplog):
+    path = tmp_path / "stations.json"
+    write(path, CONFIG, 1_000_000_000)
+    good = station_registry.load(str(path))
+
+    write(path, "{ not json", 2_000_000_000)
+    reads = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda *a, **k: reads.append(a[0]) or real_open(*a, **k))
+    with caplog.at_level(logging.ERROR, logger=station_registry.__name__):
+        for _ in range(5):
+            assert station_registry.load(str(path)) is good
+    assert len(reads) == 1
+    assert sum("Invalid station config" in r.getMessage() for r in caplog.records) == 1
+
+    monkeypatch.undo()
+    fixed = dict(CONFIG, stations={**CONFIG["stations"], "LAX": {"station_id": "KLAX", "name": "LAX"}})
+    write(path, fixed, 3_000_000_000)
+    assert station_registry.load(str(path)).get("KLAX") is not None
+
+def test_first_load_of_a_bad_file_raises(tmp_path):
+    path = tmp_path / "stations.json"
+    write(path, "[]", 1_000_000_000)
+    with pytest.raises(ValueError):
+        station_registry.load(str(path))
@@ -0,0 +1,242 @@
+"""
+Columnar archive for old observations.
+
+Rows older than ARCHIVE_AFTER_DAYS move out of SQLite into Parquet files
+partitioned by station and UTC month:
+
+    data/archive/station_id=KNYC/month=2024-01/data.parquet
+
+Each file is sorted by epoch seconds, so a time filter only touches the row
+groups it needs. query() is the one read path for both tiers: it opens only
+the partitions whose month overlaps the range (or the station-local day),
+reads only the requested columns, and merges in whatever is still in the hot
+SQLite store. Both tiers carry the epoch / local_date keys set at ingest, so
+nothing is parsed on the way out.
+
+    python -m weather.archive --days 14
+"""
+import argparse
+import os
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from weather import db, logs
+
+# --- CONFIGURATION ---
+ARCHIVE_DIR = os.path.join(db.BASE_DIR, 'data', 'archive')
+ARCHIVE_AFTER_DAYS = 14
+DAY = 86400
+ROW_GROUP_SIZE = 8192
+
+SCHEMA = pa.schema([
+    ('epoch', pa.int64()),        # UTC seconds, parsed once on the way in
+    ('timestamp', pa.string()),   # As the API reported it
+    ('local_date', pa.string()),  # YYYY-MM-DD in the station's timezone
+    ('temp_f', pa.float64()),
+    ('humidity', pa.float64()),
+    ('wind_speed', pa.float64()),
+    ('description', pa.string()),
+    ('payload', pa.binary()),     # zlib-compressed raw response, see payloads.py
+])
+DEFAULT_COLUMNS = ('epoch', 'temp_f')
+
+log = logs.get_logger(__name__)
+
+def month_of(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m")
+
+def partition_path(station_id, month, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, f"station_id={station_id}", f"month={month}", "data.parquet")
+
+def partitions(station_id, start_epoch=None, end_epoch=None, archive_dir=ARCHIVE_DIR):
+    """Existing partition files for one station whose month overlaps [start_epoch, end_epoch)."""
+    station_dir = os.path.join(archive_dir, f"station_id={station_id}")
+    try:
+        months = sorted(name[len("month="):] for name in os.listdir(station_dir) if name.startswith("month="))
+    except FileNotFoundError:
+        return []
+
+    first = month_of(start_epoch) if start_epoch is not None else None
+    last = month_of(end_epoch - 1) if end_epoch is not None else None
+    paths = []
+    for month in months:
+        if (first and month < first) or (last and month > last):
+            continue
+        path = partition_path(station_id, month, archive_dir)
+        if os.path.exists(path):
+            paths.append(path)
+    return paths
+
+def _filters(start_epoch, end_epoch, local_date):
+    filters = []
+    if start_epoch is not None:
+        filters.append(('epoch', '>=', start_epoch))
+    if end_epoch is not None:
+        filters.append(('epoch', '<', end_epoch))
+    if local_date is not None:
+        filters.append(('local_date', '=', local_date))
+    return filters or None
+
+def _day_range(local_date):
+    """A UTC epoch range that contains every instant of a local date, in any timezone."""
+    midnight = int(datetime.strptime(local_date, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    return midnight - DAY, midnight + 2 * DAY
+
+def _with_epoch(columns):
+    columns = [c for c in columns if c != 'payload']
+    return columns if 'epoch' in columns else ['epoch', *columns]
+
+# --- READ PATH ---
+def read_archive(station_id, start_epoch=None, end_epoch=None, columns=DEFAULT_COLUMNS,
+                 archive_dir=ARCHIVE_DIR, local_date=None):
+    """Archived rows for one station as an Arrow table, sorted by epoch."""
+    read_columns = list(columns) if 'epoch' in columns else ['epoch', *columns]
+    if local_date is not None:
+        start_epoch, end_epoch = _day_range(local_date)
+    tables = [
+        pq.read_table(path, columns=read_columns, filters=_filters(start_epoch, end_epoch, local_date))
+        for path in partitions(station_id, start_epoch, end_epoch, archive_dir)
+    ]
+    if not tables:
+        return SCHEMA.empty_table().select(read_columns)
+    return pa.concat_tables(tables)  # Partitions are month-ordered and each is sorted
+
+def read_hot(conn, station_id, start_epoch=None, end_epoch=None, columns=DEFAULT_COLUMNS, local_date=None):
+    """Rows still in SQLite for one station, same shape as read_archive()."""
+    read_columns = _with_epoch(columns)
+    sql = f"SELECT {', '.join(read_columns)} FROM observations WHERE station_id = ?"
+    params = [station_id]
+    if local_date is not None:
+        sql += " AND local_date = ?"
+        params.append(local_date)
+    if start_epoch is not None:
+        sql += " AND epoch >= ?"
+        params.append(start_epoch)
+    if end_epoch is not None:
+        sql += " AND epoch < ?"
+        params.append(end_epoch)
+    rows = conn.execute(sql + " ORDER BY epoch", params).fetchall()
+
+    schema = pa.schema([SCHEMA.field(c) for c in read_columns])
+    return pa.Table.from_pylist([dict(zip(read_columns, row)) for row in rows], schema=schema)
+
+def query(station_id, start_epoch=None, end_epoch=None, columns=DEFAULT_COLUMNS,
+          conn=None, db_path=db.OBS_DB_PATH, archive_dir=ARCHIVE_DIR, local_date=None):
+    """
+    Every reading for one station in [start_epoch, end_epoch) and/or on one
+    station-local date, from both tiers, as a DataFrame sorted by epoch.
+    Only the partitions and columns needed are read.
+    """
+    read_columns = _with_epoch(columns)
+    cold = read_archive(station_id, start_epoch, end_epoch, read_columns, archive_dir, local_date)
+
+    own_conn = conn is None
+    if own_conn:
+        conn = db.connect(db_path, read_only=True)
+    try:
+        hot = read_hot(conn, station_id, start_epoch, end_epoch, read_columns, local_date)
+    finally:
+        if own_conn:
+            conn.close()
+
+    frame = pa.concat_tables([cold, hot]).to_pandas()
+    if cold.num_rows and hot.num_rows:
+        # A run interrupted between the Parquet write and the SQLite delete leaves both copies
+        frame = frame.drop_duplicates('epoch', keep='last').sort_values('epoch', kind='stable')
+    return frame.reset_index(drop=True)
+
+# --- WRITE PATH ---
+def _write_partition(path, table):
+    """Merges new rows into one partition file; tmp file + os.replace, so readers never see half a file."""
+    if os.path.exists(path):
+        table = pa.concat_tables([pq.read_table(path), table])
+    table = table.sort_by('epoch')
+    frame = table.to_pandas().drop_duplicates('epoch', keep='last')
+    table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression='zstd')
+    os.replace(tmp, path)
+
+def _delete(conn, ids, hashes):
+    with conn:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            conn.execute(f"DELETE FROM observations WHERE id IN ({placeholders})", chunk)
+            conn.execute(f"DELETE FROM observation_payloads WHERE observation_id IN ({placeholders})", chunk)
+            conn.execute(f"DELETE FROM observation_corrections WHERE observation_id IN ({placeholders})", chunk)
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            # One idx_payload_hash lookup per candidate, not a scan of every link
+            conn.execute(f'''
+                DELETE FROM raw_payloads
+                WHERE hash IN ({placeholders})
+                  AND NOT EXISTS (SELECT 1 FROM observation_payloads WHERE payload_hash = raw_payloads.hash)
+            ''', chunk)
+
+def archive_station(conn, station_id, cutoff_epoch, archive_dir=ARCHIVE_DIR):
+    """Moves one station's rows older than cutoff_epoch to Parquet. Returns the number moved."""
+    rows = conn.execute('''
+        SELECT o.id, o.epoch, o.timestamp, o.local_date, o.temp_f, o.humidity, o.wind_speed, o.description,
+               p.hash, p.body
+        FROM observations o
+        LEFT JOIN observation_payloads op ON op.observation_id = o.id
+        LEFT JOIN raw_payloads p ON p.hash = op.payload_hash
+        WHERE o.station_id = ? AND o.epoch < ?
+    ''', (station_id, cutoff_epoch)).fetchall()
+    if not rows:
+        return 0
+
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(month_of(row[1]), []).append(row)
+    for month, part in by_month.items():
+        table = pa.Table.from_pylist(
+            [dict(zip(SCHEMA.names, (*row[1:8], row[9]))) for row in part], schema=SCHEMA
+        )
+        _write_partition(partition_path(station_id, month, archive_dir), table)
+
+    # Only once the Parquet files are in place do the rows leave SQLite
+    _delete(conn, [row[0] for row in rows], {row[8] for row in rows if row[8]})
+    return len(rows)
+
+def run_archive(days=ARCHIVE_AFTER_DAYS, db_path=db.OBS_DB_PATH, archive_dir=ARCHIVE_DIR, now=None):
+    """Archives every station's rows older than `days`. Returns the number of rows moved."""
+    now = now or datetime.now(timezone.utc)
+    cutoff_epoch = int(now.timestamp()) - days * DAY
+    conn = db.connect(db_path)
+    try:
+        station_ids = [row[0] for row in conn.execute("SELECT station_id FROM stations ORDER BY station_id")]
+        moved = 0
+        for station_id in station_ids:
+            count = archive_station(conn, station_id, cutoff_epoch, archive_dir)
+            if count:
+                log.info("🗄️  %s: archived %d rows", station_id, count, extra={"station": station_id})
+            moved += count
+        return moved
+    finally:
+        conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old observations from SQLite to the Parquet archive")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="Keep this many days in SQLite")
+    parser.add_argument("--vacuum", action="store_true", help="Shrink the SQLite file afterwards")
+    args = parser.parse_args(argv)
+    logs.setup()
+
+    moved = run_archive(args.days)
+    log.info("✅ Archived %d rows older than %d days.", moved, args.days)
+    if args.vacuum and moved:
+        conn = db.connect(db.OBS_DB_PATH)
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Bulk history importer.
+
+Pages through /stations/{id}/observations?start=&end= for a range of
+stations and dates and streams the rows into SQLite in large transactions.
+The work is split into (station, week) chunks that are fetched concurrently;
+finished chunks are recorded in a checkpoint file so an interrupted run picks
+up where it stopped. Rows already in the table are skipped by the writer's
+upsert, so re-running a range is harmless.
+
+    python -m weather.backfill --start 2024-01-01 --end 2024-03-31
+    python -m weather.backfill --stations KNYC,KLAX --start 2024-06-01 --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+from weather import db, http_client, live_observations, station_registry
+
+# --- CONFIGURATION ---
+CHECKPOINT_PATH = os.path.join(db.BASE_DIR, 'data', 'backfill_checkpoint.json')
+CHUNK_DAYS = 7       # One unit of work = one station, one week
+PAGE_LIMIT = 500     # Features per page
+BATCH_ROWS = 5000    # Rows per write transaction
+MAX_WORKERS = 4
+IN_FLIGHT_PER_WORKER = 2  # Chunks submitted ahead per worker; finished ones are written and dropped
+
+def make_chunks(station_ids, start, end, chunk_days=CHUNK_DAYS):
+    """[(station_id, chunk_start, chunk_end)] covering [start, end) for every station."""
+    chunks = []
+    for sid in station_ids:
+        cursor = start
+        while cursor < end:
+            chunk_end = min(cursor + timedelta(days=chunk_days), end)
+            chunks.append((sid, cursor, chunk_end))
+            cursor = chunk_end
+    return chunks
+
+def chunk_key(chunk):
+    sid, start, end = chunk
+    return f"{sid}|{start.isoformat()}|{end.isoformat()}"
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            return set(json.load(f)['done'])
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return set()
+
+def save_checkpoint(path, done):
+    """Atomic write so a crash never leaves a half-written checkpoint."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'done': sorted(done)}, f)
+    os.replace(tmp, path)
+
+def fetch_chunk(client, chunk, api_base=None):
+    """
+    Follows pagination.next until a chunk is exhausted.
+    Returns the rows for the observations table (raw payload included).
+    """
+    sid, start, end = chunk
+    api_base = api_base or live_observations.API_BASE
+    url = (f"{api_base}/stations/{sid}/observations"
+           f"?start={start.strftime('%Y-%m-%dT%H:%M:%SZ')}&end={end.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+           f"&limit={PAGE_LIMIT}")
+
+    rows = []
+    seen_urls = set()
+    while url and url not in seen_urls:
+        seen_urls.add(url)
+        response = client.get(url, timeout=30, retries=live_observations.FETCH_RETRIES)
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code} for {url}")
+
+        page = response.json()
+        features = page.get('features', [])
+        for feature in features:
+            row = live_observations.parse_observation(sid, feature)
+            if row[2] is not None:
+                rows.append(row)
+
+        if not features:
+            break
+        url = page.get('pagination', {}).get('next')
+    return rows
+
+def run_backfill(station_ids, start, end, workers=MAX_WORKERS, checkpoint_path=CHECKPOINT_PATH,
+                 db_path=db.OBS_DB_PATH, client=None):
+    """Imports [start, end) for each station. Returns the number of rows written."""
+    client = client or http_client.HttpClient(
+        live_observations.HEADERS["User-Agent"], rate=live_observations.REQUESTS_PER_SECOND,
+        burst=workers, pool_size=workers,
+    )
+    writer = db.ObservationWriter(db_path, timezones=station_registry.load().timezones)
+    done = load_checkpoint(checkpoint_path)
+
+    chunks = [c for c in make_chunks(station_ids, start, end) if chunk_key(c) not in done]
+    print(f"--- BACKFILL: {len(station_ids)} stations, {start.date()} -> {end.date()}, "
+          f"{len(chunks)} chunks to go ({len(done)} already done) ---")
+
+    written = 0
+    pending_keys = []
+    started = time.monotonic()
+
+    def flush():
+        # Rows and checkpoint advance together: a chunk is only marked done once it's committed
+        nonlocal written
+        written += writer.flush()
+        done.update(pending_keys)
+        pending_keys.clear()
+        save_checkpoint(checkpoint_path, done)
+
+    remaining = iter(chunks)
+    in_flight = {}  # Future -> chunk; a finished chunk's rows are released as soon as they're written
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def top_up():
+            while len(in_flight) < workers * IN_FLIGHT_PER_WORKER:
+                chunk = next(remaining, None)
+                if chunk is None:
+                    return
+                in_flight[pool.submit(fetch_chunk, client, chunk)] = chunk
+
+        top_up()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                chunk = in_flight.pop(future)
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    print(f"❌ {chunk[0]} {chunk[1].date()}: {e} (will retry on next run)")
+                    continue
+
+                for row in rows:
+                    writer.add(row)
+                pending_keys.append(chunk_key(chunk))
+                print(f"✅ {chunk[0]} {chunk[1].date()} -> {chunk[2].date()}: {len(rows)} rows")
+
+                if len(writer.pending) >= BATCH_ROWS:
+                    flush()
+            top_up()
+
+    flush()
+    writer.conn.close()
+    elapsed = time.monotonic() - started
+    print(f"⏱️  Backfill wrote {written} rows in {elapsed:.1f}s")
+    return written
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill observation history from api.weather.gov")
+    parser.add_argument("--stations", help="Comma-separated station ids (default: every configured station)")
+    parser.add_argument("--start", required=True, type=parse_day, help="First day, YYYY-MM-DD (UTC)")
+    parser.add_argument("--end", type=parse_day, help="Day after the last one, YYYY-MM-DD (default: today)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    args = parser.parse_args(argv)
+
+    if args.stations:
+        station_ids = [s.strip() for s in args.stations.split(",") if s.strip()]
+    else:
+        station_ids = station_registry.load().station_ids()
+
+    # Midnight UTC, not now: the last chunk's checkpoint key must be the same on every rerun today
+    end = args.end or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    run_backfill(station_ids, args.start, end, workers=args.workers, checkpoint_path=args.checkpoint)
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,220 @@
-import requests
-import re
-import sqlite3
-import json
 import os
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+from weather import db, schema, http_client, cli_parser, logs, metrics, station_registry
 
 # --- CONFIGURATION ---
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'stations.json')
-DB_PATH = os.path.join(BASE_DIR, 'data', 'daily_results.db')
+DB_PATH = db.RESULTS_DB_PATH
+ISSUANCE_DELAY = timedelta(hours=1, minutes=30)  # Final CLI usually lands ~1 AM local standard time
+RETRY_BASE = 5 * 60      # First retry after 5 minutes, doubling each time...
+RETRY_MAX = 60 * 60      # ...up to once an hour
+MAX_WORKERS = 6
+FETCH_TIMEOUT = 10       # Seconds per attempt
+FETCH_RETRIES = 1        # One more try on a timeout / 429 / 5xx before falling back on the retry schedule
+CHECK_DEADLINE = 120     # Seconds one run_cli_check may spend fetching
+CLI_BASE = os.environ.get("NWS_CLI_BASE", "https://forecast.weather.gov")  # Point at a stub server for testing
+
+_conn = None  # Persistent results connection, see get_connection()
+_clients = {}  # One HttpClient per user agent, see get_client()
+_retries = {}  # (station_id, date) -> (attempts, next attempt epoch)
 
-def load_config():
-    with open(CONFIG_PATH, 'r') as f:
-        return json.load(f)
+log = logs.get_logger(__name__)
+FETCH_SECONDS = metrics.histogram("cli_fetch_seconds", "CLI product fetch")
+PARSE_SECONDS = metrics.histogram("cli_parse_seconds", "CLI report parse", buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
+RESULTS = metrics.counter("cli_results_total", "daily_results rows saved, by final / preliminary")
+RETRIES = metrics.counter("cli_retries_total", "Station-days put back on the retry schedule")
+PENDING = metrics.gauge("cli_pending_stations", "Station-days still waiting for a final report")
 
-def fetch_cli_html(wfo, cli_code, user_agent):
+def get_client(user_agent):
+    if user_agent not in _clients:
+        _clients[user_agent] = http_client.HttpClient(user_agent)
+    return _clients[user_agent]
+
+@metrics.timed(FETCH_SECONDS)
+def fetch_cli_text(wfo, cli_code, user_agent, deadline=None):
     """
-    Fetches the HTML page using the specific CLI code (e.g., LAX, NYC).
-    URL: https://forecast.weather.gov/product.php?site=LOX&product=CLI&issuedby=LAX
+    Fetches the plain-text CLI report using the specific CLI code (e.g., LAX, NYC).
+    URL: https://forecast.weather.gov/product.php?site=LOX&product=CLI&issuedby=LAX&format=txt
+    format=txt skips the HTML page entirely (see debug_cli.py).
+    An unchanged report (HTTP 304) is read back from the response cache: the
+    last fetch may never have been parsed or saved (a crash, a restart that
+    lost the retry schedule), and save_results skips it if nothing changed.
+    Returns None if it couldn't be fetched; the caller's retry schedule takes
+    it from there.
     """
-    url = f"https://forecast.weather.gov/product.php?site={wfo}&product=CLI&issuedby={cli_code}"
-    
-    headers = {"User-Agent": user_agent}
+    url = f"{CLI_BASE}/product.php?site={wfo}&product=CLI&issuedby={cli_code}&format=txt"
     
     try:
-        print(f"   -> Fetching: {url}")
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        log.debug("   -> Fetching: %s", url)
+        response = get_client(user_agent).get(url, conditional=True, timeout=FETCH_TIMEOUT,
+                                              retries=FETCH_RETRIES, deadline=deadline)
+        if response.not_modified:
+            log.debug("   -> 💤 %s report unchanged since last check.", cli_code, extra={"cli_code": cli_code})
+        elif response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
         
-        # EXTRACT THE TEXT INSIDE THE <pre> TAG
-        # The report is always wrapped in <pre> tags on this page.
-        html_content = response.text
-        match = re.search(r'<pre[^>]*>(.*?)</pre>', html_content, re.DOTALL)
-        
-        if match:
-            return match.group(1) # Return just the text inside
-        else:
-            print("   -> ⚠️ Loaded page, but could not find <pre> tag.")
-            return None
+        # Still tolerates an HTML page (only the <pre> block is kept)
+        return cli_parser.extract_text(response.text)
 
+    except (http_client.CircuitOpenError, http_client.DeadlineExceeded) as e:
+        log.warning("⏳ Skipping %s: %s", cli_code, e, extra={"cli_code": cli_code})
+        return None
     except Exception as e:
-        print(f"❌ Error fetching {cli_code}: {e}")
+        log.error("❌ Error fetching %s: %s", cli_code, e, extra={"cli_code": cli_code})
         return None
 
+@metrics.timed(PARSE_SECONDS)
 def parse_cli_text(text):
     """
     Scans the text report for Max/Min temperatures.
+    Returns (max_temp, min_temp); see cli_parser.parse_cli_report for the full record.
     """
-    if not text:
-        return None, None
+    return cli_parser.high_low(cli_parser.parse_cli_report(text))
 
-    lines = text.split('\n')
-    max_temp = None
-    min_temp = None
-    
-    for line in lines:
-        clean_line = line.upper().strip()
-        
-        if "FORECAST" in clean_line: continue
-
-        # LOOK FOR HIGH
-        # Matches "MAXIMUM... 82", "MAX TEMP... 82"
-        if "MAX" in clean_line and ("TEMP" in clean_line or "YESTERDAY" in clean_line):
-            numbers = re.findall(r"[-+]?\d*\.\d+|\d+", clean_line)
-            if numbers and max_temp is None:
-                try:
-                    val = float(numbers[0])
-                    if -40 < val < 135: max_temp = val
-                except: pass
-
-        # LOOK FOR LOW
-        if "MIN" in clean_line and ("TEMP" in clean_line or "YESTERDAY" in clean_line):
-            numbers = re.findall(r"[-+]?\d*\.\d+|\d+", clean_line)
-            if numbers and min_temp is None:
-                try:
-                    val = float(numbers[0])
-                    if -40 < val < 135: min_temp = val
-                except: pass
-                    
-        if max_temp is not None and min_temp is not None:
-            break
-            
-    return max_temp, min_temp
-
-def save_result(station_id, date_str, high, low):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def get_connection():
+    global _conn
+    if _conn is None:
+        _conn = db.connect(DB_PATH)
+        schema.migrate_results(_conn)
+    return _conn
+
+def save_results(results):
+    """
+    Saves a batch of (station_id, date, high, low, is_final) rows in one
+    transaction. Rows identical to what's stored are skipped (and not logged).
+    """
+    if not results: return
+
+    conn = get_connection()
     try:
-        cursor.execute('''
-            INSERT OR REPLACE INTO daily_results (station_id, date, high_f, low_f, is_final)
-            VALUES (?, ?, ?, ?, 1)
-        ''', (station_id, date_str, high, low))
-        print(f"✅ LOCKED: {station_id} | High: {high}°F | Low: {low}°F | Date: {date_str}")
-        conn.commit()
+        with conn:
+            results = [row for row in results if conn.execute(
+                "SELECT high_f, low_f, is_final FROM daily_results WHERE station_id = ? AND date = ?", row[:2]
+            ).fetchone() != tuple(row[2:])]
+            conn.executemany('''
+                INSERT OR REPLACE INTO daily_results (station_id, date, high_f, low_f, is_final)
+                VALUES (?, ?, ?, ?, ?)
+            ''', results)
+        for station_id, date_str, high, low, is_final in results:
+            RESULTS.inc(final=str(bool(is_final)).lower())
+            status = "✅ LOCKED" if is_final else "📝 PRELIMINARY"
+            log.info("%s: %s | High: %s°F | Low: %s°F | Date: %s", status, station_id, high, low, date_str,
+                     extra={"station": station_id, "date": date_str, "final": bool(is_final)})
     except Exception as e:
-        print(f"❌ Database Error: {e}")
-    finally:
-        conn.close()
+        log.error("❌ Database Error: %s", e)
+
+def save_result(station_id, date_str, high, low, is_final=1):
+    save_results([(station_id, date_str, high, low, is_final)])
+
+def get_locked(pairs):
+    """Which of these (station_id, date) pairs already have a final result."""
+    if not pairs: return set()
+    conn = get_connection()
+    dates = sorted({date for _, date in pairs})
+    placeholders = ",".join("?" * len(dates))
+    rows = conn.execute(
+        f"SELECT station_id, date FROM daily_results WHERE is_final = 1 AND date IN ({placeholders})",
+        dates,
+    ).fetchall()
+    return set(rows) & set(pairs)
+
+def target_date(station, now=None):
+    """
+    The day whose final report we're waiting for, in the station's own timezone.
+    The report for day D is expected from ISSUANCE_DELAY after local midnight on D+1.
+    """
+    now = now or datetime.now(timezone.utc)
+    local = now.astimezone(station_registry.load().zone(station['station_id'], station.get('timezone', 'UTC')))
+    return ((local - ISSUANCE_DELAY).date() - timedelta(days=1)).isoformat()
+
+def due_stations(stations, now=None):
+    """[(station, date)] that are past their issuance time, not locked, and not backing off."""
+    now = now or datetime.now(timezone.utc)
+    candidates = []
+    for station in stations:
+        if not station.get('cli_code'):
+            continue
+        candidates.append((station, target_date(station, now)))
+
+    locked = get_locked([(station['station_id'], date) for station, date in candidates])
+    due = []
+    for station, date in candidates:
+        key = (station['station_id'], date)
+        if key in locked:
+            _retries.pop(key, None)  # Locked: never poll this one again
+            continue
+        attempts, next_try = _retries.get(key, (0, 0))
+        if now.timestamp() >= next_try:
+            due.append((station, date))
+    return due
+
+def check_station(station, date, user_agent, deadline=None):
+    """Fetch + parse one station. Returns a daily_results row, or None if nothing usable."""
+    cli_code = station['cli_code']
+    raw_text = fetch_cli_text(station['wfo'], cli_code, user_agent, deadline)
+    if not raw_text:
+        return None
+
+    with PARSE_SECONDS.time():
+        report = cli_parser.parse_cli_report(raw_text)
+    high, low = cli_parser.high_low(report)
+    if high is None or low is None:
+        log.warning("⚠️  Found report for %s but could not parse temps.", cli_code, extra={"cli_code": cli_code})
+        return None
+
+    # The report says which day it covers; trust that over our clock
+    return (station['station_id'], report['date'] or date, high, low, int(report['is_final']))
+
+def schedule_retry(key):
+    attempts, _ = _retries.get(key, (0, 0))
+    delay = min(RETRY_BASE * 2 ** attempts, RETRY_MAX)
+    _retries[key] = (attempts + 1, time.time() + delay)
+    RETRIES.inc()
+    log.info("   -> ⏳ %s %s still pending, retrying in %d min", key[0], key[1], delay // 60,
+             extra={"station": key[0], "date": key[1], "attempt": attempts + 1})
 
 def run_cli_check():
-    config = load_config()
-    user_agent = config['defaults']['user_agent']
-    today_str = datetime.now().strftime("%Y-%m-%d")
+    """
+    Finalization pass. Safe to run every few minutes: stations that are locked
+    or backing off cost nothing, and the rest are fetched concurrently.
+    """
+    registry = station_registry.load()
+    user_agent = registry.defaults['user_agent']
+    client = get_client(user_agent)  # Created here, before the worker threads share it
     
-    print(f"--- CHECKING OFFICIAL RESULTS (USER URL METHOD) ---")
+    log.info("--- CHECKING OFFICIAL RESULTS (USER URL METHOD) ---")
+    due = due_stations(registry.stations())
+    if not due:
+        PENDING.set(len(_retries))
+        log.info("✅ Every station is locked or waiting for its next retry.")
+        return
     
-    for key, station in config['stations'].items():
-        wfo = station['wfo']
-        cli_code = station['cli_code'] # Using our new config field!
-        sid = station['station_id']
-        
-        # 1. Fetch
-        raw_text = fetch_cli_html(wfo, cli_code, user_agent)
-        
-        # 2. Parse
-        if raw_text:
-            high, low = parse_cli_text(raw_text)
-            
-            if high is not None and low is not None:
-                save_result(sid, today_str, high, low)
+    results = []
+    deadline = time.monotonic() + CHECK_DEADLINE
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {pool.submit(check_station, station, date, user_agent, deadline): (station['station_id'], date)
+                   for station, date in due}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                # One bad report must not cost the rest of the batch their results
+                log.error("❌ Error checking %s %s: %s", key[0], key[1], e, extra={"station": key[0], "date": key[1]})
+                row = None
+            if row:
+                results.append(row)
+            # Only a final report for the day we wanted ends the polling
+            if not (row and row[1] == key[1] and row[4]):
+                schedule_retry(key)
             else:
-                print(f"⚠️  Found report for {cli_code} but could not parse temps.")
+                _retries.pop(key, None)
         
-    print("---------------------------------------------")
+    save_results(results)
+    PENDING.set(len(_retries))
 
 if __name__ == "__main__":
-    run_cli_check()
\ No newline at end of file
+    logs.setup()
+    run_cli_check()
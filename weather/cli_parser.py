@@ -0,0 +1,168 @@
+"""
+Single-pass parser for the NWS daily climate report (CLI product).
+
+Every pattern is compiled once at import. The report is walked line by line
+exactly once, tracking which section we're in (TEMPERATURE, PRECIPITATION,
+SNOWFALL), so "MAXIMUM" is only ever read from the temperature table and
+never from forecast text or other sections.
+"""
+import re
+from datetime import datetime
+
+from weather import logs
+
+# --- COMPILED PATTERNS ---
+PRE_BLOCK = re.compile(r'<pre[^>]*>(.*?)</pre>', re.DOTALL | re.IGNORECASE)
+
+SUMMARY_DATE = re.compile(r'CLIMATE SUMMARY FOR\s+(?P<month>[A-Z]+)\s+(?P<day>\d{1,2})\s+(?P<year>\d{4})')
+STATION_NAME = re.compile(r'\.\.\.THE\s+(?P<name>.+?)\s+CLIMATE SUMMARY')
+VALID_AS_OF = re.compile(r'VALID (?:TODAY )?AS OF\s+(?P<time>\d{3,4}\s*[AP]M)')
+
+# Section headers start in column 0; table rows are indented
+SECTION = re.compile(r'^(?P<name>TEMPERATURE|PRECIPITATION|SNOWFALL)\b')
+OTHER_HEADER = re.compile(r'^[A-Z]')
+
+# "  MAXIMUM         38    228 PM  66    1932  39     -1       44"
+TEMP_ROW = re.compile(
+    r'^\s+(?P<kind>MAXIMUM|MINIMUM)\s+'
+    r'(?P<value>-?\d+|MM)(?P<record>R?)\s+'
+    r'(?:(?P<time>\d{1,4}\s*[AP]M)|MM)?'
+    r'(?P<rest>.*)$'
+)
+# "  YESTERDAY        0.00          1.62 1978   0.11  -0.11     0.00"
+AMOUNT_ROW = re.compile(
+    r'^\s+(?P<period>YESTERDAY|TODAY)\s+'
+    r'(?P<value>-?\d+(?:\.\d+)?|T|MM)(?P<record>R?)'
+    r'(?P<rest>.*)$'
+)
+NUMBER = re.compile(r'-?\d+(?:\.\d+)?|MM|\bT\b')
+
+PLAUSIBLE_TEMP = (-80, 135)  # °F; anything outside is a parse error, not weather
+DATE_FORMATS = ("%B %d %Y", "%b %d %Y")  # "MARCH 5 2024", and the odd abbreviated "MAR 5 2024"
+
+log = logs.get_logger(__name__)
+
+def extract_text(body):
+    """The product.php HTML wraps the report in <pre>; format=txt returns it bare."""
+    match = PRE_BLOCK.search(body)
+    return match.group(1) if match else body
+
+def _number(token):
+    if token in (None, '', 'MM'):
+        return None
+    if token == 'T':
+        return 0.0  # Trace
+    return float(token)
+
+def _columns(rest, names):
+    """Maps the trailing columns (record, year, normal, ...) when all of them are present."""
+    tokens = NUMBER.findall(rest)
+    if len(tokens) < len(names):
+        return {}
+    columns = {name: _number(tok) for name, tok in zip(names, tokens)}
+    if columns.get('record_year') is not None:
+        columns['record_year'] = int(columns['record_year'])
+    return columns
+
+def _report_date(match):
+    """YYYY-MM-DD from a SUMMARY_DATE match, or None (logged) if the month isn't one we know."""
+    text = f"{match.group('month')} {match.group('day')} {match.group('year')}"
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    log.warning("⚠️  Unreadable CLI summary date %r", text)
+    return None
+
+def _temp_row(match):
+    value = _number(match.group('value'))
+    if value is not None and not (PLAUSIBLE_TEMP[0] < value < PLAUSIBLE_TEMP[1]):
+        value = None
+    row = {
+        'value': value,
+        'time': match.group('time'),
+        'is_record': bool(match.group('record')),
+    }
+    row.update(_columns(match.group('rest'), ('record', 'record_year', 'normal', 'departure', 'last_year')))
+    return row
+
+def _amount_row(match):
+    row = {
+        'value': _number(match.group('value')),
+        'is_trace': match.group('value') == 'T',
+        'is_record': bool(match.group('record')),
+    }
+    row.update(_columns(match.group('rest'), ('record', 'record_year', 'normal', 'departure', 'last_year')))
+    return row
+
+def parse_cli_report(text):
+    """
+    Returns a dict:
+        station, date (YYYY-MM-DD the report covers), valid_as_of (set on
+        intraday preliminary reports), is_final,
+        max / min: {value, time, is_record, record, record_year, normal, departure, last_year}
+        precipitation / snowfall: {value, is_trace, is_record, record, ...}
+    Missing pieces are None. Returns None for empty input.
+    """
+    if not text:
+        return None
+
+    report = {
+        'station': None, 'date': None, 'valid_as_of': None, 'is_final': True,
+        'max': None, 'min': None, 'precipitation': None, 'snowfall': None,
+    }
+    section = None
+
+    for line in extract_text(text).upper().splitlines():
+        if not line.strip():
+            continue
+
+        if line[0] != ' ':
+            header = SECTION.match(line)
+            if header:
+                section = header.group('name')
+                continue
+            if OTHER_HEADER.match(line):
+                section = None
+
+        if section == 'TEMPERATURE':
+            match = TEMP_ROW.match(line)
+            if match:
+                key = 'max' if match.group('kind') == 'MAXIMUM' else 'min'
+                if report[key] is None:
+                    report[key] = _temp_row(match)
+            continue
+
+        if section in ('PRECIPITATION', 'SNOWFALL'):
+            match = AMOUNT_ROW.match(line)
+            key = section.lower()
+            if match and report[key] is None:
+                report[key] = _amount_row(match)
+            continue
+
+        if report['date'] is None:
+            match = SUMMARY_DATE.search(line)
+            if match:
+                report['date'] = _report_date(match)
+                name = STATION_NAME.search(line)
+                if name:
+                    report['station'] = name.group('name')
+                continue
+
+        if report['valid_as_of'] is None:
+            match = VALID_AS_OF.search(line)
+            if match:
+                # Intraday reports are preliminary; only the next-morning one is final
+                report['valid_as_of'] = match.group('time')
+                report['is_final'] = False
+
+    return report
+
+def high_low(report):
+    """(max_temp, min_temp) from a parsed report, either may be None."""
+    if not report:
+        return None, None
+    high = report['max']['value'] if report['max'] else None
+    low = report['min']['value'] if report['min'] else None
+    return high, low
@@ -0,0 +1,337 @@
+import http.client
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from weather import archive, db, logs, rollups
+
+# --- CONFIGURATION ---
+WINDOW_DAYS = 3  # How much history the dashboard keeps per station
+READ_API_URL = os.environ.get("READ_API_URL", "http://localhost:8600")  # Live updates, see weather/read_api.py
+RECONNECT_SECONDS = 5
+FEED_TIMEOUT = 45  # No event or heartbeat for this long: the API is gone, reconnect
+
+log = logs.get_logger(__name__)
+
+class ObservationStore:
+    """
+    Cached, incremental read layer for the dashboard.
+
+    Keeps one read-only connection and one DataFrame per station. A rerun
+    first reads a cheap change marker (PRAGMA data_version + MAX(id)). Each
+    frame remembers the marker it was last brought up to date at: if that
+    still matches, the cached frame is returned untouched. Otherwise it pulls
+    only rows with an id above the last one it saw, converts just their epoch
+    seconds, and appends them. Rows the collector updated in place keep their
+    id, so each change also reads the corrections logged since the last one
+    (db.read_corrections) and patches the cached frames.
+
+    With a LiveFeed attached, new and corrected rows are pushed in as they're
+    written (apply_observations, apply_corrections) and cached frames are
+    served without touching the database at all.
+    """
+
+    def __init__(self, db_path=db.OBS_DB_PATH, window_days=WINDOW_DAYS, archive_dir=archive.ARCHIVE_DIR):
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.window = timedelta(days=window_days)
+        self.conn = None
+        self.lock = threading.Lock()
+        self.marker = None
+        self.station_list = []
+        self.frames = {}    # (station_id, tz_name) -> DataFrame
+        self.last_ids = {}  # (station_id, tz_name) -> highest observation id loaded
+        self.markers = {}   # (station_id, tz_name) -> change marker the frame was last synced at
+        self.last_seq = None  # Newest correction applied; None until the first refresh
+        self.live = False   # A LiveFeed is connected and keeping the frames current
+        self.version = 0    # Bumped whenever pushed rows land, so a UI can tell something changed
+        self.pace = {}      # station_id -> latest pace row pushed by the feed
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = db.connect(self.db_path, read_only=True)
+        return self.conn
+
+    def _current_marker(self):
+        conn = self._connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        max_id = conn.execute("SELECT MAX(id) FROM observations").fetchone()[0]
+        return data_version, max_id
+
+    def refresh(self):
+        """
+        Returns the current change marker, reloading the station list if it
+        moved. Frames compare it with their own marker, so one caller seeing
+        a change never hides it from another.
+        """
+        marker = self._current_marker()
+        if marker != self.marker:
+            self.marker = marker
+            self._sync_corrections()
+            self.station_list = [
+                row[0] for row in self._connection().execute("SELECT station_id FROM stations ORDER BY station_id")
+            ]
+        return marker
+
+    def get_stations(self):
+        with self.lock:
+            try:
+                self.refresh()
+            except Exception:
+                return []
+            return list(self.station_list)
+
+    def _load_rows(self, station_id, after_id, since_epoch):
+        rows = self._connection().execute('''
+            SELECT id, epoch, temp_f
+            FROM observations
+            WHERE station_id = ? AND id > ? AND epoch >= ?
+            ORDER BY epoch ASC
+        ''', (station_id, after_id, since_epoch)).fetchall()
+        return pd.DataFrame(rows, columns=['id', 'epoch', 'temperature'])
+
+    def _sync_corrections(self):
+        """Patches cached frames with the rows corrected since the last call."""
+        conn = self._connection()
+        if self.last_seq is None:
+            self.last_seq = db.last_correction(conn)  # Nothing cached yet: every later load is current
+            return
+        rows = db.read_corrections(conn, self.last_seq)
+        if rows:
+            self.last_seq = rows[-1][0]
+            self._correct(pd.DataFrame([row[1:] for row in rows], columns=['id', 'station_id', 'epoch', 'temp_f']))
+
+    def _correct(self, rows):
+        """Overwrites the temperature of cached rows by id. rows has id, station_id and temp_f columns."""
+        corrected = 0
+        for key, frame in list(self.frames.items()):
+            temps = rows[rows['station_id'] == key[0]].drop_duplicates('id', keep='last').set_index('id')['temp_f']
+            hit = frame['id'].isin(temps.index) if not frame.empty and not temps.empty else None
+            if hit is None or not hit.any():
+                continue
+            frame = frame.copy()
+            frame.loc[hit, 'temperature'] = frame.loc[hit, 'id'].map(temps).to_numpy()
+            self.frames[key] = frame
+            corrected += int(hit.sum())
+        return corrected
+
+    def _trimmed(self, key, cutoff):
+        """The cached frame for key without the readings that have aged out of the window."""
+        frame = self.frames[key]
+        if not frame.empty and frame['timestamp'].iloc[0] < cutoff:
+            frame = frame[frame['timestamp'] >= cutoff].reset_index(drop=True)
+            self.frames[key] = frame
+        return frame
+
+    def _append(self, key, new, cutoff):
+        """Merges rows (id, epoch, temperature) into the cached frame for key and trims it to the window."""
+        if not new.empty:
+            # Integer seconds -> tz-aware datetimes in one vectorized step, no string parsing
+            new['timestamp'] = pd.to_datetime(new.pop('epoch'), unit='s', utc=True).dt.tz_convert(key[1])
+            new = new[['id', 'timestamp', 'temperature']]
+            self.last_ids[key] = max(self.last_ids.get(key, 0), int(new['id'].max()))
+        else:
+            new = pd.DataFrame(columns=['id', 'timestamp', 'temperature'])
+
+        frame = self.frames.get(key)
+        if frame is None or frame.empty:
+            frame = new
+        elif not new.empty:
+            frame = pd.concat([frame, new], ignore_index=True).sort_values('timestamp', ignore_index=True)
+
+        if not frame.empty:
+            frame = frame[frame['timestamp'] >= cutoff].reset_index(drop=True)
+
+        self.frames[key] = frame
+        return frame
+
+    def get_frame(self, station_id, tz_name):
+        """Last WINDOW_DAYS of readings for one station, timestamps in tz_name."""
+        key = (station_id, tz_name)
+        with self.lock:
+            cutoff = datetime.now(timezone.utc) - self.window
+            if self.live and key in self.frames:
+                return self._trimmed(key, cutoff)  # The feed appends new rows as they're written
+            marker = self.refresh()
+            if key in self.frames and self.markers.get(key) == marker:
+                return self._trimmed(key, cutoff)
+
+            new = self._load_rows(station_id, self.last_ids.get(key, 0), int(cutoff.timestamp()))
+            if key not in self.last_ids:
+                # First load: the start of the window may already have moved to the archive
+                cold = archive.read_archive(station_id, int(cutoff.timestamp()), columns=('epoch', 'temp_f'),
+                                            archive_dir=self.archive_dir)
+                if cold.num_rows:
+                    cold = cold.to_pandas().rename(columns={'temp_f': 'temperature'})
+                    cold.insert(0, 'id', 0)
+                    new = pd.concat([cold[new.columns], new], ignore_index=True)
+            self.markers[key] = marker
+            return self._append(key, new, cutoff)
+
+    def apply_observations(self, columns):
+        """
+        Appends rows pushed by the read API ({column: [values]}, see
+        read_api.DELTA_SCHEMA) to the frames already cached. Rows already
+        loaded from the database are skipped by id. Returns how many landed.
+        """
+        delta = pd.DataFrame(columns)
+        if delta.empty:
+            return 0
+        landed = 0
+        with self.lock:
+            cutoff = datetime.now(timezone.utc) - self.window
+            for key in list(self.frames):
+                rows = delta[(delta['station_id'] == key[0]) & (delta['id'] > self.last_ids.get(key, 0))]
+                if rows.empty:
+                    continue
+                self._append(key, rows[['id', 'epoch', 'temp_f']].rename(columns={'temp_f': 'temperature'}), cutoff)
+                landed += len(rows)
+            if landed:
+                self.version += 1
+        return landed
+
+    def apply_corrections(self, columns):
+        """
+        Overwrites cached rows the read API says were updated in place (same
+        columns as apply_observations). Returns how many cached rows changed.
+        """
+        rows = pd.DataFrame(columns)
+        if rows.empty:
+            return 0
+        with self.lock:
+            corrected = self._correct(rows)
+            if corrected:
+                self.version += 1
+        return corrected
+
+    def apply_pace(self, columns):
+        """Keeps the latest pushed pace row per station ({column: [values]}, see read_api.PACE_SCHEMA)."""
+        names = list(columns)
+        with self.lock:
+            for values in zip(*columns.values()):
+                row = dict(zip(names, values))
+                self.pace[row['station_id']] = row
+            self.version += 1
+
+    def get_pace(self, station_id):
+        """The last pace row the feed pushed for the station, or None."""
+        return self.pace.get(station_id)
+
+    def go_live(self):
+        """The feed just (re)connected: catch cached frames up from the database once, then trust the pushes."""
+        with self.lock:
+            cutoff = datetime.now(timezone.utc) - self.window
+            self._sync_corrections()
+            for key in list(self.frames):
+                self._append(key, self._load_rows(key[0], self.last_ids.get(key, 0), int(cutoff.timestamp())), cutoff)
+            self.live = True
+
+    def reset(self):
+        """Forgets every cached frame; the next get_frame reloads from the database."""
+        with self.lock:
+            self.frames.clear()
+            self.last_ids.clear()
+            self.markers.clear()
+            self.marker = None
+            self.last_seq = None
+            self.version += 1
+
+    def get_health(self, station_id):
+        """(last_ok, stale_since, last_error) as the collector last recorded them, or None."""
+        with self.lock:
+            try:
+                return self._connection().execute(
+                    "SELECT last_ok, stale_since, last_error FROM stations WHERE station_id = ?", (station_id,)
+                ).fetchone()
+            except Exception:
+                return None
+
+    def get_daily(self, station_id, start_date, end_date=None):
+        """obs_daily rows (local_date, min_f, max_f, ...) for the station, oldest first."""
+        with self.lock:
+            try:
+                rows = rollups.get_daily(self._connection(), station_id, start_date, end_date)
+            except Exception:
+                return pd.DataFrame()
+        return pd.DataFrame(rows, columns=['local_date', *rollups.COLUMNS.split(', '), 'mean_f'])
+
+class LiveFeed:
+    """
+    Follows the read API's /events stream on a daemon thread and feeds it into
+    an ObservationStore: observation events are appended to the cached frames,
+    correction events patched into them, pace events kept for display, and a reset drops the cache. While the
+    stream is up the store serves frames from memory; while it's down the
+    store checks the database itself, as it would without a feed.
+    """
+
+    def __init__(self, store, url=READ_API_URL):
+        parts = urlsplit(url)
+        self.store = store
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.path = parts.path.rstrip('/') + '/events'
+        self.last_event_id = None
+        self.connected_once = False
+
+    def start(self):
+        threading.Thread(target=self.run, name="live-feed", daemon=True).start()
+        return self
+
+    def run(self):
+        while True:
+            try:
+                self.follow()
+            except Exception as e:
+                if self.connected_once:
+                    log.info("📡 Live feed dropped (%s); reconnecting", e)
+            self.store.live = False
+            time.sleep(RECONNECT_SECONDS)
+
+    def follow(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=FEED_TIMEOUT)
+        headers = {'Accept': 'text/event-stream'}
+        if self.last_event_id is not None:
+            headers['Last-Event-ID'] = str(self.last_event_id)  # Replays what we missed
+        try:
+            conn.request("GET", self.path, headers=headers)
+            response = conn.getresponse()
+            if response.status != 200:
+                raise ConnectionError(f"HTTP {response.status}")
+            event_id, event, data = None, None, []
+            for raw in response:
+                line = raw.decode('utf-8').rstrip('\r\n')
+                if line:
+                    field, _, value = line.partition(':')
+                    value = value[1:] if value.startswith(' ') else value
+                    if field == 'id':
+                        event_id = int(value)
+                    elif field == 'event':
+                        event = value
+                    elif field == 'data':
+                        data.append(value)
+                    continue
+                if event:
+                    self.dispatch(event, '\n'.join(data))
+                    self.last_event_id = event_id
+                event_id, event, data = None, None, []
+        finally:
+            conn.close()
+
+    def dispatch(self, event, data):
+        if event == 'observation':
+            self.store.apply_observations(json.loads(data))
+        elif event == 'correction':
+            self.store.apply_corrections(json.loads(data))
+        elif event == 'pace':
+            self.store.apply_pace(json.loads(data))
+        elif event == 'reset':
+            self.store.reset()
+        elif event == 'hello':
+            self.store.go_live()
+            if not self.connected_once:
+                log.info("📡 Live feed connected to %s:%s", self.host, self.port)
+            self.connected_once = True
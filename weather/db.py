@@ -0,0 +1,170 @@
+import sqlite3
+import os
+import threading
+
+from weather import metrics, schema, rollups, timekeys
+from weather.payloads import pack_payload
+
+# --- CONFIGURATION ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OBS_DB_PATH = os.path.join(BASE_DIR, 'data', 'observations.db')
+RESULTS_DB_PATH = os.path.join(BASE_DIR, 'data', 'daily_results.db')
+
+# Tuned for one writer + a dashboard reading at the same time
+PRAGMAS = {
+    "synchronous": "NORMAL",       # Safe with WAL, far fewer fsyncs than FULL
+    "cache_size": -20000,          # ~20 MB page cache
+    "mmap_size": 268435456,        # Read pages straight from the OS cache (256 MB)
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,          # Wait instead of failing when another process holds the lock
+}
+
+WRITE_SECONDS = metrics.histogram("db_write_seconds", "One ObservationWriter.flush transaction")
+ROWS_WRITTEN = metrics.counter("db_rows_written_total", "Observation rows flushed")
+
+def connect(path, read_only=False):
+    """
+    Opens a SQLite connection with WAL and our performance pragmas.
+    WAL lets the dashboard read while the collector is writing.
+    """
+    if read_only:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+def fill_local_dates(conn, timezones):
+    """Sets local_date on rows that don't have one yet, per station timezone (UTC if unknown)."""
+    filled = 0
+    with conn:
+        for station_id, in conn.execute("SELECT station_id FROM stations").fetchall():
+            tz_name = timezones.get(station_id, 'UTC')
+            rows = conn.execute(
+                "SELECT id, epoch FROM observations WHERE station_id = ? AND local_date IS NULL", (station_id,)
+            ).fetchall()
+            conn.executemany("UPDATE observations SET local_date = ? WHERE id = ?",
+                             [(timekeys.local_date(epoch, tz_name), obs_id) for obs_id, epoch in rows])
+            filled += len(rows)
+    return filled
+
+def last_correction(conn):
+    """The newest observation_corrections seq (0 if none): where a reader starts following corrections."""
+    return conn.execute("SELECT MAX(seq) FROM observation_corrections").fetchone()[0] or 0
+
+def read_corrections(conn, after_seq, columns=('id', 'station_id', 'epoch', 'temp_f'), limit=-1):
+    """
+    Rows updated in place since after_seq, as (seq, *columns) with their current
+    values, oldest correction first. Rows since archived are gone and skipped.
+    """
+    return conn.execute(f'''
+        SELECT c.seq, {', '.join('o.' + column for column in columns)}
+        FROM observation_corrections c JOIN observations o ON o.id = c.observation_id
+        WHERE c.seq > ? ORDER BY c.seq LIMIT ?
+    ''', (after_seq, limit)).fetchall()
+
+# --- BATCHED WRITER ---
+class ObservationWriter:
+    """
+    Keeps one connection open for the life of the process and writes a whole
+    cycle of observations with a single executemany inside one transaction.
+    """
+
+    # Re-fetching an unchanged /latest reading is a no-op; a corrected reading
+    # for the same timestamp updates the row in place.
+    INSERT_SQL = '''
+        INSERT INTO observations
+        (station_id, timestamp, temp_f, humidity, wind_speed, description, epoch, local_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (station_id, timestamp) DO UPDATE SET
+            temp_f = excluded.temp_f,
+            humidity = excluded.humidity,
+            wind_speed = excluded.wind_speed,
+            description = excluded.description
+        WHERE temp_f IS NOT excluded.temp_f
+           OR humidity IS NOT excluded.humidity
+           OR wind_speed IS NOT excluded.wind_speed
+           OR description IS NOT excluded.description
+    '''
+    PAYLOAD_SQL = "INSERT OR IGNORE INTO raw_payloads (hash, body) VALUES (?, ?)"
+    LINK_SQL = '''
+        INSERT OR REPLACE INTO observation_payloads (observation_id, payload_hash)
+        SELECT id, ? FROM observations WHERE station_id = ? AND timestamp = ?
+    '''
+    STATION_SQL = "INSERT OR IGNORE INTO stations (station_id) VALUES (?)"
+
+    def __init__(self, path=OBS_DB_PATH, timezones=None, archive_dir=None):
+        self.conn = connect(path)
+        self.archive_dir = archive_dir  # None: archive.ARCHIVE_DIR
+        schema.migrate_observations(self.conn)
+        self.timezones = timezones or {}  # station_id -> tz name, for local_date
+        fill_local_dates(self.conn, self.timezones)
+        rollups.ensure_built(self.conn)
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def add(self, row):
+        """
+        row = (station_id, timestamp, temp_f, humidity, wind_speed, description, raw_json).
+        The typed columns go to observations; raw_json goes to the payload archive.
+        """
+        with self.lock:
+            self.pending.append(row)
+
+    def flush(self):
+        """Writes everything buffered so far. Returns the number of rows written."""
+        with self.lock:
+            rows, self.pending = self.pending, []
+            if not rows:
+                return 0
+            # Parsed once here; every reader uses epoch / local_date from now on
+            typed = [(*row[:6], *timekeys.stamp(row[1], self.timezones.get(row[0], 'UTC'))) for row in rows]
+            # A backfill can reach back past the archive cutoff. Readings already moved to
+            # Parquet are settled: inserting them again would count them twice in the rollups.
+            archived = rollups.archived_epochs(typed, self.archive_dir)
+            if archived:
+                kept = [i for i, row in enumerate(typed) if (row[0], row[6]) not in archived]
+                rows, typed = [rows[i] for i in kept], [typed[i] for i in kept]
+                if not rows:
+                    return 0
+
+            payloads, links = {}, []
+            for row in rows:
+                if row[6] is None:
+                    continue
+                digest, blob = pack_payload(row[6])
+                payloads[digest] = blob
+                links.append((digest, row[0], row[1]))
+
+            with WRITE_SECONDS.time(), self.conn:  # One transaction: commits on success, rolls back on error
+                existing = rollups.existing_temps(self.conn, rows)
+                self.conn.executemany(self.INSERT_SQL, typed)
+                self.conn.executemany(self.PAYLOAD_SQL, payloads.items())
+                self.conn.executemany(self.LINK_SQL, links)
+                self.conn.executemany(self.STATION_SQL, {(row[0],) for row in rows})
+                rollups.apply(self.conn, typed, existing, self.archive_dir)
+            ROWS_WRITTEN.inc(len(rows))
+            return len(rows)
+
+    def mark_health(self, ok, failed, now):
+        """
+        ok: station ids fetched fine this cycle (new reading or unchanged).
+        failed: {station_id: reason}. A station stays stale from its first
+        failure until its next good fetch.
+        """
+        with self.lock, self.conn:
+            self.conn.executemany(self.STATION_SQL, [(sid,) for sid in (*ok, *failed)])
+            self.conn.executemany(
+                "UPDATE stations SET last_ok = ?, stale_since = NULL, last_error = NULL WHERE station_id = ?",
+                [(now, sid) for sid in ok])
+            self.conn.executemany(
+                "UPDATE stations SET stale_since = COALESCE(stale_since, ?), last_error = ? WHERE station_id = ?",
+                [(now, reason, sid) for sid, reason in failed.items()])
+
+    def close(self):
+        self.flush()
+        self.conn.close()
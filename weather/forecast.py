@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import threading
+import time
+
+from weather import db, http_client, logs, station_registry
+
+# --- CONFIGURATION ---
+API_BASE = os.environ.get("NWS_API_BASE", "https://api.weather.gov")
+METADATA_MAX_AGE = 30 * 24 * 3600   # Re-resolve gridpoints once a month, just in case
+FORECAST_TTL = 15 * 60              # How long a cached hourly forecast is served as-is
+PREFETCH_EVERY = 10 * 60            # Background refresh, comfortably inside the TTL
+REQUEST_TIMEOUT = 5                 # Seconds; the dashboard should never hang on NWS
+RENDER_DEADLINE = 8                 # Seconds a page render may wait for a forecast it has never seen
+METADATA_REFRESH_SECONDS = 24 * 3600  # Collector job: resolve new / stale stations into station_metadata
+
+log = logs.get_logger(__name__)
+
+def lookup_station(client, station_id, deadline=None):
+    """(lat, lon, forecast_hourly_url) from the API (two requests), or None."""
+    r1 = client.get(f"{API_BASE}/stations/{station_id}", timeout=REQUEST_TIMEOUT, deadline=deadline)
+    if r1.status_code != 200:
+        return None
+    lon, lat = r1.json()['geometry']['coordinates'][:2]
+
+    r2 = client.get(f"{API_BASE}/points/{lat},{lon}", timeout=REQUEST_TIMEOUT, deadline=deadline)
+    if r2.status_code != 200:
+        return None
+    return lat, lon, r2.json()['properties']['forecastHourly']
+
+def refresh_metadata(station_ids=None, db_path=db.OBS_DB_PATH, client=None):
+    """
+    Collector job: resolves every station missing from station_metadata (or
+    older than METADATA_MAX_AGE) and stores it, so the dashboard only reads.
+    Returns the number of stations resolved.
+    """
+    registry = station_registry.load()
+    station_ids = station_ids or registry.station_ids()
+    own_client = client is None
+    if own_client:
+        client = http_client.HttpClient(registry.defaults['user_agent'])
+    conn = db.connect(db_path)  # Schema is set up by the collector's writer
+    try:
+        fresh = {row[0] for row in conn.execute(
+            "SELECT station_id FROM station_metadata WHERE resolved_at >= ?", (time.time() - METADATA_MAX_AGE,)
+        )}
+        resolved = 0
+        for station_id in station_ids:
+            if station_id in fresh:
+                continue
+            try:
+                found = lookup_station(client, station_id)
+            except Exception as e:
+                log.warning("⚠️  Could not resolve %s: %s", station_id, e, extra={"station": station_id})
+                continue
+            if not found:
+                continue
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO station_metadata VALUES (?, ?, ?, ?, ?)",
+                             (station_id, *found, time.time()))
+            resolved += 1
+        if resolved:
+            log.info("📍 Resolved forecast gridpoints for %d stations", resolved)
+        return resolved
+    finally:
+        conn.close()
+        if own_client:
+            client.close()
+
+class ForecastService:
+    """
+    Hourly forecasts for the dashboard, served from local data.
+
+    Station lat/lon and forecastHourly URLs come from the station_metadata
+    table, which the collector fills (refresh_metadata); the service only
+    reads it, and keeps anything it had to resolve itself in memory. Forecast
+    periods are kept in memory with a TTL and refreshed by a background
+    thread, so a page render never waits on NWS unless a station has never
+    been fetched before.
+    """
+
+    def __init__(self, user_agent, db_path=db.OBS_DB_PATH):
+        self.client = http_client.HttpClient(user_agent)
+        self.db_path = db_path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.metadata = {}   # station_id -> (lat, lon, forecast_hourly_url, resolved_at), not yet in the table
+        self.forecasts = {}  # station_id -> (fetched_at, periods)
+        self.thread = None
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = db.connect(self.db_path, read_only=True)
+        return self.conn
+
+    # --- STATION METADATA ---
+    def resolve_station(self, station_id, deadline=None):
+        """Returns (lat, lon, forecast_hourly_url), hitting the API only on a cache miss."""
+        with self.lock:
+            row = self.metadata.get(station_id)
+            if row is None:
+                try:
+                    row = self._connection().execute(
+                        "SELECT lat, lon, forecast_hourly_url, resolved_at FROM station_metadata WHERE station_id = ?",
+                        (station_id,),
+                    ).fetchone()
+                except sqlite3.Error:
+                    row = None  # The collector hasn't created the database yet
+        if row and time.time() - row[3] < METADATA_MAX_AGE:
+            return row[0], row[1], row[2]
+
+        found = lookup_station(self.client, station_id, deadline)
+        if found:
+            with self.lock:
+                self.metadata[station_id] = (*found, time.time())
+        return found
+
+    # --- FORECASTS ---
+    def refresh(self, station_id, deadline=None):
+        """
+        Downloads (or revalidates) one station's hourly forecast into the cache.
+        Raises http_client.CircuitOpenError / DeadlineExceeded like the client does.
+        """
+        resolved = self.resolve_station(station_id, deadline)
+        if not resolved:
+            return None
+
+        response = self.client.get(resolved[2], conditional=True, timeout=REQUEST_TIMEOUT, deadline=deadline)
+        if response.status_code not in (200, 304):
+            return None
+
+        periods = response.json()['properties']['periods']
+        with self.lock:
+            self.forecasts[station_id] = (time.time(), periods)
+        return periods
+
+    def get_periods(self, station_id):
+        """Cached forecast periods; only goes to the network if we have nothing fresh."""
+        with self.lock:
+            cached = self.forecasts.get(station_id)
+        if cached and time.time() - cached[0] < FORECAST_TTL:
+            return cached[1]
+
+        try:
+            return self.refresh(station_id, deadline=time.monotonic() + RENDER_DEADLINE)
+        except Exception as e:
+            log.warning("⚠️  Forecast for %s unavailable: %s", station_id, e, extra={"station": station_id})
+            # Stale beats nothing
+            return cached[1] if cached else None
+
+    # --- BACKGROUND PREFETCH ---
+    def start_prefetch(self, station_ids, interval=PREFETCH_EVERY):
+        if self.thread and self.thread.is_alive():
+            return
+
+        def loop():
+            while True:
+                for sid in station_ids:
+                    try:
+                        self.refresh(sid)
+                    except Exception as e:
+                        log.warning("⚠️  Forecast prefetch failed for %s: %s", sid, e, extra={"station": sid})
+                time.sleep(interval)
+
+        self.thread = threading.Thread(target=loop, name="forecast-prefetch", daemon=True)
+        self.thread.start()
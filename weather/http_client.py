@@ -0,0 +1,396 @@
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from weather import db, metrics
+
+# --- CONFIGURATION ---
+CACHE_PATH = os.path.join(db.BASE_DIR, 'data', 'http_cache.db')
+DEFAULT_TIMEOUT = 10    # seconds
+DEFAULT_RATE = 5.0      # requests per second, per host
+DEFAULT_BURST = 5       # how many requests a host may receive back-to-back
+POOL_SIZE = 32          # keep-alive connections kept open per host
+RETRY_STATUSES = (429, 500, 502, 503, 504)  # Worth another try; anything else is an answer
+BACKOFF_BASE = 0.5      # seconds; retry n waits a random 0..BACKOFF_BASE * 2**n ("full jitter")
+BACKOFF_MAX = 30        # seconds; also caps how long we honor a Retry-After inside one call
+BREAKER_FAILURES = 3    # consecutive failures that open a circuit
+BREAKER_COOLDOWN = 60   # seconds an open circuit rejects calls before letting one probe through
+BREAKER_MAX_COOLDOWN = 15 * 60  # each failed probe doubles the cooldown, up to this
+
+REQUESTS = metrics.counter("http_requests_total", "Requests by host and outcome (status code, cached, error)")
+REQUEST_SECONDS = metrics.histogram("http_request_seconds", "Time on the wire, rate-limit wait excluded")
+RATE_WAIT_SECONDS = metrics.histogram("http_rate_limit_wait_seconds", "Time spent waiting for a token")
+RETRIES = metrics.counter("http_retries_total", "Retried requests by host")
+REJECTED = metrics.counter("http_circuit_rejected_total", "Calls refused by an open circuit, by host")
+CIRCUIT_CHANGES = metrics.counter("http_circuit_transitions_total", "Circuit state changes, by new state")
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `burst`.
+    acquire() blocks until a token is available, so callers never need to sleep blindly.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Hands out one TokenBucket per host so each API is throttled independently."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self.buckets[host] = bucket
+        bucket.acquire()
+
+
+class CircuitOpenError(Exception):
+    """The endpoint failed repeatedly; calls are refused until its cooldown ends."""
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed (or would pass) before a usable answer."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after BREAKER_FAILURES consecutive failures. While open,
+    allow() is False until the cooldown (or the server's Retry-After, if
+    longer) ends; then one probe goes through (half-open). A good probe
+    closes the circuit, a bad one reopens it with twice the cooldown.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN):
+        self.threshold = failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.state = "closed"
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if now < self.open_until:
+                return False
+            # This caller is the probe; everyone else waits for its answer (or for
+            # another cooldown, in case the probe never reports back)
+            self.open_until = now + self.cooldown
+            if self.state != "half_open":
+                self._set("half_open")
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            if self.state != "closed":
+                self._set("closed")
+
+    def record_failure(self, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open":
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.failures < self.threshold:
+                return
+            self.open_until = time.monotonic() + max(self.cooldown, retry_after or 0)
+            if self.state != "open":
+                self._set("open")
+
+    def _set(self, state):
+        self.state = state
+        CIRCUIT_CHANGES.inc(state=state)
+
+    def retry_in(self):
+        return max(0.0, self.open_until - time.monotonic())
+
+
+def retry_after_seconds(value, now=None):
+    """A Retry-After header (delta-seconds or an HTTP date) as seconds from now, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full jitter: a random wait up to base * 2**attempt, so retries from many threads spread out."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def create_session(user_agent, pool_size=POOL_SIZE):
+    """One keep-alive Session shared by every worker thread."""
+    session = requests.Session()
+    session.headers.update({"User-Agent": user_agent})
+
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ResponseCache:
+    """
+    On-disk store of the last response per URL: validators (ETag /
+    Last-Modified) for conditional requests, and the body for TTL hits.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.conn = db.connect(path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                fetched_at REAL NOT NULL
+            )
+        ''')
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        """Returns (etag, last_modified, body, fetched_at) or None."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT etag, last_modified, body, fetched_at FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+
+    def store(self, url, etag, last_modified, body):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, time.time()),
+            )
+
+    def touch(self, url):
+        """A 304 proves the cached copy is still current."""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+
+class CachedResponse:
+    """
+    The small slice of requests.Response we use, so cached and live answers
+    look the same to callers. not_modified is True for a 304.
+    """
+
+    def __init__(self, status_code, content, not_modified=False, from_cache=False):
+        self.status_code = status_code
+        self.content = content
+        self.not_modified = not_modified
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class HttpClient:
+    """
+    Shared HTTP layer: keep-alive session, per-host rate limiting,
+    conditional requests, an optional TTL cache, and retries behind a
+    circuit breaker per endpoint.
+    """
+
+    def __init__(self, user_agent, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 pool_size=POOL_SIZE, cache_path=CACHE_PATH):
+        self.session = create_session(user_agent, pool_size=pool_size)
+        self.limiter = HostRateLimiter(rate=rate, burst=burst)
+        self.cache = ResponseCache(cache_path)
+        self.breakers = {}  # breaker key -> CircuitBreaker
+        self.paused = {}    # host -> monotonic time its Retry-After ends
+        self.uncommitted = {}  # url -> (etag, last_modified, body) waiting for commit_validators()
+        self.lock = threading.Lock()
+
+    def breaker(self, key):
+        with self.lock:
+            circuit = self.breakers.get(key)
+            if circuit is None:
+                circuit = self.breakers[key] = CircuitBreaker()
+            return circuit
+
+    def open_circuits(self):
+        """{breaker key: seconds until its next probe} for every circuit that isn't closed."""
+        with self.lock:
+            circuits = list(self.breakers.items())
+        return {key: circuit.retry_in() for key, circuit in circuits if circuit.state != "closed"}
+
+    def _wait_for_host(self, host, deadline):
+        """Sits out a host-wide Retry-After, unless that would blow the deadline."""
+        with self.lock:
+            wait = self.paused.get(host, 0) - time.monotonic()
+        if wait <= 0:
+            return
+        if deadline is not None and time.monotonic() + wait >= deadline:
+            raise DeadlineExceeded(f"{host} asked us to wait {wait:.0f}s")
+        time.sleep(wait)
+
+    def _pause_host(self, host, seconds):
+        with self.lock:
+            self.paused[host] = max(self.paused.get(host, 0), time.monotonic() + seconds)
+
+    def get(self, url, conditional=False, ttl=None, timeout=DEFAULT_TIMEOUT, headers=None,
+            retries=0, deadline=None, breaker=None, defer_validators=False):
+        """
+        conditional: send If-None-Match / If-Modified-Since from the last response.
+                     A 304 comes back with not_modified=True (content is the cached body).
+        ttl:         serve the cached body without any request while it is younger than ttl seconds.
+        retries:     extra attempts after a connection error / timeout / 429 / 5xx, with jittered
+                     backoff, or the server's Retry-After when it sends one.
+        deadline:    time.monotonic() value no attempt, wait or timeout may run past.
+        breaker:     circuit breaker key (default: the URL, i.e. one per station/endpoint).
+        defer_validators: keep a 200's validators in memory until commit_validators(url),
+                     for callers that must save the body first. Until then the next
+                     conditional request still sends the old ones, so nothing is lost
+                     to a 304 if the save fails.
+
+        Raises CircuitOpenError while the endpoint's circuit is open, DeadlineExceeded
+        when time runs out, and the last requests exception if every attempt failed
+        to connect. A final 429/5xx is returned like any other status.
+        """
+        host = urlparse(url).netloc
+        cached = self.cache.get(url) if (conditional or ttl) else None
+
+        if cached and ttl and time.time() - cached[3] < ttl:
+            REQUESTS.inc(host=host, status="cached")
+            return CachedResponse(200, cached[2], from_cache=True)
+
+        request_headers = dict(headers or {})
+        if cached:
+            etag, last_modified = cached[0], cached[1]
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        response = self._send(url, host, request_headers, timeout, retries, deadline, self.breaker(breaker or url))
+
+        if response.status_code == 304 and cached:
+            self.cache.touch(url)
+            return CachedResponse(304, cached[2], not_modified=True, from_cache=True)
+
+        if response.status_code == 200 and (conditional or ttl):
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified or ttl:
+                if defer_validators:
+                    with self.lock:
+                        self.uncommitted[url] = (etag, last_modified, response.content)
+                else:
+                    self.cache.store(url, etag, last_modified, response.content)
+
+        return CachedResponse(response.status_code, response.content)
+
+    def commit_validators(self, url):
+        """The body from a defer_validators get() is safely stored: remember its validators."""
+        with self.lock:
+            pending = self.uncommitted.pop(url, None)
+        if pending:
+            self.cache.store(url, *pending)
+
+    def _send(self, url, host, headers, timeout, retries, deadline, circuit):
+        """The network part of get(): attempts, backoff and circuit bookkeeping."""
+        attempt = 0
+        while True:
+            if not circuit.allow():
+                REJECTED.inc(host=host)
+                raise CircuitOpenError(f"circuit open for {url}, next try in {circuit.retry_in():.0f}s")
+            self._wait_for_host(host, deadline)
+            attempt_timeout = timeout
+            if deadline is not None:
+                attempt_timeout = min(timeout, deadline - time.monotonic())
+                if attempt_timeout <= 0:
+                    raise DeadlineExceeded(f"no time left for {url}")
+
+            with RATE_WAIT_SECONDS.time(host=host):
+                self.limiter.acquire(url)
+            started = time.perf_counter()
+            error, response, retry_after, paused = None, None, None, False
+            try:
+                response = self.session.get(url, headers=headers, timeout=attempt_timeout)
+            except requests.RequestException as e:
+                error = e
+                REQUESTS.inc(host=host, status="error")
+            finally:
+                REQUEST_SECONDS.observe(time.perf_counter() - started, host=host)
+
+            if response is not None:
+                REQUESTS.inc(host=host, status=str(response.status_code))
+                if response.status_code not in RETRY_STATUSES:
+                    circuit.record_success()
+                    return response
+                retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                if retry_after is not None and response.status_code in (429, 503):
+                    self._pause_host(host, retry_after)  # The next attempt (anyone's) waits it out
+                    paused = True
+            circuit.record_failure(retry_after)
+
+            if attempt >= retries:
+                break
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            if delay > BACKOFF_MAX or (deadline is not None and time.monotonic() + delay >= deadline):
+                break
+            RETRIES.inc(host=host)
+            if not paused:
+                time.sleep(delay)
+            attempt += 1
+
+        if error is not None:
+            raise error
+        return response
+
+    def close(self):
+        self.session.close()
@@ -1,109 +1,371 @@
-import requests
-import sqlite3
 import json
+import logging
 from datetime import datetime
 import os
 import time
 
+from weather import http_client, db, logs, metrics, pace_model, pace_state, pipeline, polling, station_registry, timekeys
+
 # --- CONFIGURATION ---
-DB_FILE = "data/observations.db"
-CONFIG_FILE = "config/stations.json"
+DB_FILE = db.OBS_DB_PATH
+API_BASE = os.environ.get("NWS_API_BASE", "https://api.weather.gov")  # Point at a stub server for testing
+MAX_WORKERS = 8           # How many stations we fetch at the same time
+FETCH_WORKERS = MAX_WORKERS
+PARSE_WORKERS = 2         # JSON decode + unit conversion
+WRITE_BATCH = 500         # Rows per write transaction
+REQUESTS_PER_SECOND = 5   # Per-host budget, keeps us under the api.weather.gov limits
+FETCH_TIMEOUT = 10        # Seconds per attempt (clipped to what's left of the cycle)
+FETCH_RETRIES = 2         # Extra attempts on timeouts / 429 / 5xx, with jittered backoff
+CYCLE_DEADLINE = 120      # Seconds a sweep may spend fetching; stations not done by then are marked stale
+HEALTHY = ("new", "unchanged")  # Fetch outcomes that count as the station working
+
+_writer = None  # Created on first use, see get_writer()
+_client = None  # Shared HTTP client, see get_client()
+_pace = None    # Streaming pace state, see get_pace_tracker()
+_pipeline = None  # The current/last sweep's pipeline, for its metrics
+_seeded = set()  # Stations whose pace state was checked against the DB
+_poller = None   # Adaptive per-station schedule, see get_poller()
+PACE_CHECKPOINT = pace_state.CHECKPOINT_PATH  # Sharded workers each get their own file
+
+log = logs.get_logger(__name__)
+FETCH_SECONDS = metrics.histogram("nws_fetch_seconds", "Latest-observation fetch, rate-limit wait included")
+FETCHES = metrics.counter("nws_fetch_total",
+                          "Latest-observation fetches by result (new, unchanged, http_<code>, error, circuit_open, deadline)")
+SAVE_SECONDS = metrics.histogram("observation_save_seconds", "save_observation, parse + write")
+CYCLE_SECONDS = metrics.histogram("collection_cycle_seconds", "One full collect_all sweep")
+CYCLE_ROWS = metrics.gauge("collection_last_cycle_rows", "Rows written by the last sweep")
+CYCLE_STATIONS = metrics.gauge("collection_last_cycle_stations", "Stations polled by the last sweep")
+LAST_CYCLE = metrics.gauge("collection_last_cycle_timestamp", "When the last sweep finished (epoch seconds)")
+PACE_SIGNALS = metrics.counter("pace_signals_total", "SURGE / PLUNGE detections")
+STAGE_ITEMS = metrics.gauge("pipeline_stage_items", "Items a stage handled in the last sweep")
+STAGE_ERRORS = metrics.gauge("pipeline_stage_errors", "Items a stage failed on in the last sweep")
+STAGE_BUSY = metrics.gauge("pipeline_stage_busy_seconds", "Time a stage's workers spent working in the last sweep")
+STAGE_QUEUE = metrics.gauge("pipeline_stage_max_queue_depth", "Deepest a stage's input queue got in the last sweep")
+STALE_STATIONS = metrics.gauge("stations_stale", "Stations whose last fetch failed, was refused or ran out of time")
+FRESHNESS = metrics.histogram("observation_freshness_seconds", "Observation time -> saved by us, per new reading",
+                              buckets=(60, 120, 300, 600, 900, 1800, 3600, 7200))
+POLL_DUE = metrics.gauge("poll_due_stations", "Stations the adaptive poller found due on its last tick")
 
 # 🚨 THE FIX: A polite ID card for the API
 HEADERS = {
     "User-Agent": "(student-weather-station-v1.0, contact@github.com)"
 }
 
-def get_stations():
-    """Reads the JSON config file."""
-    try:
-        with open(CONFIG_FILE, "r") as f:
-            data = json.load(f)
-            return data["stations"]
-    except FileNotFoundError:
-        print(f"❌ Error: Config file {CONFIG_FILE} not found!")
-        return {}
-
 def init_db():
     """Ensures the DB exists (Just in case)."""
-    os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS observations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            station_id TEXT,
-            timestamp TEXT,
-            temp_f REAL,
-            humidity REAL,
-            wind_speed REAL,
-            description TEXT,
-            raw_json TEXT
+    get_writer()
+
+def get_writer():
+    """One persistent writer per process, reused by every cycle."""
+    global _writer
+    if _writer is None:
+        _writer = db.ObservationWriter(DB_FILE, timezones=station_registry.load().timezones)
+    return _writer
+
+def get_client():
+    """Keep-alive session, rate limiter and ETag memory shared by every cycle."""
+    global _client
+    if _client is None:
+        _client = http_client.HttpClient(
+            HEADERS["User-Agent"], rate=REQUESTS_PER_SECOND, burst=MAX_WORKERS, pool_size=MAX_WORKERS
         )
-    ''')
-    conn.commit()
-    conn.close()
+    return _client
 
-def fetch_weather(station_id):
-    """Gets data from NWS API with the new Headers."""
-    url = f"https://api.weather.gov/stations/{station_id}/observations/latest"
-    
+def get_pace_tracker(stations):
+    """
+    Loads the pace checkpoint once per process. A station with nothing from
+    today in the checkpoint is seeded from the DB a single time (including
+    stations that join a sharded worker later).
+    """
+    global _pace
+    if _pace is None:
+        _pace = pace_state.PaceTracker.load(PACE_CHECKPOINT, timezones=station_registry.load().timezones)
+    for info in stations.values():
+        sid = info["station_id"]
+        if sid in _seeded:
+            continue
+        _seeded.add(sid)
+        if not _pace.is_today(sid):
+            state = _pace.get(sid)
+            times, temps = pace_model.get_todays_arrays(sid, info.get("timezone", "UTC"))
+            for epoch, temp in zip(times.tolist(), temps.tolist()):
+                state.update(epoch, temp)
+    return _pace
+
+def update_pace(stations, rows):
+    """Feeds this cycle's saved rows into the pace state and checkpoints it."""
+    tracker = get_pace_tracker(stations)
+    for row in rows:
+        station_id, timestamp, temp_f = row[:3]
+        if not tracker.update(station_id, timestamp, temp_f):
+            continue
+
+        velocity = tracker.result(station_id)['velocity'][pace_state.LOOKBACK]
+        if velocity > 2.0:
+            PACE_SIGNALS.inc(signal="surge")
+            log.warning("🚨 %s: SURGE DETECTED (+%.1f°F/hr)", station_id, velocity,
+                        extra={"station": station_id, "velocity": round(velocity, 2)})
+        elif velocity < -2.0:
+            PACE_SIGNALS.inc(signal="plunge")
+            log.warning("🚨 %s: PLUNGE DETECTED (%.1f°F/hr)", station_id, velocity,
+                        extra={"station": station_id, "velocity": round(velocity, 2)})
+    tracker.save(PACE_CHECKPOINT)
+
+def latest_url(station_id):
+    return f"{API_BASE}/stations/{station_id}/observations/latest"
+
+def commit_fetched(station_ids, client=None):
+    """
+    Once a station's reading is committed (or deliberately dropped), its ETag
+    may be used: from then on an unchanged /latest comes back as a 304.
+    """
+    client = client or get_client()
+    for station_id in station_ids:
+        client.commit_validators(latest_url(station_id))
+
+@metrics.timed(FETCH_SECONDS)
+def fetch_latest(station_id, client=None, deadline=None):
+    """
+    Gets the latest observation body (bytes) from the NWS API.
+    Returns (result, body): body is only set for result "new". The other
+    results are "unchanged" (HTTP 304), "http_<code>", "error",
+    "circuit_open" (the station kept failing, so it's skipped for a while)
+    and "deadline" (the cycle ran out of time). Never raises.
+    The response's ETag only counts once commit_fetched() says the reading
+    was stored, so a failed write is fetched again instead of 304'd away.
+    """
+    url = latest_url(station_id)
+    result, body = "error", None
     try:
-        # 🚨 THE FIX IS HERE: We pass 'headers=HEADERS'
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        
-        if response.status_code == 200:
-            return response.json()
+        client = client or get_client()
+        response = client.get(url, conditional=True, timeout=FETCH_TIMEOUT,
+                              retries=FETCH_RETRIES, deadline=deadline, defer_validators=True)
+
+        if response.not_modified:
+            result = "unchanged"
+            log.debug("💤 No new observation for %s", station_id, extra={"station": station_id})
+        elif response.status_code == 200:
+            result, body = "new", response.content
         else:
-            print(f"⚠️ API Error for {station_id}: {response.status_code}")
-            return None
+            result = f"http_{response.status_code}"
+            log.warning("⚠️ API Error for %s: %s", station_id, response.status_code,
+                        extra={"station": station_id, "status": response.status_code})
+    except http_client.CircuitOpenError as e:
+        result = "circuit_open"
+        log.debug("🔌 Skipping %s: %s", station_id, e, extra={"station": station_id})
+    except http_client.DeadlineExceeded as e:
+        result = "deadline"
+        log.warning("⌛ Out of time for %s: %s", station_id, e, extra={"station": station_id})
     except Exception as e:
-        print(f"❌ Connection Error for {station_id}: {e}")
-        return None
+        log.error("❌ Connection Error for %s: %s", station_id, e, extra={"station": station_id})
+    FETCHES.inc(result=result)
+    return result, body
 
-def save_observation(station_id, data):
-    """Saves the data to SQLite."""
+def fetch_raw(station_id, client=None, deadline=None):
+    """
+    Just the body from fetch_latest. Returns None when it hasn't changed
+    since last time (HTTP 304) or on error.
+    """
+    return fetch_latest(station_id, client, deadline)[1]
+
+def fetch_weather(station_id, client=None):
+    """Same as fetch_raw, decoded. Returns None when there's nothing new."""
+    body = fetch_raw(station_id, client)
+    return json.loads(body) if body else None
+
+def parse_observation(station_id, data, raw_json=None):
+    """Turns one API response into a row for the observations table."""
+    props = data.get('properties', {})
+    
+    # Extract fields
+    temp_f = props.get('temperature', {}).get('value')
+    if temp_f is not None: temp_f = (temp_f * 9/5) + 32  # Convert C to F (0 °C is a reading, not a gap)
+    
+    humidity = props.get('relativeHumidity', {}).get('value')
+    wind = props.get('windSpeed', {}).get('value')
+    desc = props.get('textDescription', 'Unknown')
+    timestamp = props.get('timestamp', datetime.now().isoformat())
+    raw_json = raw_json or json.dumps(data)
+
+    return (station_id, timestamp, temp_f, humidity, wind, desc, raw_json)
+
+@metrics.timed(SAVE_SECONDS)
+def save_observation(station_id, data, writer=None):
+    """
+    Saves the data to SQLite and returns the row.
+    With a writer the row is only buffered; the caller flushes the whole batch.
+    """
     if not data: return
 
     try:
-        props = data.get('properties', {})
-        
-        # Extract fields
-        temp_f = props.get('temperature', {}).get('value')
-        if temp_f: temp_f = (temp_f * 9/5) + 32  # Convert C to F
-        
-        humidity = props.get('relativeHumidity', {}).get('value')
-        wind = props.get('windSpeed', {}).get('value')
-        desc = props.get('textDescription', 'Unknown')
-        timestamp = props.get('timestamp', datetime.now().isoformat())
-        raw_json = json.dumps(data)
-
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO observations 
-            (station_id, timestamp, temp_f, humidity, wind_speed, description, raw_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (station_id, timestamp, temp_f, humidity, wind, desc, raw_json))
-        
-        conn.commit()
-        conn.close()
-        print(f"✅ SAVED: {station_id} | {temp_f:.1f}°F")
+        row = parse_observation(station_id, data)
+        if row[2] is None:
+            log.info("⚠️ No temperature in latest report for %s, skipping.", station_id, extra={"station": station_id})
+            return
+
+        if writer:
+            writer.add(row)
+        else:
+            writer = get_writer()
+            writer.add(row)
+            writer.flush()
+            commit_fetched([station_id])
+        log.debug("✅ SAVED: %s | %.1f°F", station_id, row[2], extra={"station": station_id})
+        return row
         
     except Exception as e:
-        print(f"❌ Error saving {station_id}: {e}")
+        log.error("❌ Error saving %s: %s", station_id, e, extra={"station": station_id})
+
+# --- PIPELINE STAGES ---
+def normalize(item):
+    """Parse stage: (station_id, body bytes) -> observation row, or None to drop it."""
+    station_id, body = item
+    text = body.decode('utf-8')
+    row = parse_observation(station_id, json.loads(text), raw_json=text)
+    if row[2] is None:
+        log.info("⚠️ No temperature in latest report for %s, skipping.", station_id, extra={"station": station_id})
+        commit_fetched([station_id])  # Nothing to store; fetching it again won't change that
+        return None
+    return row
+
+def write_batch(rows):
+    """Write stage: one transaction per batch. Returns the rows so they reach the pace tracker."""
+    writer = get_writer()
+    for row in rows:
+        writer.add(row)
+    writer.flush()
+    commit_fetched({row[0] for row in rows})
+    if log.isEnabledFor(logging.DEBUG):
+        for row in rows:
+            log.debug("✅ SAVED: %s | %.1f°F", row[0], row[2], extra={"station": row[0]})
+    return rows
+
+def get_pipeline_metrics():
+    """Per-stage counters, latency and queue depth from the running (or last) sweep."""
+    return _pipeline.metrics() if _pipeline else {}
+
+def collect_all(stations, fetch_workers=FETCH_WORKERS, parse_workers=PARSE_WORKERS, deadline=CYCLE_DEADLINE):
+    """
+    Streams every station through fetch -> parse -> write with bounded queues
+    in between. Fetches share one keep-alive session and the per-host token
+    bucket; the writer commits in batches on its own thread, so SQLite still
+    only ever sees one writer and a slow write never stalls the fetchers.
+
+    Fetching stops `deadline` seconds in: a request in flight is cut off by
+    its clipped timeout and the stations still queued are skipped. Those,
+    and any station that failed or whose circuit is open, are marked stale
+    instead of holding up the rest.
+    """
+    global _pipeline
+    client = get_client()
+    writer = get_writer()  # Created here, before the stage threads share it
+    started = time.monotonic()
+    cutoff = started + deadline
+    outcomes = {}  # station_id -> fetch result
+
+    def fetch(station_id):
+        if time.monotonic() >= cutoff:
+            result, body = "deadline", None
+            FETCHES.inc(result=result)
+        else:
+            result, body = fetch_latest(station_id, client, cutoff)
+        outcomes[station_id] = result
+        return (station_id, body) if body else None
+
+    _pipeline = pipeline.Pipeline([
+        pipeline.Stage("fetch", fetch, workers=fetch_workers),
+        pipeline.Stage("parse", normalize, workers=parse_workers),
+        pipeline.BatchStage("write", write_batch, batch_size=WRITE_BATCH),
+    ])
+    rows = _pipeline.run(info["station_id"] for info in stations.values())
+
+    # Pace signal is ready as soon as the rows are committed
+    update_pace(stations, rows)
+
+    now = time.time()
+    newest = {}  # station_id -> epoch of its newest reading this sweep
+    for row in rows:
+        epoch = timekeys.to_epoch(row[1])
+        FRESHNESS.observe(max(0.0, now - epoch))
+        newest[row[0]] = max(epoch, newest.get(row[0], epoch))
+    if _poller is not None:
+        tracker = get_pace_tracker(stations)
+        for sid, result in outcomes.items():
+            velocity = tracker.result(sid)['velocity'][pace_state.LOOKBACK] if sid in newest else None
+            _poller.record(sid, result == "new", newest.get(sid), velocity, now)
+
+    stale = {sid: result for sid, result in outcomes.items() if result not in HEALTHY}
+    writer.mark_health([sid for sid, result in outcomes.items() if result in HEALTHY], stale, time.time())
+    STALE_STATIONS.set(len(stale))
+    if stale:
+        log.warning("🕸️  %d stations stale this cycle: %s", len(stale),
+                    ", ".join(f"{sid} ({result})" for sid, result in sorted(stale.items())),
+                    extra={"stale": len(stale)})
+
+    elapsed = time.monotonic() - started
+    record_cycle(len(stations), len(rows), elapsed)
+    log.info("⏱️  Collected %d stations in %.1fs (%d rows written)", len(stations), elapsed, len(rows),
+             extra={"stations": len(stations), "rows": len(rows), "seconds": round(elapsed, 3)})
+    log.info("   📊 %s", _pipeline.summary())
+
+def record_cycle(station_count, row_count, elapsed):
+    """Cycle totals and the pipeline's per-stage numbers, for the metrics endpoint."""
+    CYCLE_SECONDS.observe(elapsed)
+    CYCLE_STATIONS.set(station_count)
+    CYCLE_ROWS.set(row_count)
+    LAST_CYCLE.set(time.time())
+    for stage, m in get_pipeline_metrics().items():
+        STAGE_ITEMS.set(m['items'], stage=stage)
+        STAGE_ERRORS.set(m['errors'], stage=stage)
+        STAGE_BUSY.set(m['busy_s'], stage=stage)
+        STAGE_QUEUE.set(m['max_queue_depth'], stage=stage)
+
+def run_collection(station_ids=None):
+    """
+    One full sweep. Safe to call repeatedly from a long-running process.
+    station_ids limits it to a subset (a sharded worker's share).
+    """
+    log.info("--- STARTING COLLECTION: %s ---", datetime.now().strftime('%H:%M:%S'))
+    stations = station_registry.load().by_key
+    if station_ids is not None:
+        wanted = set(station_ids)
+        stations = {key: info for key, info in stations.items() if info["station_id"] in wanted}
+    collect_all(stations)
+
+def get_poller():
+    """The adaptive schedule; stations are learned from the DB the first time they're seen."""
+    global _poller
+    if _poller is None:
+        _poller = polling.AdaptivePoller()
+    return _poller
+
+def run_due(station_ids=None):
+    """
+    Adaptive mode: called every few seconds, polls only the stations whose
+    next report should be out by now. Cheap when nothing is due.
+    """
+    stations = station_registry.load().by_key
+    if station_ids is not None:
+        wanted = set(station_ids)
+        stations = {key: info for key, info in stations.items() if info["station_id"] in wanted}
+
+    poller = get_poller()
+    writer = get_writer()
+    for info in stations.values():
+        sid = info["station_id"]
+        if not poller.known(sid):
+            with writer.lock:
+                poller.learn(sid, polling.recent_epochs(writer.conn, sid))
+
+    due = set(poller.due([info["station_id"] for info in stations.values()]))
+    POLL_DUE.set(len(due))
+    if not due:
+        return
+    log.info("--- POLLING %d DUE STATIONS: %s ---", len(due), datetime.now().strftime('%H:%M:%S'))
+    collect_all({key: info for key, info in stations.items() if info["station_id"] in due})
 
 # --- MAIN LOOP ---
 if __name__ == "__main__":
-    print(f"--- STARTING COLLECTION: {datetime.now().strftime('%H:%M:%S')} ---")
+    logs.setup()
     init_db()
-    stations = get_stations()
-    
-    for name, info in stations.items():
-        sid = info["station_id"]
-        print(f"Fetching {name} ({sid})...")
-        weather_data = fetch_weather(sid)
-        save_observation(sid, weather_data)
-        time.sleep(1) # Be polite, wait 1 second between requests
-        
-    print("---------------------------------------------")
\ No newline at end of file
+    run_collection()
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Leveled logging for the long-running processes.
+
+    log = logs.get_logger(__name__)
+    log.debug("Saved %s %.1f°F", station_id, temp, extra={"station": station_id})
+
+Per-station chatter is DEBUG, cycle summaries are INFO, so at the default
+level the hot path only pays an isEnabledFor() check: arguments are
+formatted lazily and never for a disabled level. Anything passed in
+`extra` comes out as key=value pairs (or JSON fields with
+WEATHER_LOG_FORMAT=json), so the lines can be grepped or shipped as-is.
+"""
+import json
+import logging
+import os
+import sys
+
+# --- CONFIGURATION ---
+LOG_LEVEL = os.environ.get("WEATHER_LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("WEATHER_LOG_FORMAT", "text")  # "text" or "json"
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD}
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += "  " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def setup(level=None, fmt=None):
+    """Configures the "weather" logger tree once per process. Safe to call again to change the level."""
+    root = logging.getLogger("weather")
+    root.setLevel((level or LOG_LEVEL).upper())
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else TextFormatter())
+    root.handlers[:] = [handler]
+    root.propagate = False
+    return root
+
+def get_logger(name):
+    """Module loggers all hang off "weather", so setup() controls them together."""
+    if not name.startswith("weather"):
+        name = f"weather.{name.strip('_')}"
+    return logging.getLogger(name)
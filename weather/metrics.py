@@ -0,0 +1,220 @@
+"""
+In-process counters, gauges and latency histograms, plus a tiny HTTP
+endpoint that serves them.
+
+    FETCH_SECONDS = metrics.histogram("nws_fetch_seconds", "Latest-observation fetch time")
+
+    @metrics.timed(FETCH_SECONDS)
+    def fetch(...): ...
+
+    with FETCH_SECONDS.time(station="KNYC"): ...
+
+Everything lives in plain dicts behind one lock per metric; recording a
+sample is a dict lookup and a few additions. The collector serves the
+registry at /metrics (Prometheus text format) and /metrics.json.
+"""
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURATION ---
+# Seconds; covers a cached SQLite read up to a slow NWS response
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_HOST = "0.0.0.0"
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key):
+    if not key:
+        return ""
+    inner = ",".join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in key)
+    return "{" + inner + "}"
+
+class Counter:
+    """Only goes up. One value per label set."""
+    kind = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, value) for key, value in self.values.items()]
+
+    def as_dict(self):
+        with self.lock:
+            return {_format_labels(key) or "": value for key, value in self.values.items()}
+
+class Gauge(Counter):
+    """The current value of something (queue depth, rows in the last cycle)."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[_key(labels)] = value
+
+class Histogram:
+    """Cumulative buckets plus count and sum per label set, like a Prometheus histogram."""
+    kind = "histogram"
+
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.series = {}  # label key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = _key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        out = []
+        with self.lock:
+            for key, series in self.series.items():
+                running = 0
+                for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                    running += count
+                    out.append((f"{self.name}_bucket", key + (("le", bound),), running))
+                out.append((f"{self.name}_count", key, running))
+                out.append((f"{self.name}_sum", key, series[-1]))
+        return out
+
+    def as_dict(self):
+        """{labels: {count, sum, avg, p50, p90, p99}} with quantiles read off the bucket bounds."""
+        with self.lock:
+            snapshot = {key: list(series) for key, series in self.series.items()}
+        result = {}
+        for key, series in snapshot.items():
+            count = sum(series[:-1])
+            entry = {'count': count, 'sum': series[-1], 'avg': series[-1] / count if count else 0.0}
+            for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+                entry[name] = self._quantile(series, count, q)
+            result[_format_labels(key) or ""] = entry
+        return result
+
+    def _quantile(self, series, count, q):
+        if not count:
+            return 0.0
+        target = q * count
+        running = 0
+        for bound, n in zip(self.buckets, series):
+            running += n
+            if running >= target:
+                return bound
+        return None  # Beyond the last bucket
+
+class _Timer:
+    """Context manager that observes the elapsed time into a histogram."""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _get(self, cls, name, help, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def render_prometheus(self):
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample, key, value in metric.samples():
+                lines.append(f"{sample}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {name: {'type': metric.kind, 'values': metric.as_dict()}
+                for name, metric in sorted(self.metrics.items())}
+
+REGISTRY = Registry()
+
+def counter(name, help=""):
+    return REGISTRY._get(Counter, name, help)
+
+def gauge(name, help=""):
+    return REGISTRY._get(Gauge, name, help)
+
+def histogram(name, help="", buckets=DEFAULT_BUCKETS):
+    return REGISTRY._get(Histogram, name, help, buckets=buckets)
+
+def timed(histogram, **labels):
+    """Decorator: every call's duration goes into `histogram`, exceptions included."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorate
+
+# --- ENDPOINT ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type = REGISTRY.render_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(REGISTRY.snapshot()).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(port, host=METRICS_HOST):
+    """Serves /metrics and /metrics.json on a daemon thread. Returns the server (port 0 picks one)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
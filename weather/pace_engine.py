@@ -0,0 +1,112 @@
+"""
+Vectorized pace engine.
+
+Same answers as pace_model.calculate_velocity, but a station's day is held as
+two NumPy arrays (epoch seconds, temps) and the "reading closest to one hour
+ago" is found with searchsorted instead of a Python loop. Many stations are
+processed in one pass by laying their arrays end to end.
+"""
+import numpy as np
+
+from weather import timekeys
+
+# --- CONFIGURATION ---
+HOUR = 3600
+DEFAULT_LOOKBACKS = (HOUR,)  # Seconds. 1h is the classic pace signal.
+TOLERANCE_RATIO = 0.75       # 45 min out of 60, same as calculate_velocity
+PROJECTION_HOURS = 3
+_SEGMENT_SHIFT = 2 ** 34     # Bigger than any epoch second we'll see; keeps stations apart
+
+def to_arrays(observations):
+    """[(timestamp_str, temp_f), ...] -> (int64 epoch seconds, float64 temps)."""
+    stamps = [ts for ts, _ in observations]
+    if all(ts.endswith(('Z', '+00:00')) for ts in stamps):
+        # The API reports UTC, so NumPy can parse the whole column at once
+        naive = [ts[:-1] if ts.endswith('Z') else ts[:-6] for ts in stamps]
+        times = np.array(naive, dtype='datetime64[s]').astype(np.int64)
+    else:
+        times = np.fromiter((timekeys.to_epoch(ts) for ts in stamps), dtype=np.int64, count=len(stamps))
+    temps = np.array([np.nan if t is None else t for _, t in observations], dtype=np.float64)
+    return times, temps
+
+def _stack(station_arrays):
+    """Lays every station end to end. Returns ids, starts, ends, keys, temps."""
+    ids, starts, ends, keys, temps = [], [], [], [], []
+    offset = 0
+    for segment, (sid, (t, v)) in enumerate(station_arrays.items()):
+        if len(t) == 0:
+            continue
+        ids.append(sid)
+        starts.append(offset)
+        offset += len(t)
+        ends.append(offset)
+        # One sorted key space: station number in the high bits, time in the low bits
+        keys.append(t + segment * _SEGMENT_SHIFT)
+        temps.append(v)
+
+    if not ids:
+        return [], None, None, None, None
+    return (ids, np.array(starts), np.array(ends),
+            np.concatenate(keys), np.concatenate(temps))
+
+def _velocity(keys, temps, starts, ends, lookback):
+    """Per-station change over `lookback`, in °F per hour."""
+    last = ends - 1
+    target = keys[last] - lookback
+
+    right = np.searchsorted(keys, target, side='left')
+    left = right - 1
+
+    right_ok = right < ends
+    left_ok = left >= starts
+    right_c = np.where(right_ok, right, last)
+    left_c = np.where(left_ok, left, starts)
+
+    right_diff = np.where(right_ok, np.abs(keys[right_c] - target), np.iinfo(np.int64).max)
+    left_diff = np.where(left_ok, np.abs(keys[left_c] - target), np.iinfo(np.int64).max)
+
+    # Ties go to the earlier reading, like the strict "<" in the loop version
+    use_left = left_diff <= right_diff
+    chosen = np.where(use_left, left_c, right_c)
+    diff = np.minimum(left_diff, right_diff)
+
+    # Duplicate timestamps: the loop keeps the first copy it meets
+    chosen = np.searchsorted(keys, keys[chosen], side='left')
+
+    change = temps[last] - temps[chosen]
+    valid = (ends - starts >= 2) & (diff < lookback * TOLERANCE_RATIO)
+    return np.where(valid, change / (lookback / HOUR), 0.0)
+
+def analyze_batch(station_arrays, lookbacks=DEFAULT_LOOKBACKS):
+    """
+    station_arrays: {station_id: (times, temps)} with times sorted ascending.
+    Returns {station_id: {current, high, low, velocity: {lookback: v}, projected_3hr}}.
+    velocity[3600] is the number calculate_velocity would give.
+    """
+    ids, starts, ends, keys, temps = _stack(station_arrays)
+    if not ids:
+        return {}
+
+    current = temps[ends - 1]
+    high = np.fmax.reduceat(temps, starts)
+    low = np.fmin.reduceat(temps, starts)
+    velocities = {lb: _velocity(keys, temps, starts, ends, lb) for lb in lookbacks}
+    main = velocities[lookbacks[0]]
+
+    results = {}
+    for i, sid in enumerate(ids):
+        results[sid] = {
+            'current': float(current[i]),
+            'high': float(high[i]),
+            'low': float(low[i]),
+            'velocity': {lb: float(v[i]) for lb, v in velocities.items()},
+            'projected_3hr': float(current[i] + main[i] * PROJECTION_HOURS),
+        }
+    return results
+
+def velocity(observations, lookback=HOUR):
+    """Drop-in for calculate_velocity on a single station's rows."""
+    if len(observations) < 2:
+        return 0.0
+    result = analyze_batch({'_': to_arrays(observations)}, lookbacks=(lookback,))
+    return result['_']['velocity'][lookback]
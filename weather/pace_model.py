@@ -1,39 +1,31 @@
-import sqlite3
-import json
-import os
 from datetime import datetime, timedelta
 
+from weather import archive, db, metrics, pace_engine, station_registry, timekeys
+
 # --- CONFIGURATION ---
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'stations.json')
-DB_PATH = os.path.join(BASE_DIR, 'data', 'observations.db')
+DB_PATH = db.OBS_DB_PATH
 
-def load_config():
-    with open(CONFIG_PATH, 'r') as f:
-        return json.load(f)
+PACE_SECONDS = metrics.histogram("pace_model_seconds", "pace_model functions, by function")
 
-def get_todays_observations(station_id):
+@metrics.timed(PACE_SECONDS, func="get_todays_observations")
+def get_todays_observations(station_id, tz_name=None):
     """
-    Fetches all temperature readings for the station since Midnight UTC.
+    Fetches all temperature readings from the station's current local day,
+    as [(timestamp, temp_f)]. local_date is precomputed at ingest, so this is
+    one indexed equality lookup.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get start of today (UTC) - Simplified for this prototype
-    # In a real app, you'd handle local timezones more strictly.
-    today_start = datetime.utcnow().strftime("%Y-%m-%dT00:00:00")
-    
-    cursor.execute('''
-        SELECT timestamp, temp_f 
-        FROM observations 
-        WHERE station_id = ? AND timestamp >= ?
-        ORDER BY timestamp ASC
-    ''', (station_id, today_start))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    today = timekeys.today(tz_name or station_registry.load().timezone(station_id))
+    frame = archive.query(station_id, columns=('timestamp', 'temp_f'), db_path=DB_PATH, local_date=today)
+    return list(zip(frame['timestamp'], frame['temp_f']))
+
+@metrics.timed(PACE_SECONDS, func="get_todays_arrays")
+def get_todays_arrays(station_id, tz_name=None):
+    """Same readings as (epoch seconds, temps) NumPy arrays, ready for pace_engine. No parsing."""
+    today = timekeys.today(tz_name or station_registry.load().timezone(station_id))
+    frame = archive.query(station_id, columns=('epoch', 'temp_f'), db_path=DB_PATH, local_date=today)
+    return frame['epoch'].to_numpy(), frame['temp_f'].to_numpy(dtype='float64')
 
+@metrics.timed(PACE_SECONDS, func="calculate_velocity")
 def calculate_velocity(observations):
     """
     Calculates how fast the temperature is changing (Degrees per Hour).
@@ -69,27 +61,34 @@ def calculate_velocity(observations):
     
     return 0.0
 
-def analyze_station(station_id, name):
+@metrics.timed(PACE_SECONDS, func="analyze_station")
+def analyze_station(station_id, name, result=None):
+    """
+    Prints the pace dashboard for one station.
+    run_analysis passes in a result computed for all stations in one batch.
+    """
     print(f"\n📊 ANALYZING: {name} ({station_id})")
     
-    data = get_todays_observations(station_id)
+    if result is None:
+        times, temps = get_todays_arrays(station_id)
+        if len(times):
+            result = pace_engine.analyze_batch({station_id: (times, temps)})[station_id]
     
-    if not data:
+    if not result:
         print("   ⚠️  No data found for today yet.")
         return
 
     # 1. Basic Stats
-    temps = [row[1] for row in data]
-    current_temp = temps[-1]
-    running_high = max(temps)
-    running_low = min(temps)
+    current_temp = result['current']
+    running_high = result['high']
+    running_low = result['low']
     
     # 2. Calculate Pace (Velocity)
-    velocity = calculate_velocity(data)
+    velocity = result['velocity'][pace_engine.HOUR]
     
     # 3. Simple Projection (Where will we be in 3 hours?)
     # This is a basic "Linear Projection"
-    projected_3hr = current_temp + (velocity * 3)
+    projected_3hr = result['projected_3hr']
     
     # --- OUTPUT DASHBOARD ---
     print(f"   🌡️  Current Temp:   {current_temp}°F")
@@ -115,13 +114,23 @@ def analyze_station(station_id, name):
         print("   ✅  SIGNAL: NORMAL")
 
 def run_analysis():
-    config = load_config()
+    registry = station_registry.load()
     print("--- 🧠 LIVE PACE MODEL ENGINE ---")
     
-    for key, station in config['stations'].items():
-        analyze_station(station['station_id'], station['name'])
+    stations = registry.stations()
+    arrays = {}
+    for station in stations:
+        times, temps = get_todays_arrays(station['station_id'], registry.timezone(station['station_id']))
+        if len(times):
+            arrays[station['station_id']] = (times, temps)
+    
+    # Every station in one vectorized pass
+    results = pace_engine.analyze_batch(arrays)
+    
+    for station in stations:
+        analyze_station(station['station_id'], station['name'], results.get(station['station_id'], {}))
         
     print("\n---------------------------------")
 
 if __name__ == "__main__":
-    run_analysis()
\ No newline at end of file
+    run_analysis()
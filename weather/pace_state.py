@@ -0,0 +1,182 @@
+"""
+Streaming pace state, updated one observation at a time.
+
+Instead of re-reading today's rows and recomputing everything, each station
+keeps a short ring buffer of recent samples, its running high/low for the
+local day, and monotonic deques for the high/low over a sliding window.
+update() is O(1) amortized. The whole tracker checkpoints to a JSON file so
+a restart picks up where it left off without rescanning the day.
+"""
+import json
+import os
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from operator import itemgetter
+from zoneinfo import ZoneInfo
+
+from weather import db, timekeys
+
+# --- CONFIGURATION ---
+CHECKPOINT_PATH = os.path.join(db.BASE_DIR, 'data', 'pace_state.json')
+LOOKBACK = 3600          # Velocity compares against the reading closest to 1 hour ago
+TOLERANCE = 45 * 60      # ...if one exists within 45 minutes of that point
+BUFFER_SECONDS = LOOKBACK + TOLERANCE
+BUFFER_MAX = 512         # Hard cap on samples kept per station
+WINDOW_SECONDS = 3 * 3600  # Sliding window for recent_high / recent_low
+PROJECTION_HOURS = 3
+
+_epoch = itemgetter(0)  # (epoch, temp) -> epoch, the bisect key over a station's samples
+
+class StationPace:
+    """Pace state for a single station."""
+
+    def __init__(self, tz_name='UTC'):
+        self.tz_name = tz_name
+        self.tz = ZoneInfo(tz_name)
+        self.samples = deque(maxlen=BUFFER_MAX)  # (epoch, temp), oldest first
+        self.window_max = deque()                # (epoch, temp), temps decreasing
+        self.window_min = deque()                # (epoch, temp), temps increasing
+        self.local_date = None
+        self.day_high = None
+        self.day_low = None
+
+    def update(self, epoch, temp):
+        """Adds one reading. Returns False for duplicates or out-of-order readings."""
+        if temp is None or (self.samples and epoch <= self.samples[-1][0]):
+            return False
+
+        # Running high/low reset at the station's local midnight
+        local_date = datetime.fromtimestamp(epoch, self.tz).date().isoformat()
+        if local_date != self.local_date:
+            self.local_date = local_date
+            self.day_high = self.day_low = temp
+        else:
+            self.day_high = max(self.day_high, temp)
+            self.day_low = min(self.day_low, temp)
+
+        self.samples.append((epoch, temp))
+        while self.samples[0][0] < epoch - BUFFER_SECONDS:
+            self.samples.popleft()
+
+        # Monotonic deques: each sample enters and leaves once
+        while self.window_max and self.window_max[-1][1] <= temp:
+            self.window_max.pop()
+        self.window_max.append((epoch, temp))
+        while self.window_min and self.window_min[-1][1] >= temp:
+            self.window_min.pop()
+        self.window_min.append((epoch, temp))
+
+        cutoff = epoch - WINDOW_SECONDS
+        while self.window_max[0][0] < cutoff:
+            self.window_max.popleft()
+        while self.window_min[0][0] < cutoff:
+            self.window_min.popleft()
+        return True
+
+    def velocity(self):
+        """Same rule as pace_model.calculate_velocity, over the buffered samples."""
+        if len(self.samples) < 2:
+            return 0.0
+
+        last_time, last_temp = self.samples[-1]
+        target = last_time - LOOKBACK
+
+        # Straight into the deque: no per-call copy of the timestamps
+        i = bisect_left(self.samples, target, key=_epoch)
+        candidates = [self.samples[j] for j in (i - 1, i) if 0 <= j < len(self.samples)]
+        # Ties go to the earlier reading (min keeps the first of equals)
+        best_time, best_temp = min(candidates, key=lambda sample: abs(sample[0] - target))
+
+        if abs(best_time - target) < TOLERANCE:
+            return last_temp - best_temp
+        return 0.0
+
+    def result(self):
+        """Same shape as a pace_engine.analyze_batch entry."""
+        if not self.samples:
+            return {}
+        current = self.samples[-1][1]
+        velocity = self.velocity()
+        return {
+            'current': current,
+            'high': self.day_high,
+            'low': self.day_low,
+            'recent_high': self.window_max[0][1],
+            'recent_low': self.window_min[0][1],
+            'velocity': {LOOKBACK: velocity},
+            'projected_3hr': current + velocity * PROJECTION_HOURS,
+            'local_date': self.local_date,
+        }
+
+    def to_dict(self):
+        return {
+            'tz': self.tz_name,
+            'samples': list(self.samples),
+            'window_max': list(self.window_max),
+            'window_min': list(self.window_min),
+            'local_date': self.local_date,
+            'day_high': self.day_high,
+            'day_low': self.day_low,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['tz'])
+        state.samples.extend(tuple(s) for s in data['samples'])
+        state.window_max.extend(tuple(s) for s in data['window_max'])
+        state.window_min.extend(tuple(s) for s in data['window_min'])
+        state.local_date = data['local_date']
+        state.day_high = data['day_high']
+        state.day_low = data['day_low']
+        return state
+
+class PaceTracker:
+    """All stations' pace state, keyed by station_id."""
+
+    def __init__(self, timezones=None):
+        self.timezones = timezones or {}  # station_id -> tz name
+        self.stations = {}
+
+    def get(self, station_id):
+        state = self.stations.get(station_id)
+        if state is None:
+            state = StationPace(self.timezones.get(station_id, 'UTC'))
+            self.stations[station_id] = state
+        return state
+
+    def update(self, station_id, timestamp, temp):
+        return self.get(station_id).update(timekeys.to_epoch(timestamp), temp)
+
+    def result(self, station_id):
+        state = self.stations.get(station_id)
+        return state.result() if state else {}
+
+    def is_today(self, station_id):
+        """True if we already hold readings from the station's current local day."""
+        state = self.stations.get(station_id)
+        if not state or not state.samples:
+            return False
+        return state.local_date == datetime.now(timezone.utc).astimezone(state.tz).date().isoformat()
+
+    # --- CHECKPOINTS ---
+    def save(self, path=CHECKPOINT_PATH):
+        """Atomic write: a crash mid-save never leaves a half-written file behind."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({sid: s.to_dict() for sid, s in self.stations.items()}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=CHECKPOINT_PATH, timezones=None):
+        tracker = cls(timezones)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return tracker
+
+        for sid, state in data.items():
+            tracker.stations[sid] = StationPace.from_dict(state)
+        return tracker
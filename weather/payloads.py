@@ -0,0 +1,30 @@
+"""
+Compressed, content-addressed storage for raw API responses.
+
+raw_payloads holds each distinct response once (zlib, keyed by SHA-1 of the
+canonical JSON); observation_payloads maps an observation id to its payload.
+"""
+import hashlib
+import json
+import zlib
+
+def pack_payload(raw_json):
+    """
+    Returns (content_hash, compressed_blob) for one API response.
+    The hash is taken over the canonical JSON, so the same payload
+    fetched twice is stored once.
+    """
+    canonical = json.dumps(json.loads(raw_json), sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+    return digest, zlib.compress(canonical.encode("utf-8"), 6)
+
+def load_payload(conn, observation_id):
+    """The original API response for one observation, or None if we never kept it."""
+    row = conn.execute('''
+        SELECT p.body FROM observation_payloads op
+        JOIN raw_payloads p ON p.hash = op.payload_hash
+        WHERE op.observation_id = ?
+    ''', (observation_id,)).fetchone()
+    if row is None:
+        return None
+    return json.loads(zlib.decompress(row[0]))
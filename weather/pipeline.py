@@ -0,0 +1,179 @@
+"""
+A small staged pipeline: worker threads per stage, bounded queues between them.
+
+    fetch (N threads) -> [queue] -> parse (M threads) -> [queue] -> write (1 thread, batched)
+
+A full queue blocks the stage feeding it, so a slow writer slows fetching
+down instead of piling rows up in memory, and a slow fetch never holds up a
+write that is ready. Every stage records how many items it handled, how long
+each took and how deep its input queue got, so the bottleneck shows up in
+the numbers.
+"""
+import queue
+import threading
+import time
+
+from weather import logs
+
+# --- CONFIGURATION ---
+QUEUE_SIZE = 64     # Items waiting in front of each stage before the one upstream blocks
+BATCH_SIZE = 500    # Items per call of a BatchStage
+BATCH_WAIT = 0.5    # Seconds a partial batch may wait for more items
+
+_DONE = object()  # End-of-stream marker, one per worker
+
+log = logs.get_logger(__name__)
+
+class StageStats:
+    """Counters for one stage. Latency is per item (per batch for a BatchStage)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = 0
+        self.dropped = 0    # func returned None
+        self.errors = 0
+        self.busy = 0.0
+        self.max_latency = 0.0
+        self.max_depth = 0
+
+    def record(self, seconds, result=None, error=False):
+        with self.lock:
+            self.items += 1
+            self.busy += seconds
+            self.max_latency = max(self.max_latency, seconds)
+            if error:
+                self.errors += 1
+            elif result is None:
+                self.dropped += 1
+
+    def as_dict(self, depth):
+        with self.lock:
+            return {
+                'items': self.items,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'avg_ms': 1000 * self.busy / self.items if self.items else 0.0,
+                'max_ms': 1000 * self.max_latency,
+                'busy_s': self.busy,
+                'queue_depth': depth,
+                'max_queue_depth': self.max_depth,
+            }
+
+class Stage:
+    """
+    func(item) -> output, or None to drop the item. Runs on `workers` threads.
+    Exceptions are counted and the item is dropped; the stream keeps going.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = StageStats()
+
+    def put(self, item):
+        self.queue.put(item)  # Blocks while the queue is full: backpressure
+        depth = self.queue.qsize()
+        with self.stats.lock:
+            self.stats.max_depth = max(self.stats.max_depth, depth)
+
+    def _call(self, item):
+        started = time.perf_counter()
+        try:
+            result = self.func(item)
+        except Exception as e:
+            self.stats.record(time.perf_counter() - started, error=True)
+            log.error("❌ %s: %s", self.name, e, extra={"stage": self.name})
+            return None
+        self.stats.record(time.perf_counter() - started, result)
+        return result
+
+    def run(self, emit):
+        """Worker loop: take, process, pass on, until the end-of-stream marker."""
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                return
+            result = self._call(item)
+            if result is not None:
+                emit(result)
+
+class BatchStage(Stage):
+    """
+    func(list_of_items) -> list of outputs. Collects up to batch_size items,
+    or whatever arrived within batch_wait seconds, and handles them in one call.
+    Meant for the single writer at the end of the line.
+    """
+
+    def __init__(self, name, func, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT, queue_size=QUEUE_SIZE):
+        super().__init__(name, func, workers=1, queue_size=queue_size)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+
+    def run(self, emit):
+        done = False
+        while not done:
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_wait
+            if batch:
+                for result in self._call(batch) or ():
+                    emit(result)
+
+class Pipeline:
+    """Stages run left to right; run(items) returns what comes out of the last stage."""
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    def run(self, items):
+        results = []
+        results_lock = threading.Lock()
+
+        def collect(result):
+            with results_lock:
+                results.append(result)
+
+        threads = []
+        for i, stage in enumerate(self.stages):
+            emit = self.stages[i + 1].put if i + 1 < len(self.stages) else collect
+            group = [threading.Thread(target=stage.run, args=(emit,), name=f"{stage.name}-{n}", daemon=True)
+                     for n in range(stage.workers)]
+            for thread in group:
+                thread.start()
+            threads.append(group)
+
+        first = self.stages[0]
+        for item in items:
+            first.put(item)
+
+        # Shut down in order: a stage only gets its end markers once everything upstream has drained into it
+        for stage, group in zip(self.stages, threads):
+            for _ in group:
+                stage.queue.put(_DONE)
+            for thread in group:
+                thread.join()
+        return results
+
+    def metrics(self):
+        """{stage name: {items, dropped, errors, avg_ms, max_ms, busy_s, queue_depth, max_queue_depth}}"""
+        return {stage.name: stage.stats.as_dict(stage.queue.qsize()) for stage in self.stages}
+
+    def summary(self):
+        parts = []
+        for name, m in self.metrics().items():
+            parts.append(f"{name} {m['items']} in, avg {m['avg_ms']:.0f}ms, max {m['max_ms']:.0f}ms, "
+                         f"queue max {m['max_queue_depth']}")
+        return " | ".join(parts)
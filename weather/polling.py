@@ -0,0 +1,177 @@
+"""
+Adaptive polling: fetch each station just after its next report should be
+out, instead of every station on one fixed interval.
+
+Most ASOS stations send a routine report once an hour at a fixed minute
+(e.g. :51), plus specials when the weather changes; some send every 5
+minutes. The cadence (median gap between readings) and phase (the usual
+minute, modulo the cadence) are learned from the epochs already in the
+observations table and updated from every new reading. The next poll goes
+out PUBLISH_LAG after the expected report time.
+
+    expected report arrived  -> next slot
+    not there yet            -> re-check after RECHECK, doubling while it stays static
+    |velocity| > 2 °F/hr     -> at least every FAST_INTERVAL (specials are likely)
+
+We only ever see the readings we fetched, so history collected at a slower
+rate hides a faster station. Every PROBE_EVERY-th poll therefore goes out
+at half the cadence; if that finds a reading, the cadence drops to the gap
+it saw and the estimate starts over from there.
+
+Every station is polled at least every MAX_INTERVAL no matter what.
+"""
+import threading
+import time
+from collections import Counter, deque
+from statistics import median
+
+# --- CONFIGURATION ---
+LEARN_DAYS = 2            # History read from the DB when a station is first seen
+HISTORY = 64              # Readings remembered per station for the estimate
+DEFAULT_CADENCE = 900     # Until a station has enough history (the old fixed interval)
+MIN_CADENCE = 300
+MIN_GAP = 60              # Closer readings are duplicates / corrections, not cadence
+PUBLISH_LAG = 240         # Observation time -> showing up on /observations/latest
+RECHECK = 120             # First re-poll when the expected report isn't there yet
+MIN_INTERVAL = 120        # Never poll a station more often than this
+MAX_INTERVAL = 3600       # ...or less often than this
+FAST_INTERVAL = 300       # While the pace signal fires
+SIGNAL_VELOCITY = 2.0     # °F/hr, same thresholds as the SURGE / PLUNGE alerts
+PROBE_EVERY = 6           # One poll in this many checks for a faster cadence
+
+def estimate_cadence(epochs, default=DEFAULT_CADENCE):
+    """
+    (cadence seconds, phase seconds or None) from sorted reading epochs.
+    The phase is the most common offset within the cadence, to the minute,
+    so hourly routine reports at :51 give phase 51*60 even with specials mixed in.
+    """
+    gaps = [b - a for a, b in zip(epochs, epochs[1:]) if b - a >= MIN_GAP]
+    if len(gaps) < 3:
+        return default, None
+    cadence = int(min(max(median(gaps), MIN_CADENCE), MAX_INTERVAL))
+    offsets = Counter((epoch % cadence) // 60 for epoch in epochs)
+    minute, hits = offsets.most_common(1)[0]
+    if hits < 3:
+        return cadence, None
+    return cadence, minute * 60
+
+class StationSchedule:
+    """Learned cadence and the next poll time for one station."""
+
+    def __init__(self, epochs=()):
+        self.epochs = deque(sorted(epochs)[-HISTORY:], maxlen=HISTORY)
+        self.cadence, self.phase = estimate_cadence(list(self.epochs))
+        self.next_due = 0.0  # Poll right away the first time
+        self.misses = 0      # Polls in a row that found nothing new
+        self.velocity = 0.0
+        self.polls = 0       # Successful polls, for spacing out the probes
+        self.probing = False  # The pending poll is a half-cadence probe
+
+    @property
+    def last_epoch(self):
+        return self.epochs[-1] if self.epochs else None
+
+    def expected_report(self):
+        """When the next report after the last one we have should be taken."""
+        last = self.last_epoch
+        if last is None:
+            return None
+        if self.phase is None:
+            return last + self.cadence
+        slot = last - (last % self.cadence) + self.phase
+        while slot <= last + MIN_GAP:
+            slot += self.cadence
+        return slot
+
+    def add_reading(self, epoch):
+        if self.epochs and epoch <= self.epochs[-1]:
+            return False
+        last = self.last_epoch
+        if self.probing and last is not None and MIN_GAP <= epoch - last < self.cadence:
+            # The probe caught a reading we'd have skipped: start over at the faster rate
+            self.cadence = max(epoch - last, MIN_CADENCE)
+            self.epochs = deque([last], maxlen=HISTORY)
+        self.epochs.append(epoch)
+        self.cadence, self.phase = estimate_cadence(list(self.epochs), default=self.cadence)
+        return True
+
+    def schedule(self, now, found_new):
+        """Picks next_due after a poll at `now`."""
+        expected = self.expected_report()
+        self.probing = False
+        if found_new or expected is None:
+            self.misses = 0
+            self.polls += 1
+            if expected is None:
+                due = now + self.cadence
+            elif self.polls % PROBE_EVERY == 0 and self.cadence >= 2 * MIN_CADENCE:
+                self.probing = True
+                due = self.last_epoch + self.cadence // 2 + PUBLISH_LAG
+            else:
+                due = expected + PUBLISH_LAG
+        elif expected + PUBLISH_LAG > now:
+            due = expected + PUBLISH_LAG  # Polled early (first poll, or a fast poll); wait for the slot
+        else:
+            # Overdue and still static: back off from RECHECK towards the cadence
+            self.misses += 1
+            due = now + min(RECHECK * 2 ** (self.misses - 1), self.cadence)
+
+        if abs(self.velocity) > SIGNAL_VELOCITY:
+            due = min(due, now + FAST_INTERVAL)
+        self.next_due = min(max(due, now + MIN_INTERVAL), now + MAX_INTERVAL)
+        return self.next_due
+
+class AdaptivePoller:
+    """Per-station schedules. Thread-safe; the collector feeds it after every sweep."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stations = {}  # station_id -> StationSchedule
+
+    def known(self, station_id):
+        with self.lock:
+            return station_id in self.stations
+
+    def learn(self, station_id, epochs):
+        """Seeds a station from the readings already stored for it."""
+        with self.lock:
+            self.stations[station_id] = StationSchedule(epochs)
+
+    def due(self, station_ids, now=None):
+        now = now or time.time()
+        with self.lock:
+            return [sid for sid in station_ids
+                    if sid not in self.stations or self.stations[sid].next_due <= now]
+
+    def record(self, station_id, found_new, epoch=None, velocity=None, now=None):
+        """One poll's outcome: found_new with the new reading's epoch, plus the latest pace velocity."""
+        now = now or time.time()
+        with self.lock:
+            schedule = self.stations.setdefault(station_id, StationSchedule())
+            if epoch is not None:
+                found_new = schedule.add_reading(epoch) and found_new
+            if velocity is not None:
+                schedule.velocity = velocity
+            return schedule.schedule(now, found_new)
+
+    def next_due(self, station_ids=None):
+        """Earliest next poll among station_ids (all known stations by default), or None."""
+        with self.lock:
+            times = [s.next_due for sid, s in self.stations.items() if station_ids is None or sid in station_ids]
+        return min(times) if times else None
+
+    def snapshot(self):
+        """station_id -> {cadence, phase, next_due, misses, velocity}, for logs and metrics."""
+        with self.lock:
+            return {sid: {'cadence': s.cadence, 'phase': s.phase, 'next_due': s.next_due,
+                          'misses': s.misses, 'velocity': s.velocity}
+                    for sid, s in self.stations.items()}
+
+def recent_epochs(conn, station_id, days=LEARN_DAYS, now=None):
+    """The station's reading epochs from the last `days` days (covering index, no table reads)."""
+    since = int((now or time.time()) - days * 86400)
+    rows = conn.execute(
+        "SELECT epoch FROM observations WHERE station_id = ? AND epoch >= ? ORDER BY epoch",
+        (station_id, since),
+    ).fetchall()
+    return [row[0] for row in rows]
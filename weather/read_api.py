@@ -0,0 +1,631 @@
+"""
+Read-only HTTP API over the observation store, so dashboards and other
+consumers share one reader instead of each opening SQLite themselves.
+
+    python -m weather.read_api [--port 8600]
+
+    GET /latest                        newest reading per station (served from memory)
+    GET /latest/{station_id}
+    GET /range/{station_id}?start=&end=&columns=temp_f,humidity
+    GET /daily/{station_id}?start=YYYY-MM-DD&end=YYYY-MM-DD
+    GET /pace  /pace/{station_id}      today's pace signals, see pace_engine
+    GET /events                        live updates (server-sent events)
+    GET /metrics
+
+One asyncio loop handles the connections; SQLite reads run on a small thread
+pool, each borrowing one of POOL_SIZE read-only connections opened once. A
+background task checks PRAGMA data_version every REFRESH_SECONDS and, only
+when the collector has written something, reloads the newest row of the
+stations that changed. /latest never touches the database, and /pace is
+recomputed at most once per write.
+
+Responses are column-oriented tables: compact JSON ({"column": [values]}) by
+default, or an Arrow IPC stream with ?format=arrow or
+Accept: application/vnd.apache.arrow.stream. /latest and /pace send an ETag,
+so pollers get a 304 until the data changes.
+
+/events pushes instead: every refresh that finds new rows sends them as an
+"observation" event (same columnar JSON, with the row id), followed by a
+"pace" event for the stations they belong to. Rows the collector updated in
+place (NWS corrections keep their id) go out as a "correction" event. The database is the channel,
+so it works the same with one collector or many sharded workers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from weather import archive, db, logs, metrics, pace_engine, polling, rollups, station_registry, timekeys
+
+# --- CONFIGURATION ---
+API_HOST = os.environ.get("READ_API_HOST", "0.0.0.0")
+API_PORT = int(os.environ.get("READ_API_PORT", "8600"))
+POOL_SIZE = 4             # Read-only connections, and threads running queries on them
+REFRESH_SECONDS = 1.0     # How often the latest cache looks for new writes
+PACE_MAX_AGE = 60         # Seconds; pace is also recomputed when the local day rolls over
+DEFAULT_RANGE = 86400     # /range without start: the last day
+MAX_RANGE_DAYS = 31
+DEFAULT_DAILY_DAYS = 7
+KEEPALIVE_SECONDS = 30
+MAX_DELTA = 5000          # New (or corrected) rows per refresh pushed as-is; more than that (a backfill) is a "reset"
+EVENT_BACKLOG = 256       # Events kept for clients that reconnect with Last-Event-ID
+SUBSCRIBER_QUEUE = 1024   # Events waiting per /events client before it counts as too slow
+HEARTBEAT_SECONDS = 15
+MAX_HEADER_BYTES = 16384
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+LATEST_COLUMNS = ('station_id', 'timestamp', 'epoch', 'temp_f', 'humidity', 'wind_speed', 'description')
+RANGE_COLUMNS = ('epoch', 'timestamp', 'local_date', 'temp_f', 'humidity', 'wind_speed', 'description')
+LATEST_SCHEMA = pa.schema([
+    ('station_id', pa.string()),
+    *[archive.SCHEMA.field(c) for c in LATEST_COLUMNS[1:]],
+    ('stale_since', pa.float64()),  # Set while the collector can't reach the station
+])
+DELTA_SCHEMA = pa.schema([('id', pa.int64()), *list(LATEST_SCHEMA)[:-1]])
+DAILY_SCHEMA = pa.schema([
+    ('date', pa.string()),
+    ('high_f', pa.float64()),      # Official CLI numbers from daily_results
+    ('low_f', pa.float64()),
+    ('is_final', pa.bool_()),
+    ('observed_high_f', pa.float64()),  # From the obs_daily rollup
+    ('observed_low_f', pa.float64()),
+    ('readings', pa.int64()),
+])
+PACE_SCHEMA = pa.schema([
+    ('station_id', pa.string()),
+    ('current', pa.float64()),
+    ('high', pa.float64()),
+    ('low', pa.float64()),
+    ('velocity', pa.float64()),    # °F/hr over the last hour
+    ('projected_3hr', pa.float64()),
+    ('signal', pa.string()),       # SURGE / PLUNGE / NORMAL, same thresholds as pace_model
+])
+
+log = logs.get_logger(__name__)
+REQUEST_SECONDS = metrics.histogram("read_api_request_seconds", "Read API request time, by endpoint")
+RESPONSES = metrics.counter("read_api_responses_total", "Read API responses, by endpoint and status")
+EVENTS = metrics.counter("read_api_events_total", "Events published on /events, by event")
+SUBSCRIBERS = metrics.gauge("read_api_subscribers", "Clients connected to /events")
+
+class HttpError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+# --- DATABASE ---
+class ReadPool:
+    """A fixed set of read-only connections, one borrowed per query."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(None)  # Opened on first use, so the API can start before the collector
+
+    @contextmanager
+    def connection(self):
+        conn = self.idle.get()
+        try:
+            if conn is None:
+                conn = db.connect(self.path, read_only=True)
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def close(self):
+        while not self.idle.empty():
+            conn = self.idle.get_nowait()
+            if conn is not None:
+                conn.close()
+
+class LatestCache:
+    """
+    Newest reading per station, in memory. refresh() costs one PRAGMA when
+    nothing was written; otherwise it reads just the rows added since last
+    time, and keeps them in self.delta for /events, with rows updated in place
+    (db.read_corrections) in self.corrections. Health updates and bulk loads
+    reload every station instead.
+    """
+    LATEST_SQL = (f"SELECT {', '.join(LATEST_COLUMNS[1:])} FROM observations "
+                  "WHERE station_id = ? ORDER BY epoch DESC LIMIT 1")
+    DELTA_SQL = f"SELECT id, {', '.join(LATEST_COLUMNS)} FROM observations WHERE id > ? ORDER BY id LIMIT ?"
+
+    def __init__(self, db_path=db.OBS_DB_PATH):
+        self.db_path = db_path
+        self.conn = None
+        self.data_version = None
+        self.last_id = 0
+        self.last_seq = 0   # Newest observation_corrections row seen
+        self.version = 0    # Bumped on every change; ETags and the pace cache key off it
+        self.rows = {}      # station_id -> row in LATEST_COLUMNS order
+        self.stale = {}     # station_id -> stale_since
+        self.table = LATEST_SCHEMA.empty_table()
+        self.delta = None   # Rows added by the last change (DELTA_SCHEMA order); None after a full reload
+        self.corrections = []  # Rows it updated in place, same order
+
+    def refresh(self):
+        """Returns True if anything changed. Runs on one thread at a time."""
+        if self.conn is None:
+            self.conn = db.connect(self.db_path, read_only=True)
+        conn = self.conn
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self.data_version:
+            return False
+
+        conn.execute("BEGIN")  # One snapshot for the whole reload
+        try:
+            stale = dict(conn.execute("SELECT station_id, stale_since FROM stations"))
+            rows = dict(self.rows)
+            delta, corrections = None, []
+            if self.data_version is not None:
+                delta = conn.execute(self.DELTA_SQL, (self.last_id, MAX_DELTA + 1)).fetchall()
+                corrections = db.read_corrections(conn, self.last_seq, DELTA_SCHEMA.names, MAX_DELTA + 1)
+                if len(delta) > MAX_DELTA or len(corrections) > MAX_DELTA:
+                    delta, corrections = None, []
+            if delta or corrections:
+                max_id = delta[-1][0] if delta else self.last_id
+                last_seq = corrections[-1][0] if corrections else self.last_seq
+                corrections = [row[1:] for row in corrections]
+                for row in delta:
+                    current = rows.get(row[1])
+                    if current is None or row[3] >= current[2]:  # Backfilled rows can be older
+                        rows[row[1]] = row[1:]
+                for row in corrections:
+                    current = rows.get(row[1])
+                    if current is not None and current[2] == row[3]:  # The newest reading is the one corrected
+                        rows[row[1]] = row[1:]
+            else:
+                max_id = conn.execute("SELECT MAX(id) FROM observations").fetchone()[0] or 0
+                last_seq = db.last_correction(conn)
+                for station_id in stale:
+                    row = conn.execute(self.LATEST_SQL, (station_id,)).fetchone()
+                    if row is not None:
+                        rows[station_id] = (station_id, *row)
+        finally:
+            conn.execute("COMMIT")
+
+        table = pa.Table.from_pylist(
+            [dict(zip(LATEST_SCHEMA.names, (*rows[sid], stale.get(sid)))) for sid in sorted(rows)],
+            schema=LATEST_SCHEMA,
+        )
+        # Swapped in whole: the event loop reads these without a lock
+        self.rows, self.stale, self.table = rows, stale, table
+        self.data_version, self.last_id, self.delta = data_version, max_id, delta
+        self.last_seq, self.corrections = last_seq, corrections
+        self.version += 1
+        return True
+
+    def stations(self):
+        return self.stale.keys() | self.rows.keys()
+
+    def get(self, station_id=None):
+        if station_id is None:
+            return self.table
+        if station_id not in self.rows:
+            raise HttpError(404, f"No readings for {station_id}")
+        return _filter_station(self.table, station_id)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class EventHub:
+    """
+    Fans events out to /events clients. The last EVENT_BACKLOG are kept, so a
+    client reconnecting with Last-Event-ID gets what it missed; one that fell
+    further behind (or outlived a restart of this process) gets a "reset".
+    Used from the event loop only.
+    """
+
+    def __init__(self, backlog=EVENT_BACKLOG):
+        self.last_id = 0
+        self.recent = deque(maxlen=backlog)  # (event id, encoded message)
+        self.subscribers = set()             # One asyncio.Queue per client
+
+    def _message(self, event, data):
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (self.last_id, event.encode(), data)
+
+    def publish(self, event, data):
+        self.last_id += 1
+        message = self._message(event, data)
+        self.recent.append((self.last_id, message))
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.put_nowait(message)
+            except asyncio.QueueFull:
+                self.unsubscribe(subscriber)  # Too slow: it reconnects and catches up from the backlog
+        EVENTS.inc(event=event)
+
+    def subscribe(self, last_event_id=None):
+        subscriber = asyncio.Queue(SUBSCRIBER_QUEUE)
+        oldest = self.recent[0][0] if self.recent else self.last_id + 1
+        if last_event_id is not None and oldest - 1 <= last_event_id <= self.last_id:
+            for event_id, message in self.recent:
+                if event_id > last_event_id:
+                    subscriber.put_nowait(message)
+        elif last_event_id is not None:
+            subscriber.put_nowait(self._message("reset", b"{}"))
+        subscriber.put_nowait(self._message("hello", b"{}"))  # Everything up to here is in the database
+        self.subscribers.add(subscriber)
+        SUBSCRIBERS.set(len(self.subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Ends the client's stream: whatever is still queued is dropped and None wakes the writer up."""
+        self.subscribers.discard(subscriber)
+        SUBSCRIBERS.set(len(self.subscribers))
+        while not subscriber.empty():
+            subscriber.get_nowait()
+        subscriber.put_nowait(None)
+
+def _filter_station(table, station_id):
+    return table.filter(pc.equal(table.column('station_id'), station_id))
+
+# --- QUERIES (run on the thread pool) ---
+def _parse_time(value, name):
+    """Epoch seconds or an ISO 8601 timestamp (UTC if no offset)."""
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise HttpError(400, f"{name} must be epoch seconds or ISO 8601")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HttpError(400, f"{name} must be YYYY-MM-DD")
+
+def read_range(pool, station_id, params, archive_dir=archive.ARCHIVE_DIR):
+    end = _parse_time(params['end'], 'end') if 'end' in params else int(time.time()) + 1
+    start = _parse_time(params['start'], 'start') if 'start' in params else end - DEFAULT_RANGE
+    if not 0 < end - start <= MAX_RANGE_DAYS * 86400:
+        raise HttpError(400, f"start must be before end, at most {MAX_RANGE_DAYS} days apart")
+    columns = params.get('columns', 'temp_f').split(',')
+    unknown = [c for c in columns if c not in RANGE_COLUMNS]
+    if unknown:
+        raise HttpError(400, f"Unknown columns {', '.join(unknown)}; pick from {', '.join(RANGE_COLUMNS)}")
+    columns = ['epoch', *(c for c in columns if c != 'epoch')]
+
+    with pool.connection() as conn:
+        frame = archive.query(station_id, start, end, columns=columns, conn=conn, archive_dir=archive_dir)
+    schema = pa.schema([archive.SCHEMA.field(c) for c in columns])
+    return pa.Table.from_pandas(frame[columns], schema=schema, preserve_index=False)
+
+def read_daily(obs_pool, results_pool, station_id, params, tz_name):
+    end = _parse_date(params['end'], 'end') if 'end' in params else timekeys.today(tz_name)
+    start = (_parse_date(params['start'], 'start') if 'start' in params
+             else (date.fromisoformat(end) - timedelta(days=DEFAULT_DAILY_DAYS - 1)).isoformat())
+    if start > end:
+        raise HttpError(400, "start must not be after end")
+
+    days = {}
+    try:
+        with results_pool.connection() as conn:
+            for day, high, low, is_final in conn.execute(
+                "SELECT date, high_f, low_f, is_final FROM daily_results "
+                "WHERE station_id = ? AND date BETWEEN ? AND ? ORDER BY date", (station_id, start, end)
+            ):
+                days[day] = {'date': day, 'high_f': high, 'low_f': low, 'is_final': bool(is_final)}
+    except sqlite3.OperationalError:
+        pass  # No daily_results.db until the first CLI check has run
+    with obs_pool.connection() as conn:
+        for row in rollups.get_daily(conn, station_id, start, end):
+            entry = days.setdefault(row[0], {'date': row[0]})
+            entry.update(observed_low_f=row[1], observed_high_f=row[2], readings=row[4])
+    return pa.Table.from_pylist([days[day] for day in sorted(days)], schema=DAILY_SCHEMA)
+
+def _signal(velocity):
+    if velocity > polling.SIGNAL_VELOCITY:
+        return "SURGE"
+    if velocity < -polling.SIGNAL_VELOCITY:
+        return "PLUNGE"
+    return "NORMAL"
+
+def compute_pace(pool, station_ids, archive_dir=archive.ARCHIVE_DIR):
+    """Today's pace for every station in one pace_engine batch."""
+    registry = station_registry.load()
+    arrays = {}
+    with pool.connection() as conn:
+        for station_id in sorted(station_ids):
+            tz_name = registry.timezone(station_id)
+            frame = archive.query(station_id, columns=('epoch', 'temp_f'), conn=conn, archive_dir=archive_dir,
+                                  local_date=timekeys.today(tz_name))
+            if len(frame):
+                arrays[station_id] = (frame['epoch'].to_numpy(), frame['temp_f'].to_numpy(dtype='float64'))
+    results = pace_engine.analyze_batch(arrays)
+    return pa.Table.from_pylist([
+        {'station_id': sid, 'current': r['current'], 'high': r['high'], 'low': r['low'],
+         'velocity': r['velocity'][pace_engine.HOUR], 'projected_3hr': r['projected_3hr'],
+         'signal': _signal(r['velocity'][pace_engine.HOUR])}
+        for sid, r in sorted(results.items())
+    ], schema=PACE_SCHEMA)
+
+# --- RESPONSES ---
+def _json_column(column):
+    values = column.to_pylist()
+    if pa.types.is_floating(column.type):
+        return [None if v != v else v for v in values]  # NaN isn't valid JSON
+    return values
+
+def render(table, fmt):
+    """(body, content type) for an Arrow table."""
+    if fmt == 'arrow':
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), ARROW_TYPE
+    body = {name: _json_column(column) for name, column in zip(table.column_names, table.columns)}
+    return json.dumps(body, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), "application/json"
+
+# --- SERVER ---
+class ReadApi:
+    def __init__(self, db_path=db.OBS_DB_PATH, results_path=db.RESULTS_DB_PATH, archive_dir=archive.ARCHIVE_DIR,
+                 pool_size=POOL_SIZE):
+        self.archive_dir = archive_dir
+        self.obs_pool = ReadPool(db_path, pool_size)
+        self.results_pool = ReadPool(results_path, pool_size)
+        self.latest = LatestCache(db_path)
+        self.events = EventHub()
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="read-api")
+        self.pace = (None, None)  # (cache key, table)
+        self.pace_lock = None     # asyncio.Lock, made on the loop
+        self.refresh_error = None
+        self.server = None
+        self.watcher = None
+        self.port = None
+        self.routes = {
+            'latest': self.get_latest,
+            'range': self.get_range,
+            'daily': self.get_daily,
+            'pace': self.get_pace,
+        }
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def refresh(self):
+        """True if the cache changed."""
+        try:
+            changed = await self._run(self.latest.refresh)
+            self.refresh_error = None
+            return changed
+        except Exception as e:
+            if str(e) != self.refresh_error:
+                log.warning("⚠️ Latest cache refresh failed: %s", e)
+            self.refresh_error = str(e)
+            self.latest.close()  # Reopen next time (e.g. the DB file didn't exist yet)
+            return False
+
+    async def publish_changes(self):
+        """Corrected rows, new rows, then the pace of their stations, to every /events client."""
+        delta, corrections = self.latest.delta, self.latest.corrections
+        if delta is None:
+            self.events.publish("reset", b"{}")
+            return
+        for event, rows in (("correction", corrections), ("observation", delta)):
+            if rows:
+                table = pa.Table.from_pylist([dict(zip(DELTA_SCHEMA.names, row)) for row in rows],
+                                             schema=DELTA_SCHEMA)
+                self.events.publish(event, render(table, 'json')[0])
+        if (delta or corrections) and self.events.subscribers:
+            stations = {row[1] for row in delta} | {row[1] for row in corrections}
+            pace = await self._run(compute_pace, self.obs_pool, stations, self.archive_dir)
+            self.events.publish("pace", render(pace, 'json')[0])
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(REFRESH_SECONDS)
+            if await self.refresh():
+                try:
+                    await self.publish_changes()
+                except Exception as e:
+                    log.warning("⚠️ Publishing changes failed: %s", e)
+
+    async def stream_events(self, writer, headers):
+        """Holds an /events connection open, writing events as they're published."""
+        last = headers.get('last-event-id', '')
+        subscriber = self.events.subscribe(int(last) if last.isdigit() else None)
+        RESPONSES.inc(endpoint='events', status=200)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\nretry: 2000\n\n")
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    message = b": keepalive\n\n"
+                if message is None:
+                    return
+                writer.write(message)
+                await writer.drain()
+        finally:
+            if subscriber in self.events.subscribers:
+                self.events.unsubscribe(subscriber)
+
+    def _station(self, station_id):
+        if station_id is None:
+            raise HttpError(404, "Add a station id: /<endpoint>/<station_id>")
+        if station_id not in self.latest.stations():
+            raise HttpError(404, f"Unknown station {station_id}")
+        return station_id
+
+    # --- endpoints: (table, etag or None) ---
+    async def get_latest(self, station_id, params):
+        return self.latest.get(station_id), f"latest-{self.latest.version}"
+
+    async def get_range(self, station_id, params):
+        return await self._run(read_range, self.obs_pool, self._station(station_id), params, self.archive_dir), None
+
+    async def get_daily(self, station_id, params):
+        station_id = self._station(station_id)
+        tz_name = station_registry.load().timezone(station_id)
+        return await self._run(read_daily, self.obs_pool, self.results_pool, station_id, params, tz_name), None
+
+    async def get_pace(self, station_id, params):
+        key = (self.latest.version, int(time.time() // PACE_MAX_AGE))
+        async with self.pace_lock:
+            if self.pace[0] != key:
+                self.pace = (key, await self._run(compute_pace, self.obs_pool, self.latest.stations(), self.archive_dir))
+        table = self.pace[1]
+        if station_id is not None:
+            table = _filter_station(table, self._station(station_id))
+        return table, "pace-%d-%d" % key
+
+    async def respond(self, method, target, headers):
+        """(status, body, content type, extra headers)."""
+        if method not in ('GET', 'HEAD'):
+            raise HttpError(405)
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+        if parts == ['metrics']:
+            return 200, metrics.REGISTRY.render_prometheus().encode('utf-8'), "text/plain; version=0.0.4", {}
+        route = self.routes.get(parts[0]) if 1 <= len(parts) <= 2 else None
+        if route is None:
+            raise HttpError(404)
+
+        fmt = params.pop('format', None) or ('arrow' if ARROW_TYPE in headers.get('accept', '') else 'json')
+        if fmt not in ('json', 'arrow'):
+            raise HttpError(400, "format must be json or arrow")
+        table, tag = await route(parts[1].upper() if len(parts) == 2 else None, params)
+        extra = {}
+        if tag:
+            etag = f'"{tag}-{fmt}"'
+            extra['ETag'] = etag
+            if headers.get('if-none-match') == etag:
+                return 304, b"", None, extra
+        body, content_type = render(table, fmt)
+        return 200, body, content_type, extra
+
+    async def handle(self, reader, writer):
+        """One keep-alive connection: read a request head, answer, repeat."""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_SECONDS)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                        ConnectionError):
+                    return
+                lines = head.decode('latin-1').split("\r\n")
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length', '0') != '0':
+                    await reader.readexactly(int(headers['content-length']))
+
+                started = time.perf_counter()
+                request = lines[0].split(" ")
+                method, target = (request[0], request[1]) if len(request) == 3 else ("", "/")
+                if method == 'GET' and urlsplit(target).path.rstrip('/') == '/events':
+                    return await self.stream_events(writer, headers)
+                endpoint = (urlsplit(target).path.strip('/').split('/')[0] or 'root')
+                endpoint = endpoint if endpoint in self.routes or endpoint == 'metrics' else 'other'
+                try:
+                    if len(request) != 3:
+                        raise HttpError(400)
+                    status, body, content_type, extra = await self.respond(method, target, headers)
+                except HttpError as e:
+                    status, body, content_type, extra = e.status, json.dumps({'error': str(e)}).encode(), \
+                        "application/json", {}
+                except Exception as e:
+                    log.error("❌ %s %s failed: %s", method, target, e, exc_info=True)
+                    status, body, content_type, extra = 500, b'{"error":"Internal error"}', "application/json", {}
+
+                keep_alive = request[-1] == "HTTP/1.1" and headers.get('connection', '').lower() != 'close'
+                out = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Content-Length: {len(body)}"]
+                if content_type:
+                    out.append(f"Content-Type: {content_type}")
+                out += [f"{name}: {value}" for name, value in extra.items()]
+                out.append("Connection: keep-alive" if keep_alive else "Connection: close")
+                writer.write(("\r\n".join(out) + "\r\n\r\n").encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+
+                REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+                RESPONSES.inc(endpoint=endpoint, status=status)
+                log.debug("%s %s -> %d", method, target, status, extra={"bytes": len(body)})
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=API_HOST, port=API_PORT):
+        """Loads the cache, binds the port and starts the refresh task. Returns the asyncio server."""
+        self.pace_lock = asyncio.Lock()
+        await self.refresh()
+        self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.watcher = asyncio.get_running_loop().create_task(self.watch())
+        return self.server
+
+    async def serve(self, host=API_HOST, port=API_PORT):
+        await self.start(host, port)
+        log.info("🌐 Read API on http://localhost:%d (latest, range, daily, pace, events)", self.port)
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start_in_thread(self, host="127.0.0.1", port=0):
+        """Runs the API on its own event loop in a daemon thread (benchmarks, local testing). Returns self."""
+        ready = threading.Event()
+        self.loop = asyncio.new_event_loop()
+
+        async def main():
+            await self.start(host, port)
+            ready.set()
+            await self.server.serve_forever()
+
+        threading.Thread(target=self.loop.run_until_complete, args=(main(),), name="read-api", daemon=True).start()
+        ready.wait()
+        return self
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.obs_pool.close()
+        self.results_pool.close()
+        self.latest.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read-only HTTP API over the observation store")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="Read connections / query threads")
+    parser.add_argument("--log-level", help="DEBUG for a line per request")
+    args = parser.parse_args(argv)
+
+    logs.setup(args.log_level)
+    api = ReadApi(pool_size=args.pool_size)
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Materialized hourly and daily rollups of the observations table.
+
+obs_hourly is keyed by (station_id, UTC hour start epoch), obs_daily by
+(station_id, local date in the station's timezone). Each row holds min, max,
+sum and count (mean = sum / count), plus the first and last reading.
+
+The writer keeps them current as rows arrive: brand-new readings are merged
+in with an upsert, and the rare in-place correction rebuilds just the buckets
+it touched. rebuild() recomputes everything from raw data.
+
+    python -m weather.rollups --rebuild
+"""
+import argparse
+from collections import defaultdict
+
+from weather import logs
+
+# --- CONFIGURATION ---
+HOUR = 3600
+DAY = 86400
+COLUMNS = "min_f, max_f, sum_f, count, first_epoch, first_f, last_epoch, last_f"
+
+log = logs.get_logger(__name__)
+
+# --- AGGREGATION ---
+def _new_agg(epoch, temp):
+    return [temp, temp, temp, 1, epoch, temp, epoch, temp]
+
+def _merge(agg, epoch, temp):
+    agg[0] = min(agg[0], temp)
+    agg[1] = max(agg[1], temp)
+    agg[2] += temp
+    agg[3] += 1
+    if epoch < agg[4]:
+        agg[4], agg[5] = epoch, temp
+    if epoch > agg[6]:
+        agg[6], agg[7] = epoch, temp
+
+def aggregate(readings):
+    """
+    readings: iterable of (station_id, epoch, local_date, temp_f).
+    Returns (hourly, daily) dicts: {(station_id, bucket): [min, max, sum, count, first_epoch, first_f, last_epoch, last_f]}
+    """
+    hourly, daily = {}, {}
+    for station_id, epoch, local_date, temp in readings:
+        if temp is None:
+            continue
+        for table, key in ((hourly, (station_id, epoch - epoch % HOUR)), (daily, (station_id, local_date))):
+            agg = table.get(key)
+            if agg is None:
+                table[key] = _new_agg(epoch, temp)
+            else:
+                _merge(agg, epoch, temp)
+    return hourly, daily
+
+# --- SQL ---
+def _merge_sql(table, bucket_column):
+    # In an UPDATE every right-hand side sees the row's old values
+    return f'''
+        INSERT INTO {table} (station_id, {bucket_column}, {COLUMNS})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (station_id, {bucket_column}) DO UPDATE SET
+            min_f = MIN(min_f, excluded.min_f),
+            max_f = MAX(max_f, excluded.max_f),
+            sum_f = sum_f + excluded.sum_f,
+            count = count + excluded.count,
+            first_f = CASE WHEN excluded.first_epoch < first_epoch THEN excluded.first_f ELSE first_f END,
+            first_epoch = MIN(first_epoch, excluded.first_epoch),
+            last_f = CASE WHEN excluded.last_epoch > last_epoch THEN excluded.last_f ELSE last_f END,
+            last_epoch = MAX(last_epoch, excluded.last_epoch)
+    '''
+
+HOURLY_MERGE_SQL = _merge_sql('obs_hourly', 'hour_start')
+DAILY_MERGE_SQL = _merge_sql('obs_daily', 'local_date')
+
+def _write(conn, hourly, daily):
+    conn.executemany(HOURLY_MERGE_SQL, [(*key, *agg) for key, agg in hourly.items()])
+    conn.executemany(DAILY_MERGE_SQL, [(*key, *agg) for key, agg in daily.items()])
+
+# --- INCREMENTAL UPDATES (called by db.ObservationWriter) ---
+def existing_temps(conn, rows):
+    """{(station_id, timestamp): temp_f} for the rows of this batch that are already stored."""
+    by_station = defaultdict(set)
+    for row in rows:
+        by_station[row[0]].add(row[1])
+
+    found = {}
+    for station_id, stamps in by_station.items():
+        stamps = list(stamps)
+        for i in range(0, len(stamps), 500):
+            chunk = stamps[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for ts, temp in conn.execute(
+                f"SELECT timestamp, temp_f FROM observations WHERE station_id = ? AND timestamp IN ({placeholders})",
+                (station_id, *chunk),
+            ):
+                found[(station_id, ts)] = temp
+    return found
+
+def archived_epochs(rows, archive_dir=None):
+    """
+    {(station_id, epoch)} for the typed rows of this batch that already sit in
+    the Parquet archive. Only the month partitions the batch overlaps are opened.
+    """
+    from weather import archive  # Lazy: archive imports db, which imports this module
+
+    by_station = defaultdict(set)
+    for row in rows:
+        by_station[row[0]].add(row[6])
+
+    found = set()
+    for station_id, epochs in by_station.items():
+        cold = archive.read_archive(station_id, min(epochs), max(epochs) + 1, columns=('epoch',),
+                                    archive_dir=archive_dir or archive.ARCHIVE_DIR)
+        found.update((station_id, epoch) for epoch in cold.column('epoch').to_pylist() if epoch in epochs)
+    return found
+
+def archived_readings(conn, station_id, start_epoch=None, end_epoch=None, archive_dir=None):
+    """
+    Archived (station_id, epoch, local_date, temp_f) readings in [start_epoch, end_epoch).
+    A run interrupted between the Parquet write and the SQLite delete leaves both
+    copies; those are left out so SQLite's is the one counted, as in archive.query().
+    """
+    from weather import archive
+
+    cold = archive.read_archive(station_id, start_epoch, end_epoch, columns=('epoch', 'local_date', 'temp_f'),
+                                archive_dir=archive_dir or archive.ARCHIVE_DIR)
+    if not cold.num_rows:
+        return []
+    epochs = cold.column('epoch').to_pylist()
+    hot = {row[0] for row in conn.execute(
+        "SELECT epoch FROM observations WHERE station_id = ? AND epoch >= ? AND epoch <= ?",
+        (station_id, min(epochs), max(epochs)))}
+    return [(station_id, epoch, local_date, temp)
+            for epoch, local_date, temp in zip(epochs, cold.column('local_date').to_pylist(),
+                                               cold.column('temp_f').to_pylist())
+            if epoch not in hot]
+
+def apply(conn, rows, existing, archive_dir=None):
+    """
+    Updates the rollups for a batch that was just upserted.
+    rows: the writer's typed rows (station_id, timestamp, temp_f, humidity, wind_speed, description, epoch, local_date).
+    existing: existing_temps() taken *before* the upsert.
+    """
+    new, corrected = {}, {}
+    for row in rows:
+        key = (row[0], row[1])
+        reading = (row[0], row[6], row[7], row[2])
+        if key not in existing:
+            new[key] = reading  # Within one batch the same reading may appear twice; count it once
+        elif existing[key] != row[2]:
+            corrected[key] = reading
+
+    hourly, daily = aggregate(new.values())
+    _write(conn, hourly, daily)
+
+    if corrected:
+        rebuild_buckets(conn, list(corrected.values()), archive_dir)
+
+def rebuild_buckets(conn, readings, archive_dir=None):
+    """Recomputes only the hourly/daily buckets these readings fall in."""
+    for station_id in {r[0] for r in readings}:
+        epochs = [r[1] for r in readings if r[0] == station_id]
+        touched_hours = {e - e % HOUR for e in epochs}
+        touched_days = {r[2] for r in readings if r[0] == station_id}
+
+        # Two days either side covers every local day and hour touched
+        raw = conn.execute(
+            "SELECT station_id, epoch, local_date, temp_f FROM observations "
+            "WHERE station_id = ? AND epoch >= ? AND epoch < ?",
+            (station_id, min(epochs) - 2 * DAY, max(epochs) + 2 * DAY),
+        ).fetchall()
+        # A day bucket can straddle the archive cutoff
+        raw += archived_readings(conn, station_id, min(epochs) - 2 * DAY, max(epochs) + 2 * DAY, archive_dir)
+        hourly, daily = aggregate(raw)
+
+        for hour_start in touched_hours:
+            conn.execute("DELETE FROM obs_hourly WHERE station_id = ? AND hour_start = ?", (station_id, hour_start))
+        for local_date in touched_days:
+            conn.execute("DELETE FROM obs_daily WHERE station_id = ? AND local_date = ?", (station_id, local_date))
+        _write(conn,
+               {k: v for k, v in hourly.items() if k[1] in touched_hours},
+               {k: v for k, v in daily.items() if k[1] in touched_days})
+
+# --- FULL REBUILD ---
+def rebuild(conn, batch=50000, archive_dir=None):
+    """
+    Recomputes both rollup tables from the raw observations, in one
+    transaction. Rows already moved to the Parquet archive are included.
+    """
+    with conn:
+        conn.execute("DELETE FROM obs_hourly")
+        conn.execute("DELETE FROM obs_daily")
+        for station_id, in conn.execute("SELECT station_id FROM stations").fetchall():
+            cursor = conn.execute(
+                "SELECT station_id, epoch, local_date, temp_f FROM observations WHERE station_id = ?", (station_id,)
+            )
+            archived = archived_readings(conn, station_id, archive_dir=archive_dir)
+            chunks = [archived] if archived else []
+            hourly, daily = {}, {}
+            while True:
+                chunk = chunks.pop() if chunks else cursor.fetchmany(batch)
+                if not chunk:
+                    break
+                h, d = aggregate(chunk)
+                for target, part in ((hourly, h), (daily, d)):
+                    for key, agg in part.items():
+                        if key in target:
+                            _combine(target[key], agg)
+                        else:
+                            target[key] = agg
+            _write(conn, hourly, daily)
+
+def _combine(agg, other):
+    agg[0] = min(agg[0], other[0])
+    agg[1] = max(agg[1], other[1])
+    agg[2] += other[2]
+    agg[3] += other[3]
+    if other[4] < agg[4]:
+        agg[4], agg[5] = other[4], other[5]
+    if other[6] > agg[6]:
+        agg[6], agg[7] = other[6], other[7]
+
+def ensure_built(conn):
+    """First run after the rollup tables appear: fill them from existing history."""
+    has_rollups = conn.execute("SELECT 1 FROM obs_daily LIMIT 1").fetchone()
+    has_raw = conn.execute("SELECT 1 FROM observations LIMIT 1").fetchone()
+    if has_raw and not has_rollups:
+        log.info("🧮 Building hourly/daily rollups from existing observations...")
+        rebuild(conn)
+
+# --- READERS ---
+def get_daily(conn, station_id, start_date, end_date=None):
+    """Daily rows with start_date <= local_date <= end_date, oldest first."""
+    end_date = end_date or start_date
+    return conn.execute(f'''
+        SELECT local_date, {COLUMNS}, sum_f / count AS mean_f
+        FROM obs_daily
+        WHERE station_id = ? AND local_date BETWEEN ? AND ?
+        ORDER BY local_date
+    ''', (station_id, start_date, end_date)).fetchall()
+
+def get_hourly(conn, station_id, since_epoch, until_epoch=None):
+    """Hourly rows in [since_epoch, until_epoch), oldest first."""
+    until_epoch = until_epoch or 2 ** 62
+    return conn.execute(f'''
+        SELECT hour_start, {COLUMNS}, sum_f / count AS mean_f
+        FROM obs_hourly
+        WHERE station_id = ? AND hour_start >= ? AND hour_start < ?
+        ORDER BY hour_start
+    ''', (station_id, since_epoch, until_epoch)).fetchall()
+
+def main(argv=None):
+    # Imported here so the writer can import this module without a cycle
+    from weather import db, schema, station_registry
+
+    parser = argparse.ArgumentParser(description="Maintain the hourly/daily rollup tables")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute everything from raw observations")
+    args = parser.parse_args(argv)
+    logs.setup()
+
+    if args.rebuild:
+        conn = db.connect(db.OBS_DB_PATH)
+        schema.migrate_observations(conn)
+        db.fill_local_dates(conn, station_registry.load().timezones)
+        rebuild(conn)
+        log.info("✅ Rollups rebuilt.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from weather import logs, metrics
+
+log = logs.get_logger(__name__)
+JOB_SECONDS = metrics.histogram("job_seconds", "Scheduled job run time, by job")
+JOB_FAILURES = metrics.counter("job_failures_total", "Job runs that raised, by job")
+JOB_SKIPPED = metrics.counter("job_skipped_total", "Runs skipped because the previous one was still going")
+JOB_LAST_SUCCESS = metrics.gauge("job_last_success_timestamp", "When each job last finished cleanly (epoch seconds)")
+
+
+class Job:
+    """
+    One recurring task. Either runs every `interval` seconds, or once a day
+    at `daily_at` (an "HH:MM" string in server local time). A quiet job only
+    logs its runs at DEBUG (for short ticks that usually do nothing).
+    """
+
+    def __init__(self, name, func, interval=None, daily_at=None, run_immediately=True, quiet=False):
+        if (interval is None) == (daily_at is None):
+            raise ValueError(f"Job {name} needs exactly one of interval or daily_at")
+
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.daily_at = daily_at
+        self.quiet = quiet
+        self.thread = None
+
+        now = time.time()
+        if interval:
+            self.next_run = now if run_immediately else now + interval
+        else:
+            self.next_run = self._next_slot(now)
+
+    def _next_slot(self, now):
+        """The first scheduled time strictly after `now` (wall-clock seconds)."""
+        if self.interval:
+            # Fixed-rate: stay on the original grid instead of drifting by the
+            # time the job took. Missed slots are skipped, not queued up.
+            missed = int((now - self.next_run) // self.interval) + 1
+            return self.next_run + missed * self.interval
+
+        hour, minute = (int(part) for part in self.daily_at.split(":"))
+        moment = datetime.fromtimestamp(now)
+        target = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= moment:
+            target += timedelta(days=1)
+        return target.timestamp()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        started = time.monotonic()
+        try:
+            self.func()
+        except Exception as e:
+            JOB_FAILURES.inc(job=self.name)
+            log.exception("❌ Job %s crashed: %s", self.name, e, extra={"job": self.name})
+        else:
+            JOB_LAST_SUCCESS.set(time.time(), job=self.name)
+            log.log(logging.DEBUG if self.quiet else logging.INFO, "✅ Job %s finished in %.1fs",
+                    self.name, time.monotonic() - started, extra={"job": self.name})
+        finally:
+            JOB_SECONDS.observe(time.monotonic() - started, job=self.name)
+
+    def fire(self, now):
+        if self.is_running():
+            JOB_SKIPPED.inc(job=self.name)
+            log.log(logging.DEBUG if self.quiet else logging.WARNING, "⏭️  Skipping %s: previous run still in progress.",
+                    self.name, extra={"job": self.name})
+        else:
+            self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self.thread.start()
+        self.next_run = self._next_slot(now)
+
+
+class Scheduler:
+    """Runs every registered Job in this process, each on its own worker thread."""
+
+    def __init__(self):
+        self.jobs = []
+        self.stopped = threading.Event()
+
+    def add(self, job):
+        self.jobs.append(job)
+        return job
+
+    def run_pending(self, now=None):
+        now = time.time() if now is None else now
+        for job in self.jobs:
+            if job.next_run <= now:
+                job.fire(now)
+
+    def seconds_until_next(self):
+        if not self.jobs:
+            return 60.0
+        return max(0.0, min(job.next_run for job in self.jobs) - time.time())
+
+    def run_forever(self):
+        while not self.stopped.is_set():
+            self.run_pending()
+            self.stopped.wait(self.seconds_until_next())
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,330 @@
+"""
+Versioned schema for both databases.
+
+Every entry point calls migrate_observations() / migrate_results() instead of
+writing its own CREATE TABLE. The current version lives in PRAGMA user_version,
+so each migration runs exactly once per database file.
+"""
+import sqlite3
+
+from weather import logs, timekeys
+from weather.payloads import pack_payload
+
+log = logs.get_logger(__name__)
+
+# --- OBSERVATIONS DATABASE ---
+def _obs_v1_base_table(conn):
+    """The observations table, plus any columns older copies were created without."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS observations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            station_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            temp_f REAL,
+            humidity REAL,
+            wind_speed REAL,
+            description TEXT,
+            raw_json TEXT
+        )
+    ''')
+
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(observations)")}
+    for column, col_type in [("humidity", "REAL"), ("wind_speed", "REAL"),
+                             ("description", "TEXT"), ("raw_json", "TEXT")]:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE observations ADD COLUMN {column} {col_type}")
+
+def _obs_v2_dedupe_and_index(conn):
+    """
+    One-time compaction: the collector used to insert the same /latest reading
+    every cycle. Keep the first copy of each (station_id, timestamp), then make
+    the pair unique so it can never happen again.
+    """
+    removed = conn.execute('''
+        DELETE FROM observations
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM observations GROUP BY station_id, timestamp
+        )
+    ''').rowcount
+    if removed:
+        log.info("🧹 Removed %d duplicate observations.", removed)
+
+    # initialize_db.py used to declare UNIQUE(station_id, timestamp) inline,
+    # which already gives us a unique index. Don't build a second copy.
+    has_unique = any(
+        row[2] and row[3] == 'u'
+        for row in conn.execute("PRAGMA index_list(observations)")
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_station_time")
+    if not has_unique:
+        conn.execute('''
+            CREATE UNIQUE INDEX idx_station_time
+            ON observations (station_id, timestamp)
+        ''')
+
+def _obs_v3_split_raw_json(conn):
+    """
+    Moves the raw API responses out of the observations table into a
+    compressed, content-addressed archive. Range queries then only walk
+    small typed rows instead of pages full of JSON.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS raw_payloads (
+            hash TEXT PRIMARY KEY,
+            body BLOB NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS observation_payloads (
+            observation_id INTEGER PRIMARY KEY,
+            payload_hash TEXT NOT NULL
+        )
+    ''')
+
+    cursor = conn.execute("SELECT id, raw_json FROM observations WHERE raw_json IS NOT NULL")
+    while True:
+        batch = cursor.fetchmany(1000)
+        if not batch:
+            break
+        packed = [(obs_id, *pack_payload(raw)) for obs_id, raw in batch]
+        conn.executemany("INSERT OR IGNORE INTO raw_payloads (hash, body) VALUES (?, ?)",
+                         [(digest, blob) for _, digest, blob in packed])
+        conn.executemany("INSERT OR REPLACE INTO observation_payloads VALUES (?, ?)",
+                         [(obs_id, digest) for obs_id, digest, _ in packed])
+
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        conn.execute("ALTER TABLE observations DROP COLUMN raw_json")
+    else:
+        # No DROP COLUMN on old SQLite: empty it so the pages can be reused
+        conn.execute("UPDATE observations SET raw_json = NULL")
+
+def _obs_v4_station_metadata(conn):
+    """Coordinates and forecast URLs, resolved once per station instead of every page load."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS station_metadata (
+            station_id TEXT PRIMARY KEY,
+            lat REAL NOT NULL,
+            lon REAL NOT NULL,
+            forecast_hourly_url TEXT NOT NULL,
+            resolved_at REAL NOT NULL
+        )
+    ''')
+
+def _obs_v5_station_list(conn):
+    """Small lookup of every station we've stored, so nobody has to SELECT DISTINCT."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stations (
+            station_id TEXT PRIMARY KEY
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO stations SELECT DISTINCT station_id FROM observations")
+
+def _obs_v6_rollups(conn):
+    """Hourly (UTC) and daily (station-local) min/max/sum/count/first/last per station."""
+    for table, bucket in (("obs_hourly", "hour_start INTEGER NOT NULL"),
+                          ("obs_daily", "local_date TEXT NOT NULL")):
+        bucket_name = bucket.split()[0]
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                station_id TEXT NOT NULL,
+                {bucket},
+                min_f REAL NOT NULL,
+                max_f REAL NOT NULL,
+                sum_f REAL NOT NULL,
+                count INTEGER NOT NULL,
+                first_epoch INTEGER NOT NULL,
+                first_f REAL NOT NULL,
+                last_epoch INTEGER NOT NULL,
+                last_f REAL NOT NULL,
+                PRIMARY KEY (station_id, {bucket_name})
+            ) WITHOUT ROWID
+        ''')
+
+def _obs_v7_time_keys(conn):
+    """
+    Integer epoch seconds and the station-local date next to the timestamp text,
+    with indexes so time windows and "today" are plain index range / equality lookups.
+    local_date depends on the configured timezones, so db.fill_local_dates() fills it.
+    """
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(observations)")}
+    for column, col_type in [("epoch", "INTEGER"), ("local_date", "TEXT")]:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE observations ADD COLUMN {column} {col_type}")
+
+    cursor = conn.execute("SELECT id, timestamp FROM observations WHERE epoch IS NULL")
+    while True:
+        batch = cursor.fetchmany(5000)
+        if not batch:
+            break
+        conn.executemany("UPDATE observations SET epoch = ? WHERE id = ?",
+                         [(timekeys.to_epoch(ts), obs_id) for obs_id, ts in batch])
+
+    # temp_f rides along so the hot reads never touch the table itself
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_station_epoch
+        ON observations (station_id, epoch, temp_f)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_station_local_date
+        ON observations (station_id, local_date, epoch, temp_f)
+    ''')
+
+def _obs_v8_worker_leases(conn):
+    """Heartbeats and leases for sharded collection, see sharding.py."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS workers (
+            worker_id TEXT PRIMARY KEY,
+            host TEXT,
+            pid INTEGER,
+            started_at REAL NOT NULL,
+            heartbeat_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            worker_id TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+def _obs_v9_station_health(conn):
+    """Per-station fetch health: when it last worked, and since when it has been stale."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(stations)")}
+    for column, col_type in [("last_ok", "REAL"), ("stale_since", "REAL"), ("last_error", "TEXT")]:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE stations ADD COLUMN {column} {col_type}")
+
+def _obs_v10_payload_hash_index(conn):
+    """The archive's orphaned-payload cleanup looks links up by hash; without this it scans them all."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_payload_hash ON observation_payloads (payload_hash)")
+
+def _obs_v11_corrections(conn):
+    """
+    A re-sent reading that changed (an NWS correction) is updated in place and
+    keeps its id, so readers following new ids would never see it. The trigger
+    logs each one here; seq only ever grows, so a reader remembers the last it saw.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS observation_corrections (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            observation_id INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_corrections_observation ON observation_corrections (observation_id)")
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS log_observation_correction
+        AFTER UPDATE OF temp_f, humidity, wind_speed, description ON observations
+        BEGIN
+            INSERT INTO observation_corrections (observation_id) VALUES (NEW.id);
+        END
+    ''')
+
+OBSERVATIONS_MIGRATIONS = [
+    _obs_v1_base_table,
+    _obs_v2_dedupe_and_index,
+    _obs_v3_split_raw_json,
+    _obs_v4_station_metadata,
+    _obs_v5_station_list,
+    _obs_v6_rollups,
+    _obs_v7_time_keys,
+    _obs_v8_worker_leases,
+    _obs_v9_station_health,
+    _obs_v10_payload_hash_index,
+    _obs_v11_corrections,
+]
+
+# --- DAILY RESULTS DATABASE ---
+def _results_v1_base_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            station_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            high_f REAL,
+            low_f REAL,
+            is_final INTEGER DEFAULT 0,
+            UNIQUE(station_id, date)
+        )
+    ''')
+
+RESULTS_MIGRATIONS = [
+    _results_v1_base_table,
+]
+
+# --- RUNNER ---
+def migrate(conn, migrations):
+    """
+    Applies every migration newer than the file's user_version.
+    BEGIN IMMEDIATE takes the write lock first, so two processes starting at
+    the same time can't both run the same step.
+    """
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for step, migration in enumerate(migrations[version:], start=version + 1):
+            migration(conn)
+            conn.execute(f"PRAGMA user_version={step}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(migrations)
+
+def migrate_observations(conn):
+    return migrate(conn, OBSERVATIONS_MIGRATIONS)
+
+def migrate_results(conn):
+    return migrate(conn, RESULTS_MIGRATIONS)
+
+# --- QUERY PLAN CHECKS ---
+# The hot read queries. Each one must be answered from an index, never a full scan.
+HOT_QUERIES = {
+    "station time window": (  # archive.read_hot
+        "SELECT epoch, temp_f FROM observations "
+        "WHERE station_id = ? AND epoch >= ? AND epoch < ? ORDER BY epoch",
+        ("KNYC", 1704067200, 1704153600),
+    ),
+    "station local day": (  # archive.query(local_date=...), behind pace_model
+        "SELECT epoch, temp_f FROM observations "
+        "WHERE station_id = ? AND local_date = ? ORDER BY epoch",
+        ("KNYC", "2024-01-01"),
+    ),
+    "new rows since last load": (  # dashboard_data.ObservationStore
+        "SELECT id, epoch, temp_f FROM observations "
+        "WHERE station_id = ? AND id > ? AND epoch >= ? ORDER BY epoch",
+        ("KNYC", 0, 1704067200),
+    ),
+    "corrections since last load": (  # db.read_corrections
+        "SELECT c.seq, o.id, o.station_id, o.epoch, o.temp_f FROM observation_corrections c "
+        "JOIN observations o ON o.id = c.observation_id WHERE c.seq > ? ORDER BY c.seq",
+        (0,),
+    ),
+    "orphaned payloads": (  # archive._delete
+        "SELECT hash FROM raw_payloads WHERE hash IN (?, ?) "
+        "AND NOT EXISTS (SELECT 1 FROM observation_payloads WHERE payload_hash = raw_payloads.hash)",
+        ("a" * 64, "b" * 64),
+    ),
+    "daily rollup range": (  # rollups.get_daily
+        "SELECT local_date, min_f, max_f FROM obs_daily "
+        "WHERE station_id = ? AND local_date BETWEEN ? AND ? ORDER BY local_date",
+        ("KNYC", "2024-01-01", "2024-01-31"),
+    ),
+}
+
+def check_query_plans(conn):
+    """
+    Returns [(name, plan, ok)]. ok means every table is only ever read through
+    an index: no full table scan and no temporary sort.
+    """
+    report = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        steps = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        ok = all(
+            "TEMP B-TREE" not in step
+            and ("SCAN " not in step or "COVERING INDEX" in step)
+            for step in steps
+        )
+        report.append((name, " | ".join(steps), ok))
+    return report
@@ -0,0 +1,154 @@
+"""
+Sharded collection: several worker processes (or containers) split the
+stations between them.
+
+Ownership comes from a consistent-hash ring over the workers that are alive,
+i.e. that heartbeated into the `workers` table recently. When a worker joins
+or dies only its share of stations moves. Before polling, a worker takes a
+lease row per station; a lease is only granted if it's free, expired, or
+already ours, so two workers never poll the same station even while the ring
+is changing. Leases are renewed with every heartbeat and dropped on a clean
+shutdown, so a crashed worker's stations are picked up once its leases expire.
+
+Singleton jobs (CLI check, archive) use the same leases under "job:<name>".
+"""
+import hashlib
+import os
+import socket
+import threading
+import time
+from bisect import bisect
+
+from weather import db, logs, schema
+
+# --- CONFIGURATION ---
+VNODES = 64              # Points per worker on the ring; more = more even split
+HEARTBEAT_SECONDS = 15   # How often a worker checks in and renews its leases
+WORKER_TTL = 45          # No heartbeat for this long = the worker is gone
+LEASE_SECONDS = 45       # A lease outlives a few missed heartbeats, not more
+JOB_PREFIX = "job:"
+
+log = logs.get_logger(__name__)
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+class HashRing:
+    """Consistent hashing of keys (station ids) onto nodes (worker ids)."""
+
+    def __init__(self, nodes, vnodes=VNODES):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in set(nodes) for i in range(vnodes))
+        self.keys = [point for point, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def owner(self, key):
+        if not self.keys:
+            return None
+        return self.nodes[bisect(self.keys, _hash(key)) % len(self.keys)]
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class ShardWorker:
+    """One collector's membership, shard and leases."""
+
+    CLAIM_SQL = '''
+        INSERT INTO leases (name, worker_id, expires_at) VALUES (?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET
+            worker_id = excluded.worker_id,
+            expires_at = excluded.expires_at
+        WHERE leases.worker_id = excluded.worker_id OR leases.expires_at < ?
+    '''
+
+    def __init__(self, worker_id=None, db_path=db.OBS_DB_PATH):
+        self.worker_id = worker_id or default_worker_id()
+        self.conn = db.connect(db_path)
+        schema.migrate_observations(self.conn)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started_at = time.time()
+
+    # --- MEMBERSHIP ---
+    def heartbeat(self, now=None):
+        """Checks in and pushes every lease we hold forward."""
+        now = now or time.time()
+        with self.lock, self.conn:
+            self.conn.execute('''
+                INSERT INTO workers (worker_id, host, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+            ''', (self.worker_id, socket.gethostname(), os.getpid(), self.started_at, now))
+            self.conn.execute("UPDATE leases SET expires_at = ? WHERE worker_id = ?",
+                              (now + LEASE_SECONDS, self.worker_id))
+            # Long-dead workers are just clutter
+            self.conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (now - 10 * WORKER_TTL,))
+
+    def live_workers(self, now=None):
+        now = now or time.time()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT worker_id FROM workers WHERE heartbeat_at >= ?", (now - WORKER_TTL,)
+            ).fetchall()
+        return sorted({row[0] for row in rows} | {self.worker_id})
+
+    def shard(self, station_ids, now=None):
+        """The station ids this worker owns on the current ring."""
+        ring = HashRing(self.live_workers(now))
+        return [sid for sid in station_ids if ring.owner(sid) == self.worker_id]
+
+    # --- LEASES ---
+    def claim(self, station_ids, now=None):
+        """
+        Takes (or renews) leases on the stations we own and gives up any we
+        no longer own. Returns the ids we hold and may poll this cycle.
+        """
+        now = now or time.time()
+        owned = self.shard(station_ids, now)
+        with self.lock, self.conn:
+            self.conn.executemany(self.CLAIM_SQL, [(sid, self.worker_id, now + LEASE_SECONDS, now) for sid in owned])
+            held = {row[0] for row in self.conn.execute(
+                "SELECT name FROM leases WHERE worker_id = ? AND expires_at >= ?", (self.worker_id, now)
+            )}
+            # Hand stations that moved to a new worker over right away
+            released = [name for name in held if not name.startswith(JOB_PREFIX) and name not in owned]
+            self.conn.executemany("DELETE FROM leases WHERE name = ? AND worker_id = ?",
+                                  [(name, self.worker_id) for name in released])
+        return [sid for sid in owned if sid in held]
+
+    def claim_job(self, name, now=None):
+        """True if this worker holds (or just took) the lease for a singleton job."""
+        now = now or time.time()
+        key = f"{JOB_PREFIX}{name}"
+        with self.lock, self.conn:
+            self.conn.execute(self.CLAIM_SQL, (key, self.worker_id, now + LEASE_SECONDS, now))
+            row = self.conn.execute("SELECT worker_id FROM leases WHERE name = ?", (key,)).fetchone()
+        return row is not None and row[0] == self.worker_id
+
+    def release_all(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM leases WHERE worker_id = ?", (self.worker_id,))
+            self.conn.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+
+    # --- BACKGROUND HEARTBEAT ---
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.heartbeat()
+
+        def loop():
+            while not self.stop_event.wait(HEARTBEAT_SECONDS):
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    log.error("❌ Heartbeat failed for %s: %s", self.worker_id, e, extra={"worker": self.worker_id})
+
+        self.thread = threading.Thread(target=loop, name="shard-heartbeat", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Clean shutdown: leases go back immediately instead of after LEASE_SECONDS."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.release_all()
+        self.conn.close()
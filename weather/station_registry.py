@@ -0,0 +1,134 @@
+"""
+One place that reads config/stations.json.
+
+The file is parsed and validated once and cached by its mtime, so every
+caller can ask for the registry as often as it likes and only pays an
+os.stat(). Lookups by station_id, cli_code and wfo are dict hits, and each
+station's ZoneInfo is built once when the config is loaded.
+
+    registry = station_registry.load()
+    registry.get("KNYC")["name"]
+    registry.zone("KNYC")
+"""
+import json
+import os
+import threading
+
+from weather import logs, timekeys
+
+# --- CONFIGURATION ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(BASE_DIR, 'config', 'stations.json')
+REQUIRED_FIELDS = ("station_id", "name")
+
+_cache = {}  # path -> (mtime_ns, StationRegistry)
+_rejected = {}  # path -> mtime_ns of an edit that failed validation, so it's reported once
+_lock = threading.Lock()
+
+log = logs.get_logger(__name__)
+
+class StationRegistry:
+    """Validated station config with O(1) indexes."""
+
+    def __init__(self, config):
+        self.defaults = dict(config.get("defaults", {}))
+        self.by_key = {}      # config key -> station dict (the shape stations.json uses)
+        self.by_id = {}       # station_id -> station dict
+        self.by_cli_code = {}  # cli_code -> station dict
+        self.by_wfo = {}      # wfo -> [station dict]
+        self.timezones = {}   # station_id -> tz name
+        self.zones = {}       # station_id -> ZoneInfo
+
+        stations = config.get("stations")
+        if not isinstance(stations, dict):
+            raise ValueError("stations.json needs a 'stations' object")
+
+        for key, info in stations.items():
+            missing = [field for field in REQUIRED_FIELDS if not info.get(field)]
+            if missing:
+                raise ValueError(f"Station {key} is missing {', '.join(missing)}")
+
+            station_id = info["station_id"]
+            if station_id in self.by_id:
+                raise ValueError(f"Station id {station_id} is configured twice")
+            tz_name = info.get("timezone", "UTC")
+            try:
+                zone = timekeys.get_zone(tz_name)
+            except Exception:
+                raise ValueError(f"Station {key} has an unknown timezone {tz_name!r}")
+
+            station = dict(info, key=key)
+            self.by_key[key] = station
+            self.by_id[station_id] = station
+            self.timezones[station_id] = tz_name
+            self.zones[station_id] = zone
+
+            cli_code = info.get("cli_code")
+            if cli_code:
+                if cli_code in self.by_cli_code:
+                    raise ValueError(f"CLI code {cli_code} is configured twice")
+                self.by_cli_code[cli_code] = station
+            if info.get("wfo"):
+                self.by_wfo.setdefault(info["wfo"], []).append(station)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def stations(self):
+        return list(self.by_id.values())
+
+    def station_ids(self):
+        return list(self.by_id)
+
+    def get(self, station_id):
+        return self.by_id.get(station_id)
+
+    def by_cli(self, cli_code):
+        return self.by_cli_code.get(cli_code)
+
+    def for_wfo(self, wfo):
+        return self.by_wfo.get(wfo, [])
+
+    def timezone(self, station_id, default="UTC"):
+        return self.timezones.get(station_id, default)
+
+    def zone(self, station_id, default="UTC"):
+        zone = self.zones.get(station_id)
+        return zone if zone is not None else timekeys.get_zone(default)
+
+    def labels(self):
+        """station_id -> "KNYC (CENTRAL_PARK_NY)" for pickers."""
+        return {sid: f"{sid} ({info['key']})" for sid, info in self.by_id.items()}
+
+def load(path=CONFIG_PATH):
+    """
+    The registry for `path`, re-read only when the file's mtime changes.
+    A missing file gives an empty registry. An invalid edit keeps serving the
+    last good config (and says so) rather than taking the collector down.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        log.error("❌ Config file %s not found!", path)
+        return StationRegistry({"stations": {}})
+
+    cached = _cache.get(path)
+    if cached and mtime in (cached[0], _rejected.get(path)):
+        return cached[1]
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached and mtime in (cached[0], _rejected.get(path)):
+            return cached[1]
+        try:
+            with open(path, 'r') as f:
+                registry = StationRegistry(json.load(f))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            if cached:
+                _rejected[path] = mtime  # Not re-read (or re-reported) until the file changes again
+                log.error("❌ Invalid station config (%s); keeping the previous one.", e)
+                return cached[1]
+            raise ValueError(f"Invalid station config {path}: {e}") from e
+        _cache[path] = (mtime, registry)
+        _rejected.pop(path, None)
+        return registry
@@ -0,0 +1,35 @@
+"""
+Time keys stored alongside every observation.
+
+The API's timestamp text is kept as-is (it is the unique key), but at ingest
+each row also gets `epoch` (integer UTC seconds) and `local_date` (YYYY-MM-DD
+in the station's configured timezone). Readers filter and sort on those two
+columns and never parse a timestamp string again.
+"""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+_zones = {}
+
+def get_zone(tz_name):
+    """ZoneInfo objects are built once per name."""
+    zone = _zones.get(tz_name)
+    if zone is None:
+        zone = _zones[tz_name] = ZoneInfo(tz_name)
+    return zone
+
+def to_epoch(timestamp):
+    return int(datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp())
+
+def local_date(epoch, tz_name):
+    return datetime.fromtimestamp(epoch, get_zone(tz_name)).date().isoformat()
+
+def stamp(timestamp, tz_name):
+    """(epoch, local_date) for one API timestamp."""
+    epoch = to_epoch(timestamp)
+    return epoch, local_date(epoch, tz_name)
+
+def today(tz_name, now=None):
+    """The station's current local date, YYYY-MM-DD."""
+    now = now or datetime.now(get_zone('UTC'))
+    return now.astimezone(get_zone(tz_name)).date().isoformat()